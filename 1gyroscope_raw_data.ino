@@ -11,6 +11,24 @@ const uint16_t SAMPLE_HZ = 100;          // 100 Hz sampling
 const uint32_t SAMPLE_PERIOD_US = 1000000UL / SAMPLE_HZ;
 
 
+// Output format (switch at runtime: T = CSV text, B = binary float32, I = binary int16)
+// Binary frames are decoded by serial_protocol.py — keep the two in sync.
+enum OutputMode : uint8_t {
+  OUTPUT_CSV = 0,
+  OUTPUT_BIN_F32,
+  OUTPUT_BIN_I16
+};
+OutputMode outputMode = OUTPUT_CSV;
+
+const uint8_t FRAME_SYNC0 = 0xA5;
+const uint8_t FRAME_SYNC1 = 0x5A;
+const uint8_t FRAME_FMT_F32 = 0;
+const uint8_t FRAME_FMT_I16 = 1;
+const float ACCEL_SCALE = 400.0f;   // int16 frames: m/s^2 * 400
+const float GYRO_SCALE  = 3000.0f;  // int16 frames: rad/s * 3000
+uint16_t frameSeq = 0;
+
+
 enum Label : uint8_t {
   LABEL_NONE = 0,
   LABEL_REST,
@@ -68,6 +86,8 @@ void printControls() {
   Serial.println(F("  r = RIGHT"));
   Serial.println(F("  c = CIRCLE"));
   Serial.println(F("  s = SCRATCH"));
+  Serial.println(F("Output format:"));
+  Serial.println(F("  T = CSV text   B = binary float32   I = binary int16"));
   Serial.println(F("--------------------------------\n"));
 }
 
@@ -88,11 +108,17 @@ void handleSerialLabel() {
       case 'r': currentLabel = LABEL_RIGHT; break;
       case 'c': currentLabel = LABEL_CIRCLE; break;
       case 's': currentLabel = LABEL_SCRATCH; break;
+      case 'T': outputMode = OUTPUT_CSV; continue;
+      case 'B': outputMode = OUTPUT_BIN_F32; continue;
+      case 'I': outputMode = OUTPUT_BIN_I16; continue;
       default: break;
     }
 
-    Serial.print(F("# LABEL="));
-    Serial.println(labelToStr(currentLabel));
+    // Binary frames carry the label themselves, so don't mix text in
+    if (outputMode == OUTPUT_CSV) {
+      Serial.print(F("# LABEL="));
+      Serial.println(labelToStr(currentLabel));
+    }
   }
 }
 
@@ -124,6 +150,53 @@ void calibrateGyroBias(uint16_t samples = 300) {
 }
 
 
+// Fletcher-16 over the frame body (fmt .. last value byte)
+uint16_t fletcher16(const uint8_t* data, uint8_t len) {
+  uint16_t s1 = 0, s2 = 0;
+  for (uint8_t i = 0; i < len; i++) {
+    s1 = (s1 + data[i]) % 255;
+    s2 = (s2 + s1) % 255;
+  }
+  return (s2 << 8) | s1;
+}
+
+
+int16_t toInt16(float v, float scale) {
+  float s = v * scale;
+  if (s > 32767.0f) return 32767;
+  if (s < -32768.0f) return -32768;
+  return (int16_t)lroundf(s);
+}
+
+
+void writeFrame(uint32_t t_ms, const float* vals) {
+  // sync(2) fmt(1) label(1) seq(2) t_ms(4) values(20 or 10) check(2)
+  uint8_t buf[32];
+  uint8_t n = 0;
+  bool i16 = (outputMode == OUTPUT_BIN_I16);
+
+  buf[n++] = FRAME_SYNC0;
+  buf[n++] = FRAME_SYNC1;
+  buf[n++] = i16 ? FRAME_FMT_I16 : FRAME_FMT_F32;
+  buf[n++] = (uint8_t)currentLabel;
+  memcpy(buf + n, &frameSeq, 2); n += 2;   // AVR/ARM are little-endian
+  memcpy(buf + n, &t_ms, 4); n += 4;
+  for (uint8_t i = 0; i < 5; i++) {
+    if (i16) {
+      int16_t q = toInt16(vals[i], i < 3 ? ACCEL_SCALE : GYRO_SCALE);
+      memcpy(buf + n, &q, 2); n += 2;
+    } else {
+      memcpy(buf + n, &vals[i], 4); n += 4;
+    }
+  }
+  uint16_t check = fletcher16(buf + 2, n - 2);
+  memcpy(buf + n, &check, 2); n += 2;
+
+  Serial.write(buf, n);
+  frameSeq++;
+}
+
+
 // -------------------- SETUP/LOOP --------------------
 uint32_t nextSampleUs = 0;
 
@@ -187,6 +260,12 @@ void loop() {
   gy_f = (1.0f - ALPHA) * gy_f + ALPHA * gy;
 
 
+  if (outputMode != OUTPUT_CSV) {
+    float vals[5] = {ax, ay, az, gx_f, gy_f};
+    writeFrame(millis(), vals);
+    return;
+  }
+
   // Print CSV line
   Serial.print(millis());
   Serial.print(',');
@@ -1,7 +1,12 @@
 var WearableTest = {};
-WearableTest.deckGroup = "[Channel1]";
-WearableTest.deckNumber = 1;
-WearableTest.scratchEnabled = false;
+// Each glove sends on its own MIDI channel: channel 1 -> deck 1, channel 2 -> deck 2, ...
+// (the "channel" handler argument is 0-based)
+WearableTest.deckNumber = function (channel) { return channel + 1; };
+WearableTest.deckGroup = function (channel) { return "[Channel" + (channel + 1) + "]"; };
+WearableTest.scratchEnabled = {};   // deck number -> bool
+// Fine jog steps per CC16 tick (FINE_STEPS in midi_protocol.py). Scratching
+// counts fine steps, so a CC16 tick still turns the platter as far as before.
+WearableTest.fineSteps = 16;
 WearableTest.scratchConfig = {
   intervalsPerRev: 128,
   rpm: 33.333,
@@ -11,30 +16,44 @@ WearableTest.scratchConfig = {
 };
 
 WearableTest.scratchHold = function (channel, control, value, status, group) {
-  if (value > 0 && !WearableTest.scratchEnabled) {
+  var deck = WearableTest.deckNumber(channel);
+  if (value > 0 && !WearableTest.scratchEnabled[deck]) {
     engine.scratchEnable(
-      WearableTest.deckNumber,
-      WearableTest.scratchConfig.intervalsPerRev,
+      deck,
+      WearableTest.scratchConfig.intervalsPerRev * WearableTest.fineSteps,
       WearableTest.scratchConfig.rpm,
       WearableTest.scratchConfig.alpha,
       WearableTest.scratchConfig.beta,
       WearableTest.scratchConfig.ramp
     );
-    WearableTest.scratchEnabled = true;
-  } else if (value === 0 && WearableTest.scratchEnabled) {
-    engine.scratchDisable(WearableTest.deckNumber, WearableTest.scratchConfig.ramp);
-    WearableTest.scratchEnabled = false;
+    WearableTest.scratchEnabled[deck] = true;
+  } else if (value === 0 && WearableTest.scratchEnabled[deck]) {
+    engine.scratchDisable(deck, WearableTest.scratchConfig.ramp);
+    WearableTest.scratchEnabled[deck] = false;
   }
 };
 
+// Coarse jog: CC16, 64 + ticks
 WearableTest.jogTick = function (channel, control, value, status, group) {
   var delta = value - 64;
   if (delta === 0) return;
-  if (WearableTest.scratchEnabled) {
-    engine.scratchTick(WearableTest.deckNumber, delta);
+  WearableTest.jogSteps(channel, delta * WearableTest.fineSteps);
+};
+
+// Fine jog: pitch bend, 8192 + steps as 14 bits (control = LSB, value = MSB)
+WearableTest.jogTickFine = function (channel, control, value, status, group) {
+  var steps = ((value << 7) | control) - 8192;
+  if (steps === 0) return;
+  WearableTest.jogSteps(channel, steps);
+};
+
+WearableTest.jogSteps = function (channel, steps) {
+  var deck = WearableTest.deckNumber(channel);
+  if (WearableTest.scratchEnabled[deck]) {
+    engine.scratchTick(deck, steps);
   } else {
-    var amt = delta / 256.0;
-    engine.setValue(WearableTest.deckGroup, "jog", amt);
+    var amt = steps / WearableTest.fineSteps / 256.0;
+    engine.setValue(WearableTest.deckGroup(channel), "jog", amt);
   }
 };
 
@@ -0,0 +1,205 @@
+"""
+Adaptive inference cadence driven by motion energy — in practice a rest
+back-off: it saves CPU while the glove is still, it does not make gestures
+register sooner.
+
+Instead of classifying every STEP_SIZE samples no matter what, decide per
+sample:
+
+  onset   gyro jumps well above resting noise → classify every `fast_every`
+          samples for the next `hold` samples (finer timing, see below)
+  rest    gyro within resting noise for `rest_hold` samples → every
+          `slow_every` samples (less CPU)
+  else    every `normal_every` samples (the trained STEP_SIZE)
+
+Motion energy is the larger of |gx - baseline| / noise and |gy - baseline| / noise,
+where the baseline is a slow moving average and the noise levels come from
+the model's motion gate (REST std thresholds) when it has one. It is a few
+float ops per sample.
+
+A token bucket caps the average rate at `budget_hz` classifications per
+second of stream, so a long fast stretch can't exceed the CPU budget.
+
+Deciders weight each window by the share of a trained step it covers
+(take_weight), so a faster cadence gives finer timing, not more evidence:
+windows one sample apart share 29 of their 30 samples, and counting each as
+a full window would confirm on the same evidence several times over. So the
+goal of a faster onset cadence — lower decision latency — was not met. On
+the replay below, confirm mode's median is 500 ms at every 5, 540 ms at
+every 1 and 530 ms with onset every 1; sequential mode is 350 / 380 / 380
+ms. Decisions wait for the 30-sample window to fill with the new gesture,
+and denser windows only give a dip in confidence more chances to break a
+run. Backing off at rest does pay (20 → 15.5 classifications/s for about
+10 ms more median latency), so the live scripts default to fast_every =
+STEP_SIZE.
+
+Run this file directly to compare fixed and adaptive cadence on a replay:
+    python cadence.py
+"""
+
+GYRO_CHANNELS = (3, 4)
+DEFAULT_GYRO_NOISE = (0.01, 0.02)   # rad/s, REST std when there's no gate
+
+
+class AdaptiveCadence:
+
+    def __init__(self, normal_every=5, fast_every=1, slow_every=15,
+                 onset_level=4.0, rest_level=3.0, hold=30, rest_hold=50,
+                 budget_hz=60.0, sample_hz=100, gyro_noise=DEFAULT_GYRO_NOISE,
+                 baseline_alpha=0.02):
+        self.normal_every = normal_every
+        self.fast_every = fast_every
+        self.slow_every = slow_every
+        self.onset_level = onset_level
+        self.rest_level = rest_level
+        self.hold = hold
+        self.rest_hold = rest_hold
+        self.budget_hz = budget_hz
+        self.sample_hz = sample_hz
+        self.noise = tuple(float(n) for n in gyro_noise)
+        self.alpha = baseline_alpha
+        self.reset()
+
+    @classmethod
+    def for_model(cls, bundle, gate=None, **kwargs):
+        """
+        Cadence using the model's STEP_SIZE and, if present, the gate's gyro
+        noise. fast_every=None also means STEP_SIZE.
+        """
+        kwargs.setdefault("normal_every", bundle["step_size"])
+        if kwargs.get("fast_every", 1) is None:
+            kwargs["fast_every"] = bundle["step_size"]
+        if gate is not None:
+            kwargs.setdefault("gyro_noise", [gate.std_max[c] for c in GYRO_CHANNELS])
+        return cls(**kwargs)
+
+    def reset(self):
+        self.baseline = None
+        self.fast_left = 0
+        self.quiet = 0
+        self.since = 0              # samples since the last classification
+        self.tokens = self.budget_hz / self.sample_hz * self.normal_every
+        self.mode_counts = {"fast": 0, "normal": 0, "slow": 0}
+        self.denied = 0             # due, but over budget
+
+    @property
+    def mode(self):
+        if self.fast_left > 0:
+            return "fast"
+        if self.quiet >= self.rest_hold:
+            return "slow"
+        return "normal"
+
+    def energy(self, sample):
+        gx, gy = sample[GYRO_CHANNELS[0]], sample[GYRO_CHANNELS[1]]
+        if self.baseline is None:
+            self.baseline = [gx, gy]
+            return 0.0
+        bx, by = self.baseline
+        e = max(abs(gx - bx) / self.noise[0], abs(gy - by) / self.noise[1])
+        a = self.alpha
+        self.baseline = [bx + a * (gx - bx), by + a * (gy - by)]
+        return e
+
+    def due(self, sample):
+        """Call once per sample; True if this sample should be classified."""
+        e = self.energy(sample)
+        if e >= self.onset_level:
+            self.fast_left = self.hold
+            self.quiet = 0
+        elif e <= self.rest_level:
+            self.quiet += 1
+        else:
+            self.quiet = 0
+
+        mode = self.mode
+        if self.fast_left > 0:
+            self.fast_left -= 1
+        every = {"fast": self.fast_every, "normal": self.normal_every,
+                 "slow": self.slow_every}[mode]
+
+        self.tokens = min(self.tokens + self.budget_hz / self.sample_hz, 2.0 * self.normal_every)
+        self.since += 1
+        if self.since < every:
+            return False
+        if self.tokens < 1.0:
+            self.denied += 1
+            return False
+        self.tokens -= 1.0
+        self.mode_counts[mode] += 1
+        return True
+
+    def take_weight(self, base_every):
+        """
+        The share of a trained step the window about to be classified stands
+        for (samples since the last one / base_every, at most 1), for
+        deciders that count windows. Capped so the first window after a slow
+        stretch can't commit a gesture on its own. Resets the sample counter.
+        """
+        w = min(1.0, self.since / base_every)
+        self.since = 0
+        return w
+
+
+class FixedCadence:
+    """Classify every `every` samples — the behaviour without a cadence object."""
+
+    def __init__(self, every):
+        self.every = every
+        self.reset()
+
+    def reset(self):
+        self.since = 0
+
+    def due(self, sample):
+        self.since += 1
+        return self.since >= self.every
+
+    def take_weight(self, base_every):
+        w = min(1.0, self.since / base_every)
+        self.since = 0
+        return w
+
+
+if __name__ == "__main__":
+    import time
+
+    import numpy as np
+    import pandas as pd
+
+    import scratch_arduino
+    from decision import make_session, score_decisions
+    from gesture_controller import load_model
+    from motion_gate import MotionGate
+    from replay import SAMPLE_HZ, replay
+
+    bundle = load_model("movement_model.pkl")
+    gate = MotionGate.from_bundle(bundle)
+    df = pd.read_csv("gesture_data.csv")
+    session = pd.concat([make_session(df, seed=s) for s in range(3)], ignore_index=True)
+    seconds = len(session) / SAMPLE_HZ
+
+    configs = [
+        ("fixed every 5", lambda: FixedCadence(bundle["step_size"])),
+        ("fixed every 1", lambda: FixedCadence(1)),
+        ("adaptive, onset every 1", lambda: AdaptiveCadence.for_model(bundle, gate)),
+        ("adaptive, onset every 2", lambda: AdaptiveCadence.for_model(bundle, gate, fast_every=2)),
+        ("adaptive, rest back-off", lambda: AdaptiveCadence.for_model(bundle, gate, fast_every=None,
+                                                                      slow_every=25)),
+    ]
+    print(f"Replay of {seconds:.0f} s, {len(session)} samples\n")
+    print(f"{'cadence':<26s} {'infer/s':>8s} {'forest/s':>9s} {'CPU s':>6s} "
+          f"{'median ms':>10s} {'p90 ms':>7s} {'false':>6s}")
+    for decision_mode in ("confirm", "sequential"):
+        print(f"-- {decision_mode} --")
+        for name, make in configs:
+            t0 = time.process_time()
+            result = replay(session, bundle=bundle, cadence=make(),
+                            decider=scratch_arduino.make_decider(decision_mode))
+            cpu = time.process_time() - t0
+            p = result.pipeline
+            forest_calls = p.windows - (p.gate.gated if p.gate else 0)
+            delays, false = score_decisions(session["label"].to_numpy(), result.decisions)
+            ms = np.array([d for _, d in delays if d is not None]) * 1000.0 / SAMPLE_HZ
+            print(f"{name:<26s} {p.windows / seconds:>8.1f} {forest_calls / seconds:>9.1f} "
+                  f"{cpu:>6.2f} {np.median(ms):>10.0f} {np.percentile(ms, 90):>7.0f} {false:>6d}")
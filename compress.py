@@ -0,0 +1,150 @@
+"""
+Shrink a trained forest to a latency / size budget without losing accuracy.
+
+compress_forest() tries every combination of a tree subset and a depth cut
+(FlatForest.truncate — no retraining) and keeps the smallest one whose
+macro-F1 on the held-out windows is within `f1_tolerance` of the full
+forest and that fits the per-window latency and file-size budgets.
+
+select_cut() does that without giving up training data: it fits a copy of
+the model on most of the training windows, picks the cut on the rest, and
+returns the cut to apply to the model trained on all of them.
+step2_train_model.py runs it when COMPRESS = True and writes the cut forest
+as movement_model.forest (the pickle keeps the full sklearn model), then
+reports it on the test split it never saw. F1 is sklearn's macro F1, the
+same figure search.py reports.
+
+Run this file directly for the trade-off table of the current model:
+    python compress.py
+"""
+
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+
+from forest_engine import FlatForest
+from model_file import ARRAYS
+
+TREE_COUNTS = [5, 10, 20, 30, 50, 75, 100, 150, 200, 300]
+DEPTHS = [6, 8, 10, 12, 14, 16, 20]
+
+
+def model_bytes(forest):
+    """Array bytes of the .forest file (the header adds about 1 KB)."""
+    return sum(getattr(forest, name).nbytes for name in ARRAYS)
+
+
+def window_ms(forest, x, blocks=10, calls=30):
+    """ms per predict_one, fastest of several blocks of calls."""
+    forest.predict_one(x)
+    best = float("inf")
+    for _ in range(blocks):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            forest.predict_one(x)
+        best = min(best, (time.perf_counter() - t0) / calls)
+    return best * 1000.0
+
+
+def evaluate(forest, X, y):
+    proba = forest.predict_proba(X)
+    y_pred = forest.classes[proba.argmax(axis=1)]
+    return {
+        "trees": forest.n_trees,
+        "depth": forest.depth,
+        "nodes": len(forest.feature),
+        "f1": float(f1_score(np.asarray(y), y_pred, average="macro")),
+        "acc": float(np.mean(y_pred == np.asarray(y))),
+        "mb": model_bytes(forest) / 1e6,
+        "ms": window_ms(forest, np.asarray(X[0])),
+    }
+
+
+def compress_forest(forest, X_val, y_val, f1_tolerance=0.01, latency_ms=None, max_mb=None,
+                    tree_counts=TREE_COUNTS, depths=DEPTHS):
+    """
+    (chosen forest, its row, full-model row, every candidate row). Each
+    row's "cut" is the (trees, depth) passed to truncate(). The chosen
+    forest is the full one (and its row None) if no candidate meets the
+    tolerance and budgets.
+    """
+    full = evaluate(forest, X_val, y_val)
+    rows = []
+    best, best_row = forest, None
+    for n in sorted({min(n, forest.n_trees) for n in tree_counts}):
+        for d in sorted({min(d, forest.depth) for d in depths}):
+            small = forest.truncate(n, d)
+            row = evaluate(small, X_val, y_val)
+            row["cut"] = (n, d)
+            row["ok"] = (row["f1"] >= full["f1"] - f1_tolerance
+                         and (latency_ms is None or row["ms"] <= latency_ms)
+                         and (max_mb is None or row["mb"] <= max_mb))
+            rows.append(row)
+            if row["ok"] and (best_row is None or (row["mb"], row["ms"]) < (best_row["mb"],
+                                                                           best_row["ms"])):
+                best, best_row = small, row
+    return best, best_row, full, rows
+
+
+def select_cut(clf, X_train, y_train, val_size=0.2, f1_tolerance=0.01, latency_ms=None,
+               max_mb=None, random_state=42):
+    """
+    Pick a cut for `clf` (an unfitted or fitted sklearn forest) without
+    touching the test split: a copy is fitted on 1 - val_size of the
+    training windows and compressed against the rest. Returns (cut or None,
+    best row, full row, rows) — apply the cut with
+    FlatForest.from_sklearn(clf fitted on all of X_train).truncate(*cut).
+    """
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=val_size, random_state=random_state, stratify=y_train
+    )
+    selector = clone(clf).fit(X_fit, y_fit)
+    _, best_row, full, rows = compress_forest(FlatForest.from_sklearn(selector), X_val, y_val,
+                                              f1_tolerance, latency_ms, max_mb)
+    return (best_row["cut"] if best_row else None), best_row, full, rows
+
+
+def report(best_row, full, rows, f1_tolerance, show_all=False):
+    print(f"{'trees':>5s} {'depth':>5s} {'nodes':>7s} {'MB':>6s} {'ms/window':>9s} "
+          f"{'macro-F1':>8s} {'acc':>6s}")
+    print(f"{full['trees']:>5d} {full['depth']:>5d} {full['nodes']:>7d} {full['mb']:>6.2f} "
+          f"{full['ms']:>9.3f} {full['f1']:>8.3f} {full['acc']:>6.3f}   full model")
+    for row in rows:
+        if not (show_all or row is best_row):
+            continue
+        note = "   ← chosen" if row is best_row else ("" if row["ok"] else "   (misses target)")
+        print(f"{row['trees']:>5d} {row['depth']:>5d} {row['nodes']:>7d} {row['mb']:>6.2f} "
+              f"{row['ms']:>9.3f} {row['f1']:>8.3f} {row['acc']:>6.3f}{note}")
+    if best_row is None:
+        print(f"No smaller forest is within {f1_tolerance:.3f} macro-F1 and the budgets — "
+              f"keeping the full model.")
+    else:
+        print(f"Compressed: {full['mb'] / best_row['mb']:.1f}x smaller, "
+              f"{full['ms'] / best_row['ms']:.1f}x faster per window, "
+              f"macro-F1 {best_row['f1'] - full['f1']:+.3f}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    from gesture_controller import load_model
+    from training_data import load_features
+
+    bundle = load_model("movement_model.pkl")
+    X, y, _, _ = load_features("gesture_data.csv", "recordings", bundle["feature_cols"],
+                               bundle["window_size"], bundle["step_size"], verbose=False)
+    # step2's split: the cut is picked inside the training windows and the
+    # saved model is only scored on the test split
+    X_train, X_test, y_train, y_test = train_test_split(np.asarray(X), y, test_size=0.2,
+                                                        random_state=42, stratify=y)
+    cut, best_row, full, rows = select_cut(bundle["model"], X_train, y_train)
+    print("Picked on a validation split of the training windows:")
+    report(best_row, full, rows, 0.01, show_all="--all" in sys.argv)
+    if cut is not None:
+        f1_full = evaluate(bundle["forest"], X_test, y_test)["f1"]
+        f1_cut = evaluate(bundle["forest"].truncate(*cut), X_test, y_test)["f1"]
+        print(f"Saved model on the test split: macro-F1 {f1_full:.3f} full, {f1_cut:.3f} "
+              f"cut to {cut[0]} trees / depth {cut[1]} ({f1_cut - f1_full:+.3f})")
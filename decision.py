@@ -0,0 +1,234 @@
+"""
+Gesture decision rules — when does a stream of window predictions become a
+gesture the controller acts on?
+
+ConfirmCountDecider   the original rule: CONFIRM_COUNT confident predictions
+                      in a row must agree (fixed ~250 ms at STEP_SIZE=5)
+SequentialDecider     accumulates per-class evidence window by window and
+                      commits as soon as it is strong enough (CUSUM on the
+                      log-likelihood ratio). Clear gestures commit after one
+                      or two windows, ambiguous ones wait.
+
+Both have the same interface:
+    update(proba, classes, weight=1.0) → (label, conf %, reason) or None
+where reason is "confirm" (act on the gesture) or "silence" (too long with no
+confident gesture — stop the jog). `weight` is how many trained steps
+(STEP_SIZE samples) the window stands for; with an adaptive cadence
+(cadence.py) windows come more often and each counts for less, so counts and
+evidence still mean the same amount of time.
+
+Run this file directly to compare the two on a replay built from
+gesture_data.csv (time-to-decision and false triggers per transition):
+    python decision.py
+"""
+
+import math
+
+import numpy as np
+
+# Agreeing windows before a gesture fires: scratch_arduino.py's default, and
+# the decision delay search.py scores configurations by
+CONFIRM_COUNT = 5
+
+_TOL = 1e-9   # weights are sums of fractions like 0.2
+
+
+class ConfirmCountDecider:
+    """
+    thresholds      {label: min confidence %}, others use `default_conf`
+    silence_limit   emit a "silence" REST after this many unconfident windows
+                    while a gesture is active (None = off)
+    """
+
+    def __init__(self, confirm_count, default_conf, thresholds=None, silence_limit=None):
+        self.confirm_count = confirm_count
+        self.default_conf = default_conf
+        self.thresholds = thresholds or {}
+        self.silence_limit = silence_limit
+        self.reset()
+
+    def reset(self):
+        self.last_label = None
+        self.run_label = None     # label of the current run of confident windows
+        self.run_weight = 0.0     # ...and its length in (weighted) windows
+        self.silence_count = 0
+
+    def update(self, proba, classes, weight=1.0):
+        k = int(np.argmax(proba))
+        pred = classes[k]
+        conf = proba[k] * 100
+        threshold = self.thresholds.get(pred, self.default_conf)
+
+        if conf < threshold:
+            self.silence_count += weight
+            self.run_label, self.run_weight = None, 0.0
+            if self.silence_limit and self.silence_count >= self.silence_limit - _TOL:
+                self.silence_count = 0
+                if self.last_label not in (None, "REST", "NONE"):
+                    self.last_label = "REST"
+                    return "REST", conf, "silence"
+            return None
+
+        self.silence_count = 0
+        if pred == self.run_label:
+            self.run_weight += weight
+        else:
+            self.run_label, self.run_weight = pred, weight
+        if self.run_weight >= self.confirm_count - _TOL and pred != self.last_label:
+            self.last_label = pred
+            return pred, conf, "confirm"
+        return None
+
+
+class SequentialDecider:
+    """
+    Per class k, each window adds the log-likelihood ratio of k against its
+    strongest rival, using the forest's vote shares:
+
+        llr_k = log(p_k) - max_{j != k} log(p_j)
+
+    and keeps a CUSUM  S_k = max(0, S_k + llr_k), so only a class that keeps
+    winning builds up evidence. Class k is committed when
+    S_k >= log(1 / false_rate): `false_rate` bounds the odds of committing on
+    evidence that is really noise. Vote shares are floored at `eps` so one
+    unanimous window can't be infinite evidence; `min_windows` sets a floor
+    on windows of evidence.
+
+    On the replay comparison below, false_rate=1e-3 decides ~150 ms sooner
+    than CONFIRM_COUNT=5 (median) with fewer false triggers.
+
+    After a commit all evidence is cleared, and the same label can't be
+    committed twice in a row (like the confirm rule). Silence handling
+    matches ConfirmCountDecider.
+    """
+
+    def __init__(self, false_rate=1e-3, eps=0.02, min_windows=1,
+                 default_conf=50, silence_limit=None):
+        self.false_rate = false_rate
+        self.threshold = math.log(1.0 / false_rate)
+        self.eps = eps
+        self.min_windows = min_windows
+        self.default_conf = default_conf
+        self.silence_limit = silence_limit
+        self.reset()
+
+    def reset(self):
+        self.last_label = None
+        self.evidence = None
+        self.runs = None
+        self.silence_count = 0
+
+    def update(self, proba, classes, weight=1.0):
+        proba = np.asarray(proba, dtype=float)
+        K = len(proba)
+        if self.evidence is None:
+            self.evidence = np.zeros(K)
+            self.runs = np.zeros(K, dtype=int)
+
+        logp = np.log(np.clip(proba, self.eps, 1.0))
+        top2 = np.sort(logp)[-2:]
+        rival = np.where(logp == top2[1], top2[0], top2[1])
+        llr = (logp - rival) * weight
+        self.evidence = np.maximum(0.0, self.evidence + llr)
+        self.runs = np.where(self.evidence > 0, self.runs + 1, 0)
+
+        k = int(np.argmax(proba))
+        conf = proba[k] * 100
+        if conf < self.default_conf:
+            self.silence_count += weight
+            if self.silence_limit and self.silence_count >= self.silence_limit - _TOL:
+                self.silence_count = 0
+                if self.last_label not in (None, "REST", "NONE"):
+                    self.last_label = "REST"
+                    return "REST", conf, "silence"
+        else:
+            self.silence_count = 0
+
+        # Best-supported class that isn't the one already active
+        for j in np.argsort(-self.evidence):
+            label = classes[j]
+            if label == self.last_label:
+                continue
+            if self.evidence[j] >= self.threshold and self.runs[j] >= self.min_windows:
+                self.last_label = label
+                self.evidence[:] = 0.0
+                self.runs[:] = 0
+                return label, proba[j] * 100, "confirm"
+            break
+        return None
+
+
+# ── Comparison on gesture_data.csv ──
+def make_session(df, segment_s=2.0, sample_hz=100, seed=0):
+    """
+    A synthetic session: REST, gesture, REST, gesture, ... with each piece a
+    random `segment_s` slice of that label's recording. Gives many more
+    transitions than replaying the file straight through.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n = int(segment_s * sample_hz)
+    groups = {label: g for label, g in df.groupby("label") if len(g) > n}
+    gestures = [label for label in groups if label != "REST"]
+    pieces = []
+    for _ in range(4):
+        for label in rng.permutation(gestures):
+            for lab in ("REST", label):
+                g = groups[lab]
+                start = int(rng.integers(0, len(g) - n))
+                pieces.append(g.iloc[start:start + n])
+    return pd.concat(pieces, ignore_index=True)
+
+
+def score_decisions(labels, decisions):
+    """
+    For every stretch of the same recorded label: the delay to the first
+    matching decision (None if never), plus the decisions that didn't match.
+    """
+    labels = np.asarray(labels)
+    bounds = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+    starts = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(labels)]])
+    delays, false = [], 0
+    for s, e in zip(starts, ends):
+        inside = [(i, lab) for i, lab, _ in decisions if s < i <= e]
+        hit = next((i for i, lab in inside if lab == labels[s]), None)
+        delays.append((labels[s], None if hit is None else hit - s))
+        false += sum(lab != labels[min(i, len(labels)) - 1] for i, lab in inside)
+    return delays, false
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    import scratch_arduino
+    from gesture_controller import load_model
+    from replay import SAMPLE_HZ, replay
+
+    bundle = load_model("movement_model.pkl")
+    df = pd.read_csv("gesture_data.csv")
+    sessions = {"straight": df}
+    for seed in range(3):
+        sessions[f"shuffled-{seed}"] = make_session(df, seed=seed)
+
+    modes = [("confirm", {}),
+             ("sequential", {"false_rate": 1e-2}),
+             ("sequential", {"false_rate": 1e-3}),
+             ("sequential", {"false_rate": 1e-4})]
+
+    print(f"{'mode':<22s} {'transitions':>11s} {'detected':>9s} {'median ms':>10s} "
+          f"{'p90 ms':>8s} {'false':>6s}")
+    for mode, kwargs in modes:
+        all_delays, all_false = [], 0
+        for name, session in sessions.items():
+            decider = scratch_arduino.make_decider(mode, **kwargs)
+            result = replay(session, bundle=bundle, decider=decider)
+            delays, false = score_decisions(session["label"].to_numpy(), result.decisions)
+            all_delays += [d for _, d in delays]
+            all_false += false
+        hits = [d for d in all_delays if d is not None]
+        ms = np.array(hits) * 1000.0 / SAMPLE_HZ
+        tag = mode + (f" {kwargs['false_rate']:g}" if kwargs else "")
+        print(f"{tag:<22s} {len(all_delays):>11d} {len(hits):>9d} "
+              f"{np.median(ms):>10.0f} {np.percentile(ms, 90):>8.0f} {all_false:>6d}")
@@ -0,0 +1,16 @@
+"""
+Content hash of a file, for the on-disk caches keyed by what a file holds:
+step1_extract_data.py (PDFs), feature_cache.py (training data) and
+sample_engine.py (decoded sounds).
+"""
+
+import hashlib
+
+
+def file_digest(path):
+    """SHA-256 hex digest of the file's bytes, read 1 MB at a time."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,153 @@
+"""
+On-disk cache of step2's feature matrix.
+
+Windowing and feature extraction only depend on the input data and the
+window settings, so step2_train_model.py stores X, y and where every window
+came from under a key made of:
+
+    hash of every input (gesture_data.csv bytes, recordings/ manifest)
+    FEATURE_COLS, WINDOW_SIZE, STEP_SIZE, feature dtype
+    gesture_features.FEATURE_VERSION
+
+A re-run with only new RandomForest settings finds the entry and goes
+straight to fit. Entries are plain .npy files opened with mmap_mode="r",
+and the cache is kept under MAX_BYTES by evicting the least recently used
+(a hit touches the entry's mtime; it never writes, so any number of
+processes can read one entry at once).
+
+    .feature_cache/<key>/X.npy            (n_windows, n_features)
+    .feature_cache/<key>/y.npy            (n_windows,) label strings
+    .feature_cache/<key>/provenance.npy   (n_windows,) run index, first row
+    .feature_cache/<key>/meta.json        the key's inputs, runs, row counts
+
+    python feature_cache.py          list entries
+    python feature_cache.py --clear  delete them all
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from digest import file_digest
+from gesture_features import FEATURE_VERSION
+
+CACHE_DIR = ".feature_cache"
+MAX_BYTES = 500 * 1024 * 1024
+
+PROVENANCE_DTYPE = np.dtype([("run", np.int32), ("start", np.int64)])
+
+
+def dataset_key(inputs, feature_cols, window_size, step_size, dtype):
+    """
+    Cache key for `inputs` (paths of the files the data is read from) and
+    the window settings. Returns (key, description dict).
+    """
+    desc = {
+        "inputs": {path: file_digest(path) for path in inputs},
+        "feature_cols": list(feature_cols),
+        "window_size": int(window_size),
+        "step_size": int(step_size),
+        "dtype": np.dtype(dtype).str,
+        "feature_version": FEATURE_VERSION,
+    }
+    key = hashlib.sha256(json.dumps(desc, sort_keys=True).encode()).hexdigest()[:24]
+    return key, desc
+
+
+def load(key, cache_dir=CACHE_DIR):
+    """(X, y, provenance, meta) memory-mapped from the cache, or None on a miss."""
+    entry = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(entry, name + ".npy"), mmap_mode="r")
+                  for name in ("X", "y", "provenance")]
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(entry)              # last used, for eviction — best effort
+    except OSError:
+        pass
+    return (*arrays, meta)
+
+
+def store(key, desc, X, y, provenance, runs, info=None, cache_dir=CACHE_DIR,
+          max_bytes=MAX_BYTES):
+    """
+    Save one entry, then evict least recently used entries over max_bytes.
+    `runs` describes provenance["run"] (e.g. [session, label, first_row,
+    rows] per run); `info` is anything else worth showing on a hit.
+    """
+    entry = os.path.join(cache_dir, key)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir)    # private to this process
+    np.save(os.path.join(tmp, "X.npy"), np.ascontiguousarray(X))
+    np.save(os.path.join(tmp, "y.npy"), np.asarray(y, dtype=str))
+    np.save(os.path.join(tmp, "provenance.npy"), np.asarray(provenance, PROVENANCE_DTYPE))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({**desc, "runs": runs, "info": info or {}}, f)
+    shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # Another process stored the same key in between: keep theirs
+        shutil.rmtree(tmp, ignore_errors=True)
+    return evict(cache_dir, max_bytes, keep=key)
+
+
+def entries(cache_dir=CACHE_DIR):
+    """[(key, bytes, last_used, meta)] for every complete entry, oldest use first."""
+    if not os.path.isdir(cache_dir):
+        return []
+    out = []
+    for key in os.listdir(cache_dir):
+        if key.startswith(".tmp-"):
+            continue
+        entry = os.path.join(cache_dir, key)
+        try:
+            with open(os.path.join(entry, "meta.json")) as f:
+                meta = json.load(f)
+            size = sum(os.path.getsize(os.path.join(entry, name))
+                       for name in os.listdir(entry))
+            used = os.path.getmtime(entry)
+        except (OSError, ValueError):
+            continue
+        out.append((key, size, used, meta))
+    return sorted(out, key=lambda e: e[2])
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, keep=None):
+    """Delete least recently used entries until the cache fits. Returns keys removed."""
+    current = entries(cache_dir)
+    total = sum(size for _, size, _, _ in current)
+    removed = []
+    for key, size, _, _ in current:
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total -= size
+        removed.append(key)
+    return removed
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--clear" in sys.argv:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"Cleared '{CACHE_DIR}'")
+        raise SystemExit
+    current = entries()
+    total = sum(size for _, size, _, _ in current)
+    print(f"{CACHE_DIR}: {len(current)} entries, {total / 1e6:.1f} MB of {MAX_BYTES / 1e6:.0f} MB")
+    for key, size, used, meta in reversed(current):
+        print(f"  {key}  {size / 1e6:6.1f} MB  last used {time.ctime(used)}  "
+              f"W={meta['window_size']} step={meta['step_size']} "
+              f"{', '.join(meta['inputs'])}")
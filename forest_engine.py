@@ -0,0 +1,291 @@
+"""
+Flat-array inference for the RandomForest gesture model.
+
+FlatForest.from_sklearn(clf) copies every tree of a trained
+RandomForestClassifier into a handful of NumPy arrays (feature, threshold,
+left/right child, per-node class distribution). predict_one() then walks all
+trees at once, one tree level per step, and returns the label and its
+confidence in a single pass — no sklearn input validation, and no second
+pass for predict_proba. predict_proba(X) does the same for many rows at
+once (several gloves per tick, or a whole recording) — gesture_model.py
+wraps it for whole streams.
+
+Run this file directly to compare it with sklearn on gesture_data.csv and
+time it (the parity checks are in tests/test_forest_engine.py):
+    python forest_engine.py
+"""
+
+import numpy as np
+
+
+class FlatForest:
+    """
+    Nodes exported by from_sklearn are numbered breadth-first within each
+    tree, so every right child sits right after its sibling:
+    child = left[node] + (x > threshold). Leaves point at themselves with an
+    infinite threshold, so walking past a leaf stays put. Arrays from other
+    sources (older model files) fall back to the left/right select.
+    """
+
+    def __init__(self, classes, feature, threshold, left, right, value, roots, depth):
+        self.classes   = np.asarray(classes)
+        self.feature   = feature      # (n_nodes,) int32   split column
+        self.threshold = threshold    # (n_nodes,) float64 go left if x <= threshold
+        self.left      = left         # (n_nodes,) int32   leaves point at themselves
+        self.right     = right        # (n_nodes,) int32
+        self.value     = value        # (n_nodes, n_classes) class distribution
+        self.roots     = roots        # (n_trees,) int32   root node of each tree
+        self.depth     = int(depth)   # levels needed to reach every leaf
+        self.is_leaf   = left == np.arange(len(left))
+        self.paired    = bool(np.array_equal(right[~self.is_leaf], left[~self.is_leaf] + 1)
+                              and np.isinf(threshold[self.is_leaf]).all())
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_features(self):
+        return int(self.feature.max()) + 1
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for est in clf.estimators_:
+            t = est.tree_
+            order = _breadth_first(t.children_left, t.children_right)
+            n = len(order)
+            new = np.empty(n, dtype=np.int32)
+            new[order] = np.arange(n, dtype=np.int32)
+            cl, cr = t.children_left[order], t.children_right[order]
+            is_leaf = cl < 0
+            idx = np.arange(n, dtype=np.int32)
+
+            f = t.feature[order].astype(np.int32)
+            thr = t.threshold[order].astype(np.float64)
+            f[is_leaf] = 0
+            thr[is_leaf] = np.inf
+            l = np.where(is_leaf, idx, new[cl]).astype(np.int32) + offset
+            r = np.where(is_leaf, idx, new[cr]).astype(np.int32) + offset
+
+            # Normalise counts (older sklearn) or fractions (newer) to probabilities
+            v = t.value[order, 0, :].astype(np.float64)
+            v /= v.sum(axis=1, keepdims=True)
+
+            feature.append(f)
+            threshold.append(thr)
+            left.append(l)
+            right.append(r)
+            value.append(v)
+            roots.append(offset)
+            depth = max(depth, t.max_depth)
+            offset += n
+
+        return cls(
+            clf.classes_,
+            np.concatenate(feature),
+            np.concatenate(threshold),
+            np.concatenate(left),
+            np.concatenate(right),
+            np.concatenate(value),
+            np.array(roots, dtype=np.int32),
+            depth,
+        )
+
+    def leaves(self, x):
+        """Leaf node reached in every tree for one feature vector."""
+        # sklearn compares in float32, so round the same way to pick the same branch
+        x = np.asarray(x, dtype=np.float32).astype(np.float64).ravel()
+        node = self.roots
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        if self.paired:
+            for _ in range(self.depth):
+                node = left[node] + (x[feature[node]] > threshold[node])
+            return node
+        for _ in range(self.depth):
+            node = np.where(x[feature[node]] <= threshold[node], left[node], right[node])
+        return node
+
+    def predict_proba_one(self, x):
+        return self.value[self.leaves(x)].mean(axis=0)
+
+    def predict_proba(self, X, chunk=128):
+        """
+        Class probabilities for every row of X, all rows through all trees
+        at once. `chunk` rows at a time keep the working set in cache.
+        """
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        X = X.reshape(-1, X.shape[-1])
+        out = np.empty((len(X), self.value.shape[1]))
+        for start in range(0, len(X), chunk):
+            x = X[start:start + chunk]
+            out[start:start + chunk] = self.value[self.leaves_many(x)].mean(axis=1)
+        return out
+
+    def leaves_many(self, X, compact_every=3):
+        """
+        (rows, trees) leaf nodes for a float64 matrix already rounded like
+        leaves(). (row, tree) pairs that have reached a leaf are dropped
+        every `compact_every` levels, so deep trees don't drag every pair
+        down to max depth.
+        """
+        n, n_feat = X.shape
+        T = len(self.roots)
+        if not self.paired:
+            rows = np.arange(n)[:, None]
+            node = np.broadcast_to(self.roots, (n, T))
+            for _ in range(self.depth):
+                node = np.where(X[rows, self.feature[node]] <= self.threshold[node],
+                                self.left[node], self.right[node])
+            return node
+
+        x = X.ravel()
+        feature, threshold, left, is_leaf = self.feature, self.threshold, self.left, self.is_leaf
+        node = np.tile(self.roots, n)
+        base = np.repeat(np.arange(0, n * n_feat, n_feat, dtype=np.int32), T)
+        pair = np.arange(n * T, dtype=np.int32)
+        out = np.empty(n * T, dtype=np.int32)
+        for level in range(self.depth):
+            node = left[node] + (x[base + feature[node]] > threshold[node])
+            if level % compact_every == compact_every - 1:
+                done = is_leaf[node]
+                out[pair[done]] = node[done]
+                keep = ~done
+                node, base, pair = node[keep], base[keep], pair[keep]
+                if len(node) == 0:
+                    break
+        out[pair] = node
+        return out.reshape(n, T)
+
+    def node_depth(self):
+        """Depth of every node (roots are 0)."""
+        depth = np.zeros(len(self.feature), dtype=np.int32)
+        level = self.roots
+        d = 0
+        while len(level):
+            depth[level] = d
+            inner = level[~self.is_leaf[level]]
+            level = np.concatenate([self.left[inner], self.right[inner]])
+            d += 1
+        return depth
+
+    def truncate(self, n_trees=None, max_depth=None):
+        """
+        A smaller forest: the first `n_trees` trees (trees are independent
+        bootstrap fits, so any subset is a random one), each cut at
+        `max_depth` — nodes at the cut become leaves predicting their
+        training class distribution. Needs the breadth-first layout, where
+        the nodes above the cut are a prefix of every tree.
+        """
+        if not self.paired:
+            raise ValueError("truncate needs a forest exported by this version "
+                             "(breadth-first nodes) — retrain with step2_train_model.py")
+        n_trees = self.n_trees if n_trees is None else min(n_trees, self.n_trees)
+        max_depth = self.depth if max_depth is None else min(max_depth, self.depth)
+        depth = self.node_depth()
+        ends = np.append(self.roots[1:], len(self.feature))
+
+        keep, shift, roots = [], [], []
+        total = 0
+        for t in range(n_trees):
+            start = int(self.roots[t])
+            n = int(np.count_nonzero(depth[start:ends[t]] <= max_depth))
+            keep.append(np.arange(start, start + n))
+            shift.append(np.full(n, total - start))
+            roots.append(total)
+            total += n
+        keep, shift = np.concatenate(keep), np.concatenate(shift)
+
+        feature = self.feature[keep].copy()
+        threshold = self.threshold[keep].copy()
+        left = (self.left[keep] + shift).astype(np.int32)
+        right = (self.right[keep] + shift).astype(np.int32)
+        cut = (depth[keep] == max_depth) & ~self.is_leaf[keep]
+        idx = np.arange(len(keep), dtype=np.int32)
+        feature[cut] = 0
+        threshold[cut] = np.inf
+        left[cut] = idx[cut]
+        right[cut] = idx[cut]
+        return FlatForest(self.classes, feature, threshold, left, right,
+                          self.value[keep].copy(), np.array(roots, dtype=np.int32),
+                          min(max_depth, int(depth[keep].max())))
+
+    def predict_one(self, x):
+        """(label, confidence 0..1) for one feature vector."""
+        proba = self.predict_proba_one(x)
+        k = int(proba.argmax())
+        return self.classes[k], float(proba[k])
+
+
+def _breadth_first(children_left, children_right):
+    """Node ids of one sklearn tree in breadth-first order (siblings adjacent)."""
+    order = [0]
+    i = 0
+    while i < len(order):
+        n = order[i]
+        if children_left[n] >= 0:
+            order += (children_left[n], children_right[n])
+        i += 1
+    return np.array(order)
+
+
+# ── Parity + latency check ──
+if __name__ == "__main__":
+    import pickle
+    import time
+
+    import pandas as pd
+
+    from gesture_features import window_features
+
+    CSV_FILE   = "gesture_data.csv"
+    MODEL_FILE = "movement_model.pkl"
+
+    with open(MODEL_FILE, "rb") as f:
+        bundle = pickle.load(f)
+    clf = bundle["model"]
+    df = pd.read_csv(CSV_FILE)
+    X = np.concatenate([
+        window_features(g[bundle["feature_cols"]].values,
+                        bundle["window_size"], bundle["step_size"])
+        for _, g in df.groupby("label")
+    ])
+
+    t0 = time.perf_counter()
+    forest = FlatForest.from_sklearn(clf)
+    print(f"Exported {forest.n_trees} trees, {len(forest.feature)} nodes, "
+          f"depth {forest.depth} in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    ref_proba = clf.predict_proba(X)
+    ref_label = clf.classes_[ref_proba.argmax(axis=1)]
+    mismatch, max_err = 0, 0.0
+    for i, row in enumerate(X):
+        label, conf = forest.predict_one(row)
+        proba = forest.predict_proba_one(row)
+        mismatch += label != ref_label[i]
+        max_err = max(max_err, float(np.abs(proba - ref_proba[i]).max()))
+    print(f"Parity on {len(X)} windows: {mismatch} label mismatches, "
+          f"max |proba diff| = {max_err:.2e}")
+
+    t0 = time.perf_counter()
+    batch = forest.predict_proba(X)
+    t_batch = time.perf_counter() - t0
+    print(f"Batch predict_proba: max |proba diff| = {np.abs(batch - ref_proba).max():.2e}, "
+          f"{t_batch * 1000:.0f} ms for all windows ({t_batch / len(X) * 1e6:.0f} µs/window)")
+
+    clf.set_params(n_jobs=1)
+    row = X[:1]
+    n = 200
+    t0 = time.perf_counter()
+    for _ in range(n):
+        clf.predict(row)
+        clf.predict_proba(row)
+    t_sk = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for _ in range(n):
+        forest.predict_one(row)
+    t_flat = (time.perf_counter() - t0) / n
+    print(f"Single window: sklearn predict+predict_proba {t_sk * 1000:.2f} ms, "
+          f"FlatForest {t_flat * 1000:.3f} ms ({t_sk / t_flat:.0f}x)")
@@ -0,0 +1,493 @@
+"""
+Gesture → Mixxx controller logic shared by the live scripts and replay.py.
+
+MidiActions      volume / jog / scratch-note MIDI output for one deck
+GyroJog          scratch fast path: gyro rate → jog ticks on every sample
+GesturePipeline  samples → streaming features → model → confirmation →
+                 on-gesture action (MidiActions.handle_gesture, or just print)
+DeckGroup        several pipelines (one per glove/deck), one model call per tick
+
+Nothing here opens a serial or MIDI port; the scripts pass those in, so the
+same code can be driven by a recorded CSV (see replay.py).
+"""
+
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from forest_engine import FlatForest
+from gesture_features import StreamingFeatures
+from midi_protocol import FINE_MAX, FINE_STEPS, encode_jog, encode_jog_fine
+from midi_scheduler import MidiScheduler
+from model_file import is_model_file, load_model_file
+
+VOL_CC        = 7
+SCRATCH_NOTE  = 60
+SAMPLE_NOTE   = 65       # WearableTest.playSample
+MIDI_CH       = 0
+
+VOL_STEP      = 3
+JOG_TICK      = 6
+JOG_INTERVAL  = 0.05
+
+GYRO_JOG_AXIS          = 4       # sample column driving the jog (gyroY)
+GYRO_JOG_SIGN          = +1      # -1 if the platter turns the wrong way
+GYRO_JOG_TICKS_PER_RAD = 120.0   # jog ticks per radian of hand rotation
+GYRO_JOG_DEADZONE      = 0.08    # rad/s — resting noise is about 0.02
+
+# Gesture → (action name, *args): a MidiActions method, or one of its
+# plugins — or a tuple of such actions. Pass another table to MidiActions
+# to remap gestures.
+GESTURE_ACTIONS = {
+    "LEFT":  ("start_jog", -1),
+    "RIGHT": ("start_jog", +1),
+    "REST":  ("stop_jog",),
+    "NONE":  ("stop_jog",),
+    "UP":    ("change_volume", +VOL_STEP),
+    "DOWN":  ("change_volume", -VOL_STEP),
+}
+
+
+def clamp(v, lo, hi):
+    return lo if v < lo else hi if v > hi else v
+
+
+def load_model(model_file):
+    """
+    Load a step2 model as a bundle dict with a FlatForest under "forest".
+    Reads the sklearn-free .forest file (model_file.py) or the pickle.
+    """
+    if is_model_file(model_file):
+        return load_model_file(model_file)
+    with open(model_file, "rb") as f:
+        bundle = pickle.load(f)
+    bundle["forest"] = FlatForest.from_sklearn(bundle["model"])
+    return bundle
+
+
+def open_midi(port_name):
+    """Open the first rtmidi output whose name contains port_name."""
+    import rtmidi
+
+    midi = rtmidi.MidiOut()
+    ports = midi.get_ports()
+    port_index = next((i for i, name in enumerate(ports) if port_name in name), None)
+    if port_index is None:
+        raise RuntimeError(f"Could not find MIDI port '{port_name}'. Available: {ports}")
+    midi.open_port(port_index)
+    return midi, ports[port_index]
+
+
+# ── Scratch fast path ──
+class GyroJog:
+    """
+    Turns the gyro rate of each sample straight into jog steps while
+    engaged: steps = rate * dt * ticks_per_rad * fine_steps, fractions
+    carried over so slow turns still move. With `every` > 1 the move is
+    accumulated and sent every `every` samples. The resting bias is tracked
+    with a slow average of the quiet samples while disengaged, and frozen
+    while scratching.
+
+    fine_steps=1 gives CC16 ticks (±63); FINE_STEPS gives 14-bit fine
+    steps (midi_protocol.py).
+    """
+
+    def __init__(self, axis=GYRO_JOG_AXIS, sign=GYRO_JOG_SIGN,
+                 ticks_per_rad=GYRO_JOG_TICKS_PER_RAD, deadzone=GYRO_JOG_DEADZONE,
+                 sample_hz=100, bias_alpha=0.01, fine_steps=1, every=1):
+        self.axis = axis
+        self.fine_steps = fine_steps
+        self.scale = sign * ticks_per_rad * fine_steps / sample_hz
+        self.limit = 63 if fine_steps == 1 else FINE_MAX
+        self.deadzone = deadzone
+        self.bias_alpha = bias_alpha
+        self.every = every
+        self.bias = 0.0
+        self.carry = 0.0         # fraction of a step left over from the last message
+        self.moved = 0.0         # steps since the last message
+        self.pending = 0
+        self.engaged = False
+        self.ticks_sent = 0      # jog messages sent on the fast path
+
+    def engage(self):
+        self.engaged = True
+        self.carry = self.moved = 0.0
+        self.pending = 0
+
+    def release(self):
+        self.engaged = False
+
+    def update(self, sample):
+        """Jog delta (int, 0 = nothing to send) for one sample."""
+        rate = sample[self.axis]
+        if not self.engaged:
+            if abs(rate - self.bias) < self.deadzone:
+                self.bias += self.bias_alpha * (rate - self.bias)
+            return 0
+        rate -= self.bias
+        step = rate * self.scale if abs(rate) >= self.deadzone else 0.0
+        if step * self.carry < 0:
+            self.carry = 0.0            # reversed: don't pay off the old direction first
+        self.moved += step
+        self.pending += 1
+        if self.pending < self.every:
+            return 0
+        total = self.carry + self.moved
+        delta = int(round(total))       # the remainder waits for the next message
+        self.carry = total - delta if step else 0.0
+        self.moved = 0.0
+        self.pending = 0
+        return clamp(delta, -self.limit, self.limit)
+
+
+# ── MIDI actions ──
+class MidiActions:
+    """
+    All output goes through one MidiScheduler: immediate sends are
+    serialised with the jog ticks, which run from absolute deadlines on the
+    scheduler's thread. Pass a scheduler to share it (or to drive it from a
+    virtual clock in replay); otherwise one is started here.
+
+    With a GyroJog, LEFT/RIGHT engage scratching and on_sample() sends a
+    jog tick per sample that follows the hand; REST (or silence) releases
+    it. Without one, LEFT/RIGHT start fixed JOG_TICK ticks every JOG_INTERVAL.
+    hires=True sends jog moves as 14-bit fine steps (midi_protocol.py)
+    instead of CC16 ticks; the GyroJog must then count fine steps too.
+
+    `out` is where messages go: a MidiOutput (midi_output.py) to drop
+    redundant ones, or by default the scheduler itself.
+
+    handle_gesture() looks the label up in `table` (GESTURE_ACTIONS by
+    default); `plugins` maps extra action names to callables (and wins
+    over a method of the same name).
+    """
+
+    def __init__(self, midi, channel=MIDI_CH, verbose=True, scheduler=None, gyro_jog=None,
+                 hires=False, out=None, table=None):
+        self.midi = midi
+        self.channel = channel
+        self.verbose = verbose
+        self.scheduler = scheduler if scheduler is not None else MidiScheduler(midi).start()
+        self.out = out if out is not None else self.scheduler
+        self.gyro_jog = gyro_jog
+        self.hires = hires
+        self.table = table if table is not None else GESTURE_ACTIONS
+        self.plugins = {}
+        self.volume = 80
+        self.jog_direction = 0       # +1, -1, or 0
+        self.jog_lock = threading.Lock()
+
+    def send_cc(self, cc, value):
+        self.out.send([0xB0 + self.channel, cc & 0x7F, value & 0x7F])
+
+    def send_jog(self, delta):
+        """A relative jog move: fine steps if hires, else CC16 ticks."""
+        if self.hires:
+            self.out.send(encode_jog_fine(self.channel, delta))
+        else:
+            self.out.send(encode_jog(self.channel, delta))
+
+    def send_note_on(self):
+        self.out.send([0x90 + self.channel, SCRATCH_NOTE & 0x7F, 127])
+
+    def send_note_off(self):
+        self.out.send([0x80 + self.channel, SCRATCH_NOTE & 0x7F, 0])
+
+    def send_sample(self):
+        self.out.send([0x90 + self.channel, SAMPLE_NOTE, 127])
+        self.out.send([0x90 + self.channel, SAMPLE_NOTE, 0])
+
+    def jog_tick(self):
+        # Under jog_lock so a tick can't slip out after stop_jog's note-off
+        with self.jog_lock:
+            d = self.jog_direction
+            if d != 0:
+                self.send_jog(JOG_TICK * d * (FINE_STEPS if self.hires else 1))
+
+    def start_jog(self, direction, fixed=False):
+        """fixed=True: timer ticks even with a GyroJog (e.g. a held key)."""
+        with self.jog_lock:
+            already_running = self.jog_direction != 0
+            self.jog_direction = direction
+            if already_running:
+                return
+            self.send_note_on()
+            if self.gyro_jog is not None and not fixed:
+                self.gyro_jog.engage()
+            else:
+                self.scheduler.every(("jog", self.channel), JOG_INTERVAL, self.jog_tick)
+
+    def stop_jog(self):
+        with self.jog_lock:
+            self.jog_direction = 0
+            if self.gyro_jog is not None:
+                self.gyro_jog.release()
+            self.scheduler.cancel(("jog", self.channel))
+            self.send_note_off()
+
+    def on_sample(self, sample):
+        """
+        Fast path, every sample: jog tick from the gyro while scratching.
+        True if a tick was sent.
+        """
+        if self.gyro_jog is None:
+            return False
+        with self.jog_lock:
+            delta = self.gyro_jog.update(sample)
+            if delta:
+                self.send_jog(delta)
+                self.gyro_jog.ticks_sent += 1
+        return bool(delta)
+
+    def close(self):
+        """Stop the jog and send whatever the output layer is still holding."""
+        self.stop_jog()
+        if self.out is not self.scheduler:
+            self.out.flush()
+
+    def change_volume(self, delta):
+        self.volume = clamp(self.volume + delta, 0, 127)
+        self.send_cc(VOL_CC, self.volume)
+        if self.verbose:
+            print(f"  VOL {self.volume}")
+
+    def perform(self, action):
+        """Run (name, *args), or a tuple of them one after another."""
+        for name, *args in (action if isinstance(action[0], tuple) else (action,)):
+            fn = self.plugins.get(name) or getattr(self, name)
+            fn(*args)
+
+    def handle_gesture(self, label):
+        action = self.table.get(label)
+        if action is not None:
+            self.perform(action)
+
+
+# ── Classification + confirmation ──
+class GesturePipeline:
+    """
+    Streams samples into a feature window, classifies every `infer_every`
+    samples and hands the class probabilities to a decision rule
+    (decision.py). When the rule commits, `actions.handle_gesture` fires.
+
+    decider         ConfirmCountDecider, SequentialDecider, ...
+    actions         MidiActions, or None to only report decisions
+    on_decision     optional callback(sample_index, label, conf) for every
+                    confirmed gesture (and "REST" on silence) — used by replay
+    latency         optional latency.LatencyStats to time every stage
+    gate            optional motion_gate.MotionGate — windows with clearly no
+                    motion are called REST without running the forest
+    cadence         optional cadence.AdaptiveCadence / FixedCadence deciding
+                    per sample whether to classify; replaces `infer_every`
+    name            prefix for printed decisions, e.g. "[Deck 2] "
+    """
+
+    def __init__(self, forest, window_size, infer_every, decider,
+                 actions=None, display=None, verbose=True, on_decision=None,
+                 latency=None, gate=None, cadence=None, name=""):
+        self.forest = forest
+        self.classes = forest.classes
+        self.window_size = window_size
+        self.infer_every = infer_every
+        self.decider = decider
+        self.actions = actions
+        self.display = display or {}
+        self.verbose = verbose
+        self.on_decision = on_decision
+        self.latency = latency
+        self.gate = gate
+        self.cadence = cadence
+        self.name = name
+        self.batch = None        # set by DeckGroup: queue windows instead of predicting
+        self.fast_path = actions is not None and getattr(actions, "gyro_jog", None) is not None
+        if gate is not None:
+            if gate.rest_label not in list(self.classes):
+                raise ValueError(f"Motion gate label '{gate.rest_label}' is not a model class")
+            self.rest_proba = (self.classes == gate.rest_label).astype(float)
+
+        self.stream = StreamingFeatures(window_size)
+        self.sample_count = 0
+        self.windows = 0
+
+    def reset(self):
+        """Forget the window and decision state (e.g. after a reconnect)."""
+        self.stream.reset()
+        self.decider.reset()
+        if self.cadence is not None:
+            self.cadence.reset()
+
+    def push(self, sample, force=False, stamp=None):
+        """
+        Add one sample; classify if it's time (or `force` and the window is
+        full). The first full window is always classified, so startup doesn't
+        wait for the cadence. `stamp` = (t_ms, t_arrival, t_parsed) is only
+        used for latency.
+        """
+        self.stream.push(sample)
+        self.sample_count += 1
+        if self.fast_path and self.actions.on_sample(sample):
+            if self.latency is not None and stamp is not None:
+                self.latency.record_jog(stamp, time.perf_counter())
+        if self.cadence is not None:
+            due = self.cadence.due(sample)
+        else:
+            due = self.sample_count % self.infer_every == 0
+        if self.stream.ready and (force or due or self.stream.count == self.window_size):
+            self.classify_window(stamp)
+
+    def process(self, samples):
+        """Push a batch of samples in order (e.g. one decoder read)."""
+        stamp = None
+        if self.latency is not None:
+            stamp = (None, None, time.perf_counter())
+        for sample in samples:
+            self.push(sample, stamp=stamp)
+
+    def consume_ring(self, ring):
+        """
+        Take everything new from a SampleRing. If we've fallen more than a
+        window behind (slow prediction), jump to the newest window instead of
+        classifying stale ones.
+        """
+        behind = ring.pending > self.window_size
+        first, last = ring.consume(max_samples=self.window_size)
+        if behind:
+            self.stream.reset()
+        if self.latency is None:
+            for sample in ring.view(first, last):
+                self.push(sample, force=behind)
+            return
+        t_ms, arrival, parsed = (ring.view(first, last, a)
+                                 for a in (ring.t_ms, ring.arrival, ring.parsed))
+        for i, sample in enumerate(ring.view(first, last)):
+            self.push(sample, force=behind, stamp=(t_ms[i], arrival[i], parsed[i]))
+
+    def classify_window(self, stamp=None):
+        timed = self.latency is not None and stamp is not None
+        t_ready = t_feat = None
+        if timed:
+            t_ready = time.perf_counter()
+        feats = self.stream.features()
+        if timed:
+            t_feat = time.perf_counter()
+        proba = None
+        if self.gate is not None and self.gate.is_rest(feats):
+            proba = self.rest_proba
+        # With a variable cadence, a window counts for the fraction of the
+        # trained step it covers, so deciders keep their timing.
+        weight = 1.0
+        if self.cadence is not None:
+            weight = self.cadence.take_weight(self.infer_every)
+        if self.batch is not None:
+            # DeckGroup predicts every queued window in one call, then calls
+            # finish_window in order (gated ones too, to keep the order)
+            self.batch.append((self, feats, proba, weight, self.sample_count,
+                               stamp, t_ready, t_feat))
+            return
+        if proba is None:
+            proba = self.forest.predict_proba_one(feats)
+        self.finish_window(proba, weight, self.sample_count, stamp, t_ready, t_feat,
+                           time.perf_counter() if timed else None)
+
+    def finish_window(self, proba, weight, index, stamp=None, t_ready=None, t_feat=None,
+                      t_pred=None):
+        """Decide on the window ending at sample `index` and act on the decision."""
+        self.windows += 1
+        timed = self.latency is not None and stamp is not None
+        t_confirm = t_midi = None
+
+        decision = self.decider.update(proba, self.classes, weight)
+        if decision is not None:
+            label, conf, reason = decision
+            if timed:
+                t_confirm = time.perf_counter()
+            if reason == "silence":
+                if self.verbose:
+                    print(f"  {self.name}(no confident gesture — stopping)")
+                if self.actions is not None:
+                    self.actions.stop_jog()
+            else:
+                if self.actions is not None:
+                    self.actions.handle_gesture(label)
+                if self.verbose:
+                    print(f"  {self.name}{self.display.get(label, label)}  ({conf:.0f}%)")
+            if timed:
+                t_midi = time.perf_counter()
+            self._decided(index, label, conf)
+
+        if timed:
+            self.latency.record_window(stamp, t_ready, t_feat, t_pred, t_confirm, t_midi)
+
+    def _decided(self, index, label, conf):
+        if self.on_decision is not None:
+            self.on_decision(index, label, conf)
+
+
+# ── Several gloves, one model ──
+class DeckGroup:
+    """
+    One GesturePipeline per glove/deck, with the forest called once per tick
+    for all of them. Each pipeline keeps its own window, cadence and
+    decision state; classify_window only queues the window, and flush()
+    predicts the whole queue with FlatForest.predict_proba and hands each
+    result back in order.
+
+        group = DeckGroup(pipelines)
+        group.consume_rings(rings)      # live: one SampleRing per glove
+    """
+
+    def __init__(self, pipelines):
+        self.pipelines = list(pipelines)
+        self.forest = self.pipelines[0].forest
+        self.queue = []
+        self.ticks = 0
+        self.batch_rows = 0      # windows sent to the forest, summed over ticks
+        for p in self.pipelines:
+            if p.forest is not self.forest:
+                raise ValueError("All pipelines in a DeckGroup must share one model")
+            p.batch = self.queue
+
+    def consume_rings(self, rings):
+        for pipeline, ring in zip(self.pipelines, rings):
+            pipeline.consume_ring(ring)
+        self.flush()
+
+    def push(self, samples):
+        """One sample per pipeline (None to skip one), then flush — for replay."""
+        for pipeline, sample in zip(self.pipelines, samples):
+            if sample is not None:
+                pipeline.push(sample)
+        self.flush()
+
+    def flush(self):
+        if not self.queue:
+            return
+        queue = self.take()
+        self.finish(queue, self.predict(queue))
+
+    def take(self):
+        """Every queued window, leaving the queue empty."""
+        queue = self.queue[:]
+        self.queue.clear()
+        return queue
+
+    def predict(self, queue):
+        """Class probabilities for taken windows — no pipeline state, so any thread."""
+        todo = [i for i, entry in enumerate(queue) if entry[2] is None]
+        probas = [entry[2] for entry in queue]
+        if todo:
+            P = self.forest.predict_proba(np.stack([queue[i][1] for i in todo]))
+            for row, i in enumerate(todo):
+                probas[i] = P[row]
+            self.ticks += 1
+            self.batch_rows += len(todo)
+        return probas
+
+    def finish(self, queue, probas):
+        """Hand each window's probabilities back to its pipeline, in order."""
+        t_pred = time.perf_counter()
+        for entry, proba in zip(queue, probas):
+            pipeline, _, _, weight, index, stamp, t_ready, t_feat = entry
+            pipeline.finish_window(proba, weight, index, stamp, t_ready, t_feat, t_pred)
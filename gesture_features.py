@@ -0,0 +1,200 @@
+"""
+Window feature extraction shared by training and the live controllers.
+
+For every channel of a window we compute five numbers, in this order:
+  mean, std, min, max, range (max - min)
+so a 30x5 window becomes a 25-value feature vector. The order must never
+change — trained models depend on it.
+
+extract_features(window)   reference implementation (one window → list)
+feature_names(cols)        name of each position, saved with models
+window_features(data, ...) every window of a recording at once (training)
+stack_features(windows)    a stack of windows at once (gesture_model.py)
+StreamingFeatures          O(1)-per-sample version for the live loops
+"""
+
+from collections import deque
+
+import numpy as np
+
+FEATURE_NAMES = ("mean", "std", "min", "max", "range")
+FEATURES_PER_CHANNEL = len(FEATURE_NAMES)
+# Bump whenever the numbers above would come out differently, so cached
+# feature matrices (feature_cache.py) are recomputed
+FEATURE_VERSION = 1
+
+
+def feature_names(feature_cols):
+    """Column name of every feature, e.g. "accelX_mean" — the vector layout."""
+    return [f"{col}_{name}" for col in feature_cols for name in FEATURE_NAMES]
+
+
+def extract_features(window):
+    features = []
+    for col in range(window.shape[1]):
+        vals = window[:, col]
+        features += [
+            vals.mean(),
+            vals.std(),
+            vals.min(),
+            vals.max(),
+            vals.max() - vals.min(),
+        ]
+    return features
+
+
+def sliding_windows(data, window_size, step_size):
+    """
+    Read-only (n_windows, n_channels, window_size) view of `data` — window i
+    starts at row i * step_size, exactly like range(0, len - W + 1, step).
+    No data is copied.
+    """
+    data = np.asarray(data)
+    if len(data) < window_size:
+        return np.empty((0, data.shape[1], window_size), dtype=data.dtype)
+    views = np.lib.stride_tricks.sliding_window_view(data, window_size, axis=0)
+    return views[::step_size]
+
+
+def window_features(data, window_size, step_size, dtype=np.float64, chunk=8192):
+    """
+    Feature matrix for every window of `data` (rows = samples, cols = channels)
+    with no per-window Python work. Gives the same rows as calling
+    extract_features on each window in turn.
+
+    dtype=np.float32 halves the memory of the result (and of the temporaries).
+    Windows are reduced `chunk` at a time so the std temporaries stay bounded
+    on very long recordings.
+    """
+    data = np.ascontiguousarray(data, dtype=dtype)
+    return stack_features(sliding_windows(data, window_size, step_size), dtype, chunk)
+
+
+def stack_features(windows, dtype=np.float64, chunk=8192):
+    """
+    Feature matrix for a (n_windows, n_channels, window_size) stack, the
+    layout sliding_windows returns. Same rows as extract_features on each
+    window (transposed back to samples x channels).
+    """
+    n_win, n_ch = windows.shape[0], windows.shape[1]
+    X = np.empty((n_win, n_ch, FEATURES_PER_CHANNEL), dtype=dtype)
+    for start in range(0, n_win, chunk):
+        w = windows[start:start + chunk]
+        f = X[start:start + chunk]
+        lo = w.min(axis=-1)
+        hi = w.max(axis=-1)
+        f[..., 0] = w.mean(axis=-1)
+        f[..., 1] = w.std(axis=-1)
+        f[..., 2] = lo
+        f[..., 3] = hi
+        f[..., 4] = hi - lo
+    return X.reshape(n_win, n_ch * FEATURES_PER_CHANNEL)
+
+
+class StreamingFeatures:
+    """
+    Sliding-window features updated incrementally as each sample arrives.
+
+    Keeps per-channel running sums / sums of squares (taken relative to a
+    reference point so float cancellation stays small) and monotonic deques
+    for min/max. push() is O(1) amortised and features() needs no copy of
+    the window. Sums are recomputed exactly every `resync_every` samples so
+    rounding error can't creep up over a long set.
+    """
+
+    def __init__(self, window_size, n_channels=5, resync_every=1000):
+        self.window_size = window_size
+        self.n_channels = n_channels
+        self.resync_every = resync_every
+        self.ring = np.zeros((window_size, n_channels))
+        self.reset()
+
+    def reset(self):
+        self.count = 0          # samples pushed since reset
+        self.ref = np.zeros(self.n_channels)
+        self.s1 = np.zeros(self.n_channels)
+        self.s2 = np.zeros(self.n_channels)
+        self.max_q = [deque() for _ in range(self.n_channels)]
+        self.min_q = [deque() for _ in range(self.n_channels)]
+
+    @property
+    def n(self):
+        return min(self.count, self.window_size)
+
+    @property
+    def ready(self):
+        return self.count >= self.window_size
+
+    def push(self, sample):
+        x = np.asarray(sample, dtype=float)
+        i = self.count
+        slot = i % self.window_size
+
+        if i == 0:
+            self.ref = x.copy()
+        if i >= self.window_size:
+            d_old = self.ring[slot] - self.ref
+            self.s1 -= d_old
+            self.s2 -= d_old * d_old
+        d = x - self.ref
+        self.s1 += d
+        self.s2 += d * d
+        self.ring[slot] = x
+
+        oldest = i - self.window_size
+        for c in range(self.n_channels):
+            v = x[c]
+            q = self.max_q[c]
+            while q and q[-1][1] <= v:
+                q.pop()
+            q.append((i, v))
+            if q[0][0] <= oldest:
+                q.popleft()
+            q = self.min_q[c]
+            while q and q[-1][1] >= v:
+                q.pop()
+            q.append((i, v))
+            if q[0][0] <= oldest:
+                q.popleft()
+
+        self.count = i + 1
+        if self.count % self.resync_every == 0:
+            self._resync()
+
+    def _resync(self):
+        vals = self.ring[:self.n]
+        self.ref = vals.mean(axis=0)
+        d = vals - self.ref
+        self.s1 = d.sum(axis=0)
+        self.s2 = (d * d).sum(axis=0)
+
+    def stats(self):
+        """Per-channel (mean, std, min, max) arrays for the current window."""
+        n = self.n
+        m1 = self.s1 / n
+        var = np.maximum(self.s2 / n - m1 * m1, 0.0)
+        mean = self.ref + m1
+        lo = np.array([q[0][1] for q in self.min_q])
+        hi = np.array([q[0][1] for q in self.max_q])
+        return mean, np.sqrt(var), lo, hi
+
+    def features(self, out=None):
+        """Feature vector for the current window, same layout as extract_features."""
+        mean, std, lo, hi = self.stats()
+        if out is None:
+            out = np.empty(self.n_channels * FEATURES_PER_CHANNEL)
+        f = out.reshape(self.n_channels, FEATURES_PER_CHANNEL)
+        f[:, 0] = mean
+        f[:, 1] = std
+        f[:, 2] = lo
+        f[:, 3] = hi
+        f[:, 4] = hi - lo
+        return out
+
+    def window(self):
+        """Copy of the current window in arrival order (for debugging/checks)."""
+        n = self.n
+        if self.count <= self.window_size:
+            return self.ring[:n].copy()
+        start = self.count % self.window_size
+        return np.roll(self.ring, -start, axis=0)
@@ -0,0 +1,183 @@
+"""
+The gesture classifier as one object, for many windows at a time.
+
+GestureModel wraps a step2 model (FlatForest + motion gate + window
+settings) so offline tools don't need a GesturePipeline and a per-window
+loop:
+
+    model = GestureModel.load()                 # movement_model.forest
+    labels, conf = model.predict(windows)       # (n, WINDOW_SIZE, channels)
+    labels, conf = model.predict(X)             # or an (n, n_features) matrix
+    ends, labels, conf = model.predict_stream(data)     # a whole recording
+    decisions = model.decide_stream(data, decider)      # what the live loop decides
+
+Features are computed for the whole stack in one NumPy pass
+(gesture_features.stack_features), gated windows never reach the forest,
+and the rest go through FlatForest.predict_proba in one call.
+
+predict_stream() classifies the same windows as the live loop without an
+adaptive cadence: the first full window, then every STEP_SIZE samples.
+
+Run this file directly to check decide_stream against a full replay and
+time it:
+    python gesture_model.py [recording.csv]
+"""
+
+import numpy as np
+
+from gesture_controller import load_model
+from gesture_features import sliding_windows, stack_features
+from motion_gate import MotionGate
+
+
+class GestureModel:
+
+    def __init__(self, bundle, use_gate=True):
+        self.bundle = bundle
+        self.forest = bundle["forest"]
+        self.classes = self.forest.classes
+        self.window_size = bundle["window_size"]
+        self.step_size = bundle["step_size"]
+        self.feature_cols = list(bundle["feature_cols"])
+        self.n_features = bundle["n_features"]
+        self.gate = MotionGate.from_bundle(bundle) if use_gate else None
+        if self.gate is not None:
+            self.rest_proba = (self.classes == self.gate.rest_label).astype(float)
+
+    @classmethod
+    def load(cls, model_file="movement_model.forest", use_gate=True):
+        return cls(load_model(model_file), use_gate)
+
+    def features(self, windows):
+        """
+        Feature matrix for a stack of windows, (n, window_size, channels) —
+        rows are samples, like the CSV. One window on its own also works.
+        """
+        windows = np.asarray(windows, dtype=float)
+        if windows.ndim == 2:
+            windows = windows[None]
+        return stack_features(windows.transpose(0, 2, 1))
+
+    def _as_features(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim >= 2 and X.shape[-1] == self.n_features:
+            return X.reshape(-1, self.n_features)
+        return self.features(X)
+
+    def predict_proba(self, X):
+        """(n, n_classes) probabilities for a feature matrix or a stack of windows."""
+        X = self._as_features(X)
+        proba = np.empty((len(X), len(self.classes)))
+        todo = np.ones(len(X), dtype=bool)
+        if self.gate is not None:
+            todo = ~self.gate.rest_mask(X)
+            proba[~todo] = self.rest_proba
+        if todo.any():
+            proba[todo] = self.forest.predict_proba(X[todo])
+        return proba
+
+    def predict(self, X):
+        """(labels, confidence 0..1) for a feature matrix or a stack of windows."""
+        proba = self.predict_proba(X)
+        k = proba.argmax(axis=1)
+        return self.classes[k], proba[np.arange(len(k)), k]
+
+    def window_ends(self, n_samples):
+        """
+        Sample counts (1-based, like GesturePipeline.sample_count) at which
+        the live loop classifies: the first full window, then every multiple
+        of STEP_SIZE.
+        """
+        W, step = self.window_size, self.step_size
+        if n_samples < W:
+            return np.empty(0, dtype=int)
+        first_step = -(-W // step) * step
+        ends = np.arange(first_step, n_samples + 1, step)
+        if first_step != W:
+            ends = np.concatenate([[W], ends])
+        return ends
+
+    def stream_features(self, data):
+        """(window ends, feature matrix) for every window predict_stream classifies."""
+        data = self._stream_values(data)
+        ends = self.window_ends(len(data))
+        windows = sliding_windows(data, self.window_size, 1)[ends - self.window_size]
+        return ends, stack_features(windows)
+
+    def predict_stream(self, data):
+        """
+        Classify a whole recording (DataFrame or samples x channels array)
+        in one call. Returns (window ends, labels, confidence 0..1).
+        """
+        ends, X = self.stream_features(data)
+        labels, conf = self.predict(X)
+        return ends, labels, conf
+
+    def decide_stream(self, data, decider):
+        """
+        Run `decider` (decision.py) over a whole recording, batching the
+        model calls. Returns [(sample_index, label, conf)] — the on_decision
+        calls the live loop would have made.
+        """
+        ends, X = self.stream_features(data)
+        decider.reset()
+        decisions = []
+        for index, proba in zip(ends, self.predict_proba(X)):
+            decision = decider.update(proba, self.classes)
+            if decision is not None:
+                decisions.append((int(index), decision[0], decision[1]))
+        return decisions
+
+    def _stream_values(self, data):
+        if hasattr(data, "columns"):
+            data = data[self.feature_cols].to_numpy()
+        return np.ascontiguousarray(data, dtype=float)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    import pandas as pd
+
+    import scratch_arduino
+    from cadence import FixedCadence
+    from decision import make_session
+    from replay import SAMPLE_HZ, replay
+
+    model = GestureModel.load()
+    if len(sys.argv) > 1:
+        session = pd.read_csv(sys.argv[1])
+    else:
+        df = pd.read_csv("gesture_data.csv")
+        session = pd.concat([make_session(df, seed=s) for s in range(3)], ignore_index=True)
+    print(f"Session: {len(session)} samples ({len(session) / SAMPLE_HZ:.0f} s)")
+
+    for mode in ("confirm", "sequential"):
+        t0 = time.perf_counter()
+        decisions = model.decide_stream(session, scratch_arduino.make_decider(mode))
+        t_batch = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ref = replay(session, bundle=model.bundle, decider=scratch_arduino.make_decider(mode),
+                     cadence=FixedCadence(model.step_size))
+        t_live = time.perf_counter() - t0
+        same = [(i, label) for i, label, _ in decisions] == \
+               [(i, label) for i, label, _ in ref.decisions]
+        print(f"{mode:<10s}: {len(decisions)} decisions, identical to replay: {same}   "
+              f"batched {t_batch * 1000:.0f} ms vs per-window replay {t_live * 1000:.0f} ms")
+
+    ends, X = model.stream_features(session)
+    t0 = time.perf_counter()
+    model.forest.predict_proba(X)
+    t_one = time.perf_counter() - t0
+    print(f"\nForest on all {len(X)} windows in one call: {t_one * 1000:.0f} ms "
+          f"({t_one / len(X) * 1e6:.0f} µs/window)")
+    for n in (1, 2, 4):
+        reps = 200
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            model.forest.predict_proba(X[:n])
+        t_call = (time.perf_counter() - t0) / reps
+        print(f"  {n} window(s) per call (DeckGroup tick): {t_call * 1000:.2f} ms "
+              f"({t_call / n * 1000:.2f} ms/window)")
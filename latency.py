@@ -0,0 +1,167 @@
+"""
+Per-stage latency histograms for the glove → Mixxx pipeline.
+
+Stages, for the sample that completes each classified window:
+
+  transit    host arrival vs firmware t_ms, relative to the best seen so far
+             (the two clocks aren't synced, so this is jitter/backlog, not
+             absolute cable delay)
+  parse      serial bytes read → decoded into a sample
+  queue      decoded → picked up by the classifier loop (window ready)
+  features   window ready → feature vector done
+  predict    features → model prediction done
+  confirm    prediction → confirmation passed (only windows that fire a gesture)
+  midi       confirmation → handle_gesture / midi.send_message returned
+  to_decision  serial arrival → prediction done (every window)
+  to_midi      serial arrival → MIDI sent (windows that fire a gesture)
+  jog          serial arrival → jog tick sent by the scratch fast path
+               (GyroJog — every sample while scratching, no window/model)
+
+Each stage is a fixed log-spaced histogram (1 µs … 10 s, ~12% wide bins), so
+recording is a couple of float ops and an int increment, and p50/p95/p99 are
+read off the cumulative counts. Pass latency=None to the pipeline (the
+default) and none of this runs.
+
+StartupTimer logs one-off milestones instead: time from launch to the port
+being open, the first sample, and the first decision.
+"""
+
+import math
+import time
+
+STAGES = ("transit", "parse", "queue", "features", "predict", "confirm", "midi",
+          "to_decision", "to_midi", "jog")
+
+_LOG_MIN = -6.0          # 1 µs
+_LOG_MAX = 1.0           # 10 s
+_PER_DECADE = 20
+_N_BINS = int((_LOG_MAX - _LOG_MIN) * _PER_DECADE) + 2
+
+
+class LatencyHistogram:
+
+    def __init__(self):
+        self.counts = [0] * _N_BINS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= 1e-6:
+            i = 0
+        else:
+            i = min(int((math.log10(seconds) - _LOG_MIN) * _PER_DECADE) + 1, _N_BINS - 1)
+        self.counts[i] += 1
+        self.n += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper edge of the bin holding the p-th percentile, in seconds."""
+        if self.n == 0:
+            return float("nan")
+        target = p / 100.0 * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(10 ** (_LOG_MIN + i / _PER_DECADE), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else float("nan")
+
+
+class LatencyStats:
+    """
+    One histogram per stage. dump_every=N prints the table every N seconds
+    (checked whenever a window is recorded); dump() prints it on demand.
+    """
+
+    def __init__(self, dump_every=None):
+        self.hist = {stage: LatencyHistogram() for stage in STAGES}
+        self.dump_every = dump_every
+        self.last_dump = time.perf_counter()
+        self._transit_base = None
+
+    def add(self, stage, seconds):
+        self.hist[stage].add(seconds)
+
+    def record_window(self, stamp, t_ready, t_feat, t_pred, t_confirm=None, t_midi=None):
+        """
+        stamp = (t_ms, t_arrival, t_parsed) of the sample that completed the
+        window; t_ms / t_arrival may be None when there's no serial reader.
+        """
+        t_ms, t_arrival, t_parsed = stamp
+        if t_ms is not None and t_arrival is not None:
+            offset = t_arrival - t_ms / 1000.0
+            base = self._transit_base
+            if base is None or offset < base or offset - base > 1.0:
+                # First sample, a faster one, or the board restarted its clock
+                base = self._transit_base = offset
+            self.add("transit", offset - base)
+        if t_arrival is not None:
+            self.add("parse", t_parsed - t_arrival)
+        start = t_arrival if t_arrival is not None else t_parsed
+        self.add("queue", t_ready - t_parsed)
+        self.add("features", t_feat - t_ready)
+        self.add("predict", t_pred - t_feat)
+        self.add("to_decision", t_pred - start)
+        if t_confirm is not None:
+            self.add("confirm", t_confirm - t_pred)
+            self.add("midi", t_midi - t_confirm)
+            self.add("to_midi", t_midi - start)
+
+        if self.dump_every and t_pred - self.last_dump >= self.dump_every:
+            self.last_dump = t_pred
+            self.dump()
+
+    def record_jog(self, stamp, t_sent):
+        """A fast-path jog tick sent at t_sent for the sample stamped `stamp`."""
+        _, t_arrival, t_parsed = stamp
+        self.add("jog", t_sent - (t_arrival if t_arrival is not None else t_parsed))
+
+    def report(self):
+        lines = [f"{'stage':<12s} {'n':>7s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}"]
+        for stage in STAGES:
+            h = self.hist[stage]
+            if h.n == 0:
+                continue
+            cells = [_fmt(h.percentile(p)) for p in (50, 95, 99)] + [_fmt(h.max)]
+            lines.append(f"{stage:<12s} {h.n:>7d} " + " ".join(f"{c:>9s}" for c in cells))
+        return "\n".join(lines)
+
+    def dump(self):
+        print("\n── Latency ──")
+        print(self.report())
+        print()
+
+
+def _fmt(seconds):
+    if seconds != seconds:    # nan
+        return "-"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f} µs"
+    return f"{seconds * 1e3:.2f} ms"
+
+
+class StartupTimer:
+    """
+    Milestones since launch (model loaded, port open, first sample, first
+    decision...). mark() records and prints each one the first time only,
+    so it's safe to call from the live loop.
+    """
+
+    def __init__(self, verbose=True):
+        self.t0 = time.perf_counter()
+        self.verbose = verbose
+        self.marks = {}
+
+    def mark(self, name):
+        if name in self.marks:
+            return
+        self.marks[name] = time.perf_counter() - self.t0
+        if self.verbose:
+            print(f"⏱  {name}: {self.marks[name] * 1e3:.0f} ms after launch")
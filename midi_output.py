@@ -0,0 +1,136 @@
+"""
+Coalescing MIDI output between the controllers and the port.
+
+MidiActions and scratch.py send through a MidiOutput, which hands messages
+to the MidiScheduler unless they would be redundant:
+
+  absolute CCs   (volume, ...) at most one per control per `slice` seconds:
+                 the first goes straight out; later ones in the same slice
+                 only keep the newest value, sent when the slice ends
+  repeats        a CC with the value already sent on that control
+  note-off       for a note that isn't on (stop_jog when nothing was
+                 running); a note-on for a note that's already on
+  relative       jog CC16 ticks and 14-bit fine jog moves are never merged
+                 or dropped — they go out at once, in order
+
+Anything else passes straight through. CCs whose slices end together go
+out as one batch (one scheduler lock). `sent` and `suppressed` count what
+happened to every message.
+
+    out = MidiOutput(scheduler)
+    out.send([0xB0, 7, 83])
+    out.flush()                     # on exit: whatever is still held
+
+The checks against a recording MIDI sink are in tests/test_midi_output.py.
+"""
+
+import threading
+
+from midi_protocol import JOG_CC
+
+COALESCE_SLICE = 0.010       # s — shortest gap between two values of one CC
+
+
+class MidiOutput:
+
+    def __init__(self, scheduler, slice_s=COALESCE_SLICE, relative_ccs=(JOG_CC,)):
+        self.scheduler = scheduler
+        self.clock = scheduler.clock
+        self.slice = slice_s
+        self.relative_ccs = set(relative_ccs)
+        self.lock = threading.Lock()
+        self.last_value = {}     # (status, cc) → value last sent
+        self.last_time = {}      # (status, cc) → when it was sent
+        self.held = {}           # (status, cc) → [message, due], waiting for its slice
+        self.notes_on = set()    # (channel, note)
+        self.sent = 0
+        self.suppressed = {"coalesced": 0, "repeated": 0, "note-off": 0, "note-on": 0}
+        self._flush_at = None
+        self._key = ("coalesce", id(self))
+
+    def send(self, message):
+        kind = message[0] & 0xF0
+        with self.lock:
+            if kind == 0xB0 and message[1] not in self.relative_ccs:
+                self._cc(list(message))
+            elif kind in (0x80, 0x90) and not self._note(message):
+                return
+            else:
+                self._out([message])
+
+    def _cc(self, message):
+        key = (message[0], message[1])
+        held = self.held.get(key)
+        if held is not None:
+            held[0] = message
+            self.suppressed["coalesced"] += 1
+            return
+        if self.last_value.get(key) == message[2]:
+            self.suppressed["repeated"] += 1
+            return
+        now = self.clock()
+        last = self.last_time.get(key)
+        if last is None or now - last >= self.slice:
+            self._out([message], now)
+            return
+        due = last + self.slice
+        self.held[key] = [message, due]
+        if self._flush_at is None or due < self._flush_at:
+            self._flush_at = due
+            self.scheduler.call_at(due, self._flush_due, key=self._key)
+
+    def _note(self, message):
+        """True if the note message should go out."""
+        key = (message[0] & 0x0F, message[1])
+        if message[0] & 0xF0 == 0x90 and message[2] > 0:
+            if key in self.notes_on:
+                self.suppressed["note-on"] += 1
+                return False
+            self.notes_on.add(key)
+            return True
+        if key not in self.notes_on:
+            self.suppressed["note-off"] += 1
+            return False
+        self.notes_on.discard(key)
+        return True
+
+    def _out(self, messages, now=None):
+        self.scheduler.send_many(messages)
+        self.sent += len(messages)
+        now = self.clock() if now is None else now
+        for msg in messages:
+            if msg[0] & 0xF0 == 0xB0:
+                self.last_value[(msg[0], msg[1])] = msg[2]
+                self.last_time[(msg[0], msg[1])] = now
+
+    def flush(self, force=True):
+        """
+        Send the held CCs whose slice has ended (every one with force=True,
+        the default — e.g. on exit). Runs on the scheduler when a slice ends.
+        """
+        with self.lock:
+            now = self.clock()
+            batch = []
+            for key, (msg, due) in list(self.held.items()):
+                if force or due <= now:
+                    del self.held[key]
+                    if self.last_value.get(key) == msg[2]:
+                        self.suppressed["repeated"] += 1     # moved back to the sent value
+                    else:
+                        batch.append(msg)
+            if batch:
+                self._out(batch, now)
+            self._flush_at = None
+            if self.held:
+                self._flush_at = min(due for _, due in self.held.values())
+                self.scheduler.call_at(self._flush_at, self._flush_due, key=self._key)
+
+    def _flush_due(self):
+        self.flush(force=False)
+
+    def report(self):
+        total = sum(self.suppressed.values())
+        detail = ", ".join(f"{k} {v}" for k, v in self.suppressed.items() if v)
+        line = f"MIDI output: {self.sent} sent, {total} suppressed"
+        return f"{line} ({detail})" if total else line
+
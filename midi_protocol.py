@@ -0,0 +1,108 @@
+"""
+Jog messages from the controllers to WearableTest-scripts.js.
+
+Two encodings of a relative jog move (a signed number of steps):
+
+  coarse  CC16, 64 + ticks                      ±63 ticks    → WearableTest.jogTick
+  fine    pitch bend, 8192 + steps as 14 bits   ±8191 steps  → WearableTest.jogTickFine
+          [0xE0 | channel, steps & 0x7F, steps >> 7]
+
+One coarse tick is FINE_STEPS fine steps. The JS enables scratching with
+FINE_STEPS times as many intervals per revolution, so a CC16 tick still
+turns the platter exactly as far as before. A fine message carries a move
+up to 128x larger than a CC16 one at 1/FINE_STEPS of its resolution, so a
+message every couple of samples follows the hand more closely than a
+coarse tick on every sample.
+
+Run this file directly to replay gesture_data.csv through both encodings
+(messages per second vs how closely the platter follows the hand); the
+encoder checks are in tests/test_midi_protocol.py:
+    python midi_protocol.py
+"""
+
+JOG_CC = 16
+PITCH_BEND = 0xE0
+FINE_STEPS = 16          # must match WearableTest.fineSteps in the JS
+FINE_CENTER = 8192
+FINE_MAX = 8191
+
+
+def encode_jog(channel, ticks):
+    """CC16 message for a coarse move of `ticks` (clamped to ±63)."""
+    return [0xB0 | channel, JOG_CC, min(max(64 + ticks, 1), 127)]
+
+
+def encode_jog_fine(channel, steps):
+    """14-bit pitch-bend message for a fine move of `steps` (clamped to ±8191)."""
+    value = FINE_CENTER + min(max(steps, -FINE_MAX), FINE_MAX)
+    return [PITCH_BEND | channel, value & 0x7F, value >> 7]
+
+
+def decode_jog(message):
+    """
+    Fine steps a jog message moves the platter, as the JS handlers read it,
+    or None if it isn't a jog message.
+    """
+    kind = message[0] & 0xF0
+    if kind == 0xB0 and message[1] == JOG_CC:
+        return (message[2] - 64) * FINE_STEPS
+    if kind == PITCH_BEND:
+        return ((message[2] << 7) | message[1]) - FINE_CENTER
+    return None
+
+
+if __name__ == "__main__":
+    import numpy as np
+    import pandas as pd
+
+    from gesture_controller import GyroJog
+    from replay import FEATURE_COLS, SAMPLE_HZ, replay
+
+    # ── Replay the recorded scratches through each encoding ──
+    # GyroJog engaged on the recorded LEFT/RIGHT stretches; the platter
+    # position the JS would reach (decoded messages) against the unrounded
+    # hand rotation.
+    df = pd.read_csv("gesture_data.csv")
+    samples = df[FEATURE_COLS].to_numpy()
+    scratching = df["label"].isin(["LEFT", "RIGHT"]).to_numpy()
+    seconds = scratching.sum() / SAMPLE_HZ
+    modes = [("CC16, every sample", False, 1), ("14-bit, every sample", True, 1),
+             ("14-bit, every 2", True, 2), ("14-bit, every 4", True, 4)]
+    print(f"{seconds:.0f} s of recorded scratching:")
+    print(f"{'jog messages':<22s} {'msg/s':>6s} {'bytes/s':>7s} {'max move':>8s} "
+          f"{'error rms':>9s} {'error max':>9s}   (moves and errors in CC16 ticks)")
+    for name, hires, every in modes:
+        jog = GyroJog(fine_steps=FINE_STEPS if hires else 1, every=every)
+        ideal = position = 0.0
+        errors, moves, messages = [], [], 0
+        for sample, on in zip(samples, scratching):
+            if on and not jog.engaged:
+                jog.engage()
+            elif not on and jog.engaged:
+                jog.release()
+            rate = sample[jog.axis] - jog.bias
+            delta = jog.update(sample)
+            if not on:
+                continue
+            if abs(rate) >= jog.deadzone:
+                ideal += rate * jog.scale / jog.fine_steps
+            if delta:
+                msg = encode_jog_fine(0, delta) if hires else encode_jog(0, delta)
+                position += decode_jog(msg) / FINE_STEPS
+                moves.append(abs(delta) / jog.fine_steps)
+                messages += 1
+            errors.append(ideal - position)
+        errors = np.abs(errors)
+        print(f"{name:<22s} {messages / seconds:>6.0f} {3 * messages / seconds:>7.0f} "
+              f"{max(moves) if moves else 0:>8.1f} {np.sqrt(np.mean(errors ** 2)):>9.3f} "
+              f"{errors.max():>9.3f}")
+
+    # ── Full controller: every jog message it emits decodes ──
+    for hires in (False, True):
+        result = replay(df, gyro_jog=True, jog_hires=hires)
+        jog = [decode_jog(m) for _, m in result.midi]
+        jog = [j for j in jog if j is not None]
+        assert jog and all(j != 0 for j in jog)
+        print(f"replay, {'14-bit' if hires else 'CC16'}: {len(jog)} jog messages, "
+              f"{len(jog) / seconds:.0f}/s while scratching, platter moved "
+              f"{sum(jog) / FINE_STEPS:+.1f} ticks")
@@ -0,0 +1,207 @@
+"""
+One long-lived thread for every timed MIDI event.
+
+Jog ticks, note on/off and future events (volume ramps, sample retriggers)
+all go through a MidiScheduler instead of a thread per jog. Periodic events
+run from absolute deadlines (next = previous deadline + period), so the tick
+rate doesn't drift by however long a send takes; if the thread falls more
+than a whole period behind, the missed ticks are dropped and counted rather
+than sent in a burst.
+
+All sends — scheduled or immediate — go through one lock, so a note-off can
+never land in the middle of a tick.
+
+    sched = MidiScheduler(midi).start()
+    sched.every("jog", 0.05, tick)            # 20 Hz until cancelled
+    sched.send_after(0.2, [0x90, 65, 0])      # timed event
+    sched.cancel("jog")
+
+For replay, leave it unstarted and call run_pending(now) with a virtual clock.
+LoopScheduler runs the same events as a task on an asyncio loop (runtime.py).
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from latency import LatencyHistogram
+
+
+class MidiScheduler:
+
+    def __init__(self, midi, clock=time.perf_counter):
+        self.midi = midi
+        self.clock = clock
+        self.lateness = LatencyHistogram()   # actual run time - deadline
+        self.sent = 0
+        self.missed = 0                      # periodic ticks skipped after falling behind
+        self._heap = []
+        self._keys = {}                      # key → live entry
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._out_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    # ── Sending ──
+    def send(self, message):
+        """Send now, serialised with every scheduled send."""
+        with self._out_lock:
+            self.midi.send_message(message)
+            self.sent += 1
+
+    def send_many(self, messages):
+        """Send several messages back to back under one lock."""
+        with self._out_lock:
+            for message in messages:
+                self.midi.send_message(message)
+                self.sent += 1
+
+    # ── Scheduling ──
+    def call_at(self, when, fn, key=None, period=None):
+        """
+        Run fn() at clock time `when` (on the scheduler thread). With
+        `period`, keep running it every `period` seconds. A `key` replaces any
+        pending event with the same key and lets it be cancelled.
+        """
+        # entry = [deadline, seq, fn, period, key, cancelled]
+        entry = [when, next(self._seq), fn, period, key, False]
+        with self._cond:
+            if key is not None:
+                old = self._keys.pop(key, None)
+                if old is not None:
+                    old[5] = True
+                self._keys[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+        return entry
+
+    def call_after(self, delay, fn, key=None, period=None):
+        return self.call_at(self.clock() + delay, fn, key, period)
+
+    def every(self, key, period, fn, first_delay=0.0):
+        """Run fn() every `period` seconds, starting after `first_delay`."""
+        return self.call_after(first_delay, fn, key, period)
+
+    def send_at(self, when, message, key=None):
+        return self.call_at(when, lambda: self.send(message), key)
+
+    def send_after(self, delay, message, key=None):
+        return self.call_after(delay, lambda: self.send(message), key)
+
+    def ramp_cc(self, channel, cc, start, end, duration, steps=16, key=None):
+        """Send CC values from start to end over `duration` seconds."""
+        t0 = self.clock()
+        for i in range(steps + 1):
+            value = round(start + (end - start) * i / steps)
+            msg = [0xB0 + channel, cc & 0x7F, max(0, min(127, value))]
+            self.send_at(t0 + duration * i / steps, msg,
+                         None if key is None else (key, i))
+
+    def cancel(self, key):
+        with self._cond:
+            entry = self._keys.pop(key, None)
+            if entry is not None:
+                entry[5] = True
+
+    def pending(self, key):
+        with self._cond:
+            return key in self._keys
+
+    # ── Running ──
+    def run_pending(self, now=None):
+        """Run everything due at `now`; returns the next deadline (or None)."""
+        if now is None:
+            now = self.clock()
+        while True:
+            with self._cond:
+                while self._heap and self._heap[0][5]:
+                    heapq.heappop(self._heap)
+                if not self._heap or self._heap[0][0] > now:
+                    return self._heap[0][0] if self._heap else None
+                entry = heapq.heappop(self._heap)
+                deadline, _, fn, period, key, _ = entry
+                if period is not None:
+                    nxt = deadline + period
+                    if nxt <= now:
+                        skipped = int((now - nxt) // period) + 1
+                        self.missed += skipped
+                        nxt += skipped * period
+                    entry[0] = nxt
+                    entry[1] = next(self._seq)
+                    heapq.heappush(self._heap, entry)
+                elif key is not None and self._keys.get(key) is entry:
+                    del self._keys[key]
+            self.lateness.add(max(0.0, self.clock() - deadline))
+            fn()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            nxt = self.run_pending()
+            with self._cond:
+                if self._stopping:
+                    return
+                if self._heap and self._heap[0][0] <= self.clock():
+                    continue
+                timeout = None if nxt is None else max(0.0, nxt - self.clock())
+                self._cond.wait(timeout)
+                if self._stopping:
+                    return
+
+    def report(self):
+        h = self.lateness
+        if h.n == 0:
+            return f"MIDI scheduler: {self.sent} sent"
+        return (f"MIDI scheduler: {self.sent} sent, {h.n} events, {self.missed} missed ticks, "
+                f"lateness p50 {h.percentile(50) * 1e3:.2f} ms  "
+                f"p99 {h.percentile(99) * 1e3:.2f} ms  max {h.max * 1e3:.2f} ms")
+
+
+class LoopScheduler(MidiScheduler):
+    """
+    A MidiScheduler driven by `await scheduler.run()` on an asyncio loop
+    instead of its own thread. Events can still be scheduled from any
+    thread; they wake the loop.
+    """
+
+    def __init__(self, midi, clock=time.perf_counter):
+        super().__init__(midi, clock)
+        self._loop = None
+        self._wake = None
+
+    def call_at(self, when, fn, key=None, period=None):
+        entry = super().call_at(when, fn, key, period)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return entry
+
+    def stop(self):
+        super().stop()
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while not self._stopping:
+            self._wake.clear()
+            nxt = self.run_pending()
+            timeout = None if nxt is None else max(0.0, nxt - self.clock())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,196 @@
+"""
+Memory-mappable model file — the live controllers' model, without sklearn.
+
+movement_model.pkl needs scikit-learn to unpickle and rebuilds every tree
+object before the controller can start. step2_train_model.py also writes
+movement_model.forest: the FlatForest arrays and the bundle metadata in one
+file that loads in milliseconds with only NumPy.
+
+Layout (little-endian):
+
+    8 bytes   magic  b"GFOREST\\0"
+    u32       format version
+    u32       header length in bytes
+    u32       CRC-32 of the header and every array
+    ...       header: UTF-8 JSON — classes, window/step size, feature
+              columns, feature layout, motion gate, and for every array its
+              dtype, shape and byte offset
+    ...       raw C-order arrays, each starting on a 64-byte boundary
+
+Arrays are opened with np.memmap(mode="r"), so only the pages the forest
+actually touches are read.
+
+load_model_file() refuses a file whose feature layout (names of the
+feature-vector positions, gesture_features.feature_names) isn't what this
+code computes, instead of silently feeding the forest the wrong columns.
+
+    python model_file.py [movement_model.forest]   inspect + time a load
+"""
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from forest_engine import FlatForest
+from gesture_features import FEATURES_PER_CHANNEL, feature_names
+
+MAGIC = b"GFOREST\0"
+VERSION = 1
+ALIGN = 64
+PREFIX = struct.Struct("<8sIII")   # magic, version, header length, crc32
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class ModelFileError(ValueError):
+    """The model file is damaged, too new, or doesn't match this code."""
+
+
+def is_model_file(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _pad(n):
+    return -n % ALIGN
+
+
+def save_model_file(path, bundle, forest=None):
+    """
+    Write `bundle` (the step2 dict) as a model file. `forest` defaults to
+    bundle["forest"], or is exported from bundle["model"].
+    """
+    if forest is None:
+        forest = bundle.get("forest") or FlatForest.from_sklearn(bundle["model"])
+    arrays = {name: np.ascontiguousarray(getattr(forest, name)) for name in ARRAYS}
+
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset += a.nbytes + _pad(a.nbytes)
+
+    header = {
+        "classes": [str(c) for c in forest.classes],
+        "window_size": int(bundle["window_size"]),
+        "step_size": int(bundle["step_size"]),
+        "feature_cols": list(bundle["feature_cols"]),
+        "feature_layout": feature_names(bundle["feature_cols"]),
+        "n_features": int(bundle["n_features"]),
+        "depth": forest.depth,
+        "motion_gate": bundle.get("motion_gate"),
+        "arrays": layout,
+    }
+    head = json.dumps(header).encode()
+    head += b" " * _pad(PREFIX.size + len(head))
+
+    body = [head]
+    for a in arrays.values():
+        body += [a.data, b"\0" * _pad(a.nbytes)]
+    crc = 0
+    for chunk in body:
+        crc = zlib.crc32(chunk, crc)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(head), crc))
+        for chunk in body:
+            f.write(chunk)
+    os.replace(tmp, path)   # never leave a half-written model for the controller
+
+
+def load_model_file(path, verify=True):
+    """
+    Open a model file as a bundle dict (same keys as the pickle, with
+    "forest" attached and no "model"). `verify` checks the CRC, which reads
+    the whole file once.
+    """
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(mm) < PREFIX.size:
+        raise ModelFileError(f"{path}: too short to be a model file")
+    magic, version, head_len, crc = PREFIX.unpack(bytes(mm[:PREFIX.size]))
+    if magic != MAGIC:
+        raise ModelFileError(f"{path}: not a model file (bad magic)")
+    if version > VERSION:
+        raise ModelFileError(f"{path}: format version {version}, this code reads up to "
+                             f"{VERSION} — update the controller scripts")
+    data_start = PREFIX.size + head_len
+    if verify and zlib.crc32(mm[PREFIX.size:]) != crc:
+        raise ModelFileError(f"{path}: checksum mismatch — file is damaged, "
+                             f"re-run step2_train_model.py")
+    header = json.loads(bytes(mm[PREFIX.size:data_start]))
+
+    _check_layout(path, header)
+
+    arrays = {}
+    for name in ARRAYS:
+        spec = header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        start = data_start + spec["offset"]
+        if start + count * dtype.itemsize > len(mm):
+            raise ModelFileError(f"{path}: truncated (array '{name}')")
+        # Plain ndarray over the mapping: np.memmap's subclass overhead on
+        # every fancy index would double the per-window predict time
+        arrays[name] = np.frombuffer(mm, dtype, count, start).reshape(spec["shape"])
+
+    forest = FlatForest(np.array(header["classes"]), arrays["feature"], arrays["threshold"],
+                        arrays["left"], arrays["right"], arrays["value"], arrays["roots"],
+                        header["depth"])
+    return {
+        "forest": forest,
+        "classes": header["classes"],
+        "window_size": header["window_size"],
+        "step_size": header["step_size"],
+        "feature_cols": header["feature_cols"],
+        "n_features": header["n_features"],
+        "motion_gate": header["motion_gate"],
+    }
+
+
+def _check_layout(path, header):
+    expected = feature_names(header["feature_cols"])
+    saved = header["feature_layout"]
+    if saved != expected:
+        diff = next((i for i, (a, b) in enumerate(zip(saved, expected)) if a != b),
+                    min(len(saved), len(expected)))
+        raise ModelFileError(
+            f"{path}: feature layout doesn't match this code — position {diff} is "
+            f"{saved[diff] if diff < len(saved) else '(missing)'} in the model but "
+            f"{expected[diff] if diff < len(expected) else '(missing)'} here "
+            f"({len(saved)} vs {len(expected)} features). Retrain with step2_train_model.py.")
+    if header["n_features"] != len(header["feature_cols"]) * FEATURES_PER_CHANNEL:
+        raise ModelFileError(f"{path}: n_features {header['n_features']} doesn't match "
+                             f"{len(header['feature_cols'])} channels")
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "movement_model.forest"
+    t0 = time.perf_counter()
+    bundle = load_model_file(path)
+    t_load = time.perf_counter() - t0
+    forest = bundle["forest"]
+    print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB, {forest.n_trees} trees, "
+          f"{len(forest.feature)} nodes, classes {bundle['classes']}")
+    print(f"Load + verify: {t_load * 1000:.1f} ms   "
+          f"(sklearn imported: {'sklearn' in sys.modules})")
+
+    x = np.zeros(bundle["n_features"])
+    t0 = time.perf_counter()
+    forest.predict_one(x)
+    print(f"First prediction (pages faulted in): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    if os.path.exists("movement_model.pkl"):
+        from gesture_controller import load_model
+        t0 = time.perf_counter()
+        ref = load_model("movement_model.pkl")
+        print(f"Pickle load + FlatForest export: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, bundle["n_features"]))
+        same = all(np.array_equal(forest.predict_proba_one(r), ref["forest"].predict_proba_one(r))
+                   for r in X)
+        print(f"Predictions identical to the pickle: {same}")
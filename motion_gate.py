@@ -0,0 +1,126 @@
+"""
+Cheap rest detector in front of the RandomForest.
+
+Most of a set the glove is resting. A window whose per-channel standard
+deviations are all below thresholds learned from the REST class is called
+REST straight away; only windows with motion go to the forest. The std
+values are already part of the streaming feature vector, so the gate costs
+five comparisons.
+
+Thresholds are the `quantile` of each channel's std over the training REST
+windows — step2_train_model.py fits them and stores them in the model bundle
+under "motion_gate". Models trained before this have no gate and behave as
+before.
+
+Run this file directly to see the CPU saved and any accuracy change on
+gesture_data.csv:
+    python motion_gate.py
+"""
+
+import numpy as np
+
+from gesture_features import FEATURES_PER_CHANNEL
+
+STD_COL = 1   # position of std within each channel's five features
+
+
+class MotionGate:
+
+    def __init__(self, std_max, rest_label="REST", quantile=None):
+        self.std_max = np.asarray(std_max, dtype=float)
+        self.rest_label = rest_label
+        self.quantile = quantile
+        self.gated = 0          # windows short-circuited to REST
+        self.passed = 0         # windows sent to the model
+
+    @classmethod
+    def fit(cls, X, y, rest_label="REST", quantile=0.95):
+        """Learn per-channel std thresholds from the REST rows of a feature matrix."""
+        X = np.asarray(X)
+        std = X.reshape(len(X), -1, FEATURES_PER_CHANNEL)[:, :, STD_COL]
+        rest = std[np.asarray(y) == rest_label]
+        return cls(np.quantile(rest, quantile, axis=0), rest_label, quantile)
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        """The gate saved with a model, or None for older bundles."""
+        gate = bundle.get("motion_gate")
+        if gate is None:
+            return None
+        return cls(gate["std_max"], gate["rest_label"], gate.get("quantile"))
+
+    def to_dict(self):
+        return {"std_max": self.std_max.tolist(), "rest_label": self.rest_label,
+                "quantile": self.quantile}
+
+    def is_rest(self, feats):
+        """True if one feature vector shows clearly no motion."""
+        std = feats[STD_COL::FEATURES_PER_CHANNEL]
+        if (std <= self.std_max).all():
+            self.gated += 1
+            return True
+        self.passed += 1
+        return False
+
+    def rest_mask(self, X):
+        """Vectorised is_rest for a feature matrix (no counters)."""
+        std = np.asarray(X)[:, STD_COL::FEATURES_PER_CHANNEL]
+        return (std <= self.std_max).all(axis=1)
+
+
+if __name__ == "__main__":
+    import time
+
+    import pandas as pd
+
+    from decision import make_session, score_decisions
+    from gesture_controller import load_model
+    from gesture_features import window_features
+    from replay import replay
+
+    bundle = load_model("movement_model.pkl")
+    gate = MotionGate.from_bundle(bundle)
+    if gate is None:
+        print("movement_model.pkl has no motion gate — retrain with step2_train_model.py")
+        raise SystemExit(1)
+    print(f"Gate thresholds (std, q={gate.quantile}): {np.round(gate.std_max, 4)}")
+
+    # Window level: every window of the recording, gate vs forest alone
+    df = pd.read_csv("gesture_data.csv")
+    X, y = [], []
+    for label, g in df.groupby("label"):
+        f = window_features(g[bundle["feature_cols"]].values,
+                            bundle["window_size"], bundle["step_size"])
+        X.append(f)
+        y += [label] * len(f)
+    X, y = np.concatenate(X), np.array(y)
+    forest = bundle["forest"]
+    plain = forest.classes[forest.predict_proba(X).argmax(axis=1)]
+    mask = gate.rest_mask(X)
+    gated = np.where(mask, gate.rest_label, plain)
+    print(f"\nWindows: {len(X)}, gated to REST: {mask.sum()} "
+          f"({mask[y == 'REST'].mean() * 100:.0f}% of REST, "
+          f"{mask[y != 'REST'].sum()} non-REST)")
+    print(f"Window accuracy: forest {np.mean(plain == y) * 100:.2f}%  "
+          f"gate+forest {np.mean(gated == y) * 100:.2f}%  "
+          f"({np.sum(plain != gated)} predictions changed)")
+
+    # Replay level: a rest-heavy session, with and without the gate
+    session = make_session(df, segment_s=2.0, seed=0)
+    rest_heavy = pd.concat([session, df[df["label"] == "REST"].iloc[:6000]],
+                           ignore_index=True)
+    print(f"\nReplay ({len(rest_heavy) / 100:.0f} s, "
+          f"{np.mean(rest_heavy['label'] == 'REST') * 100:.0f}% REST):")
+    for name, use_gate in (("forest only", False), ("gate + forest", True)):
+        b = dict(bundle)
+        if not use_gate:
+            b.pop("motion_gate", None)
+        t0 = time.process_time()
+        result = replay(rest_heavy, bundle=b)
+        cpu = time.process_time() - t0
+        delays, false = score_decisions(rest_heavy["label"].to_numpy(), result.decisions)
+        hit = sum(d is not None for _, d in delays)
+        g = result.pipeline.gate
+        calls = result.pipeline.windows - (g.gated if g else 0)
+        print(f"  {name:<14s} CPU {cpu:5.2f} s   forest calls {calls:5d}/"
+              f"{result.pipeline.windows}   detected {hit}/{len(delays)}   false {false}")
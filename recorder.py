@@ -0,0 +1,399 @@
+"""
+Record labelled training data straight from the glove — replaces the PDF step.
+
+Reads the stream from 1gyroscope_raw_data.ino (binary frames by default,
+or the CSV text lines with their "# LABEL=" markers) and appends every
+sample, with the label the sketch was set to, to a recordings folder:
+
+    recordings/
+      manifest.json              columns, label names, one entry per chunk
+      chunk-000000/timestamp.npy one .npy per column, CHUNK_SECONDS of samples
+      chunk-000000/label.npy     LABELS codes (serial_protocol.py)
+      chunk-000000/accelX.npy    ...
+      chunk-000001/...
+
+Chunks are only ever added: each one is written to a temporary folder,
+renamed into place, and then listed in the manifest, so a crash or Ctrl+C
+leaves every listed chunk complete. Running the recorder again appends a
+new session to the same folder.
+
+The serial port is read on its own thread (serial_reader.SerialReader) and
+full chunks are written on another, so disk stalls never hold up the
+port at 100 Hz.
+
+How to run:
+  1. Upload 1gyroscope_raw_data.ino and close the Serial Monitor
+  2. Run:  python recorder.py
+  3. Type a label key and Enter to switch what you're recording:
+       x = REST  u = UP  d = DOWN  f = FWD  b = BWD  l = LEFT  r = RIGHT  0 = NONE
+  4. Ctrl+C to stop, then:  python step2_train_model.py
+
+Samples recorded as NONE are kept in the chunks but left out of training.
+
+Without a glove, record a CSV through a stand-in port (checks the round trip):
+    python recorder.py --replay gesture_data.csv --out /tmp/recordings
+"""
+
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from serial_protocol import LABELS, MODE_COMMANDS, make_decoder
+from serial_reader import SampleRing, SerialReader, open_serial, wait_for_stream
+
+# ─────────────────────────────────────────────────────────────
+#  *** CHANGE THESE TO MATCH YOUR SETUP ***
+SERIAL_PORT    = "/dev/tty.usbserial-1120"
+SERIAL_FORMAT  = "binary"      # binary frames carry a sequence number, so drops show up
+RECORDINGS_DIR = "recordings"
+# ─────────────────────────────────────────────────────────────
+
+BAUD          = 115200
+SAMPLE_HZ     = 100
+CHUNK_SECONDS = 30
+FEATURE_COLS  = ["accelX", "accelY", "accelZ", "gyroX", "gyroY"]
+MANIFEST      = "manifest.json"
+FORMAT_VERSION = 1
+
+# Column name → dtype, in the order step1's CSV has them (plus seq)
+COLUMNS = {"timestamp": "<f8", "label": "|u1", "seq": "<i8",
+           **{col: "<f8" for col in FEATURE_COLS}}
+
+# Serial Monitor keys that set the sketch's label (see handleSerialLabel)
+LABEL_KEYS = {"NONE": "0", "REST": "x", "UP": "u", "DOWN": "d", "FWD": "f", "BWD": "b",
+              "LEFT": "l", "RIGHT": "r", "CIRCLE": "c", "SCRATCH": "s"}
+
+
+# ── Writing ──
+class ChunkWriter:
+    """
+    Buffers samples and hands every full chunk to a background thread that
+    writes it. append() only copies into a preallocated buffer.
+    """
+
+    def __init__(self, root=RECORDINGS_DIR, chunk_rows=CHUNK_SECONDS * SAMPLE_HZ,
+                 session=None):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        os.makedirs(root, exist_ok=True)
+        self.manifest = read_manifest(root) or {
+            "version": FORMAT_VERSION,
+            "columns": COLUMNS,
+            "labels": LABELS,
+            "chunks": [],
+        }
+        if self.manifest["version"] > FORMAT_VERSION:
+            raise ValueError(f"{root}: recordings format {self.manifest['version']} is newer "
+                             f"than this recorder ({FORMAT_VERSION})")
+        self.session = session or new_session_id(self.manifest)
+        self.rows = 0               # samples appended this session
+        self.written = 0            # ...of which are on disk
+        self.chunks = 0             # chunks written this session
+        self.label_counts = {}
+        self.error = None
+        self._buf = self._new_buffer()
+        self._fill = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _new_buffer(self):
+        return {name: np.empty(self.chunk_rows, dtype) for name, dtype in COLUMNS.items()}
+
+    def append(self, t_ms, label, seq, values):
+        """Add samples given as parallel arrays (values is n x 5)."""
+        n, start = len(t_ms), 0
+        while start < n:
+            take = min(n - start, self.chunk_rows - self._fill)
+            dst = slice(self._fill, self._fill + take)
+            src = slice(start, start + take)
+            buf = self._buf
+            buf["timestamp"][dst] = t_ms[src]
+            buf["label"][dst] = label[src]
+            buf["seq"][dst] = seq[src]
+            for c, col in enumerate(FEATURE_COLS):
+                buf[col][dst] = values[src, c]
+            self._fill += take
+            start += take
+            if self._fill == self.chunk_rows:
+                self._hand_off()
+        self.rows += n
+        codes, counts = np.unique(np.asarray(label), return_counts=True)
+        for code, count in zip(codes, counts):
+            name = LABELS[code] if code < len(LABELS) else str(code)
+            self.label_counts[name] = self.label_counts.get(name, 0) + int(count)
+
+    def append_samples(self, samples):
+        """Add a SAMPLE_DTYPE array straight from a decoder."""
+        self.append(samples["t_ms"], samples["label"], samples["seq"], samples["values"])
+
+    def _hand_off(self):
+        full = {name: a[:self._fill] for name, a in self._buf.items()}
+        self._queue.put(full)
+        self._buf = self._new_buffer()
+        self._fill = 0
+
+    def close(self):
+        """Write the partial last chunk and wait for the writer to finish."""
+        if self._fill:
+            self._hand_off()
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        while True:
+            columns = self._queue.get()
+            if columns is None:
+                return
+            try:
+                self._write_chunk(columns)
+            except Exception as e:   # keep recording; close() reports it
+                self.error = e
+
+    def _write_chunk(self, columns):
+        name = f"chunk-{len(self.manifest['chunks']):06d}"
+        tmp = os.path.join(self.root, name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for col, a in columns.items():
+            np.save(os.path.join(tmp, col + ".npy"), a)
+        final = os.path.join(self.root, name)
+        shutil.rmtree(final, ignore_errors=True)   # left by a crash before the manifest update
+        os.replace(tmp, final)
+
+        n = len(columns["timestamp"])
+        codes, counts = np.unique(columns["label"], return_counts=True)
+        self.manifest["chunks"].append({
+            "name": name,
+            "session": self.session,
+            "rows": n,
+            "t_ms": [float(columns["timestamp"][0]), float(columns["timestamp"][-1])],
+            "labels": {LABELS[c] if c < len(LABELS) else str(c): int(k)
+                       for c, k in zip(codes, counts)},
+        })
+        _write_json(os.path.join(self.root, MANIFEST), self.manifest)
+        self.written += n
+        self.chunks += 1
+
+
+def new_session_id(manifest):
+    """
+    A millisecond timestamp for a new session, with a counter appended if
+    the manifest already has it — windows never span two sessions, so two
+    recordings must not share one.
+    """
+    now = time.time()
+    base = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+    taken = {chunk["session"] for chunk in manifest["chunks"]}
+    session, n = base, 1
+    while session in taken:
+        session, n = f"{base}-{n}", n + 1
+    return session
+
+
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp, path)
+
+
+# ── Reading (step2_train_model.py) ──
+def read_manifest(root=RECORDINGS_DIR):
+    """The manifest dict, or None if `root` has no recordings."""
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def chunk_files(root=RECORDINGS_DIR):
+    """Paths of every column file the manifest lists, in manifest order."""
+    manifest = read_manifest(root)
+    if manifest is None:
+        return []
+    return [os.path.join(root, chunk["name"], name + ".npy")
+            for chunk in manifest["chunks"] for name in manifest["columns"]]
+
+
+def load_recordings(root=RECORDINGS_DIR, labelled_only=True):
+    """
+    Every listed chunk as one DataFrame with gesture_data.csv's columns plus
+    "seq" and "session". Columns are memory-mapped while they're gathered.
+    labelled_only drops samples recorded as NONE.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        raise FileNotFoundError(f"no recordings in '{root}' ({MANIFEST} missing)")
+    columns = {name: [] for name in manifest["columns"]}
+    sessions = []
+    for chunk in manifest["chunks"]:
+        for name in columns:
+            a = np.load(os.path.join(root, chunk["name"], name + ".npy"), mmap_mode="r")
+            columns[name].append(a)
+        sessions.append(np.full(chunk["rows"], chunk["session"], dtype=object))
+
+    data = {name: np.concatenate(parts) if parts else np.empty(0, manifest["columns"][name])
+            for name, parts in columns.items()}
+    names = np.array(manifest["labels"] + ["?"], dtype=object)
+    codes = np.minimum(data.pop("label"), len(names) - 1)
+    df = pd.DataFrame({
+        "timestamp": data.pop("timestamp"),
+        "label": names[codes].astype(str),
+        **{col: data[col] for col in FEATURE_COLS},
+        "seq": data["seq"],
+        "session": np.concatenate(sessions) if sessions else np.empty(0, dtype=object),
+    })
+    if labelled_only:
+        df = df[df["label"] != "NONE"].reset_index(drop=True)
+    return df
+
+
+# ── Recording ──
+def read_label_keys(ser_ref, stop):
+    """Stdin thread: a label key (or name) + Enter sets the sketch's label."""
+    keys = set(LABEL_KEYS.values())
+    for line in sys.stdin:
+        if stop.is_set():
+            return
+        text = line.strip()
+        key = LABEL_KEYS.get(text.upper(), text[:1])
+        if key in keys:
+            try:
+                ser_ref[0].write(key.encode())
+            except Exception:
+                pass
+        elif text:
+            print(f"  unknown label '{text}' — keys: "
+                  + "  ".join(f"{k}={name}" for name, k in LABEL_KEYS.items()))
+
+
+def record(ser, writer, serial_format=SERIAL_FORMAT, reopen=None, until=None,
+           status_every=5.0, verbose=True):
+    """
+    Stream `ser` into `writer` until Ctrl+C (or `until()` returns True).
+    Returns the SerialReader for its stats.
+    """
+    decoder = make_decoder(serial_format)
+    first, _ = wait_for_stream(ser, decoder)
+    writer.append_samples(first)
+
+    # Ring big enough that a slow disk can't make us lose samples
+    ring = SampleRing(capacity=64 * SAMPLE_HZ)
+    reader = SerialReader(ser, decoder, ring, reopen=reopen)
+    reader.start()
+    next_status = time.perf_counter() + status_every
+
+    def drain():
+        a, b = ring.consume()
+        if b > a:
+            writer.append(ring.view(a, b, ring.t_ms), ring.view(a, b, ring.label),
+                          ring.view(a, b, ring.seq), ring.view(a, b))
+
+    try:
+        while not (until is not None and until() and ring.pending == 0):
+            ring.wait(timeout=0.5)
+            if reader.error is not None:
+                raise reader.error
+            drain()
+            if verbose and time.perf_counter() >= next_status:
+                next_status += status_every
+                label = LABELS[ring.label[(ring.head - 1) % ring.capacity]]
+                print(f"  {writer.rows / SAMPLE_HZ:7.1f} s  recording {label:<6s}  "
+                      f"saved {writer.written}  lost {decoder.lost}  "
+                      f"overruns {ring.overruns}"
+                      + ("  (reconnecting...)" if not reader.connected else ""))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Let the reader finish the block it is on (Ctrl+C, or `until()`
+        # turning true between a read and its ring.write), then keep it
+        reader.stop()
+        reader.join()
+        drain()
+    return reader
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Record labelled glove data for training.")
+    ap.add_argument("--port", default=SERIAL_PORT)
+    ap.add_argument("--format", choices=["csv", "binary", "binary16"], default=SERIAL_FORMAT)
+    ap.add_argument("--out", default=RECORDINGS_DIR, help="recordings folder (appended to)")
+    ap.add_argument("--label", choices=list(LABEL_KEYS), help="label to start recording with")
+    ap.add_argument("--replay", metavar="CSV",
+                    help="record a CSV through a stand-in port instead of the glove")
+    args = ap.parse_args()
+
+    print("=" * 50)
+    print("RECORDER: glove → " + args.out)
+    print("=" * 50)
+
+    writer = ChunkWriter(args.out)
+    until = None
+    if args.replay:
+        from replay import ReplaySerial, recording_to_bytes
+        source = pd.read_csv(args.replay)
+        ser = ReplaySerial(recording_to_bytes(source, args.format), realtime=False)
+        until = lambda: ser.done  # noqa: E731
+        reopen = None
+    else:
+        def reopen():
+            s = open_serial(args.port, BAUD)
+            s.write(MODE_COMMANDS[args.format])
+            return s
+        try:
+            ser = reopen()
+        except Exception as e:
+            print(f"\nERROR: Could not open {args.port}\n  {e}")
+            print("\nFix: Close Arduino IDE fully, then try again.")
+            exit()
+        if args.label:
+            ser.write(LABEL_KEYS[args.label].encode())
+        print("Type a label key + Enter to switch: "
+              + "  ".join(f"{k}={name}" for name, k in LABEL_KEYS.items()))
+        print("Press Ctrl+C to stop.\n")
+
+    stop = threading.Event()
+    ser_ref = [ser]
+    if not args.replay:
+        threading.Thread(target=read_label_keys, args=(ser_ref, stop), daemon=True).start()
+
+    t0 = time.perf_counter()
+    reader = record(ser, writer, args.format, reopen=reopen, until=until,
+                    verbose=not args.replay)
+    stop.set()
+    writer.close()
+    elapsed = time.perf_counter() - t0
+    reader.ser.close()
+
+    stats = reader.stats()
+    print(f"\nRecorded {writer.rows} samples ({writer.rows / SAMPLE_HZ:.1f} s) in "
+          f"{writer.chunks} chunk(s), {elapsed:.1f} s wall time")
+    print(f"  lost (sequence gaps): {stats['lost']}   ring overruns: {stats['overruns']}   "
+          f"bad bytes: {stats['bad_bytes']}")
+    print("  per label: " + "  ".join(f"{k} {v}" for k, v in sorted(writer.label_counts.items())))
+
+    if args.replay:
+        got = load_recordings(args.out, labelled_only=False)
+        got = got[got["session"] == writer.session]
+        same = (len(got) == len(source)
+                and (got["label"].to_numpy() == source["label"].to_numpy()).all()
+                and np.allclose(got[FEATURE_COLS].to_numpy(), source[FEATURE_COLS].to_numpy(),
+                                atol=1e-4))
+        print(f"  round trip matches {args.replay}: {same}")
+    print("\nDone! Now run:  python step2_train_model.py")
+
+
+if __name__ == "__main__":
+    main()
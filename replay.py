@@ -0,0 +1,471 @@
+"""
+Offline replay — drive the live controller from a recorded CSV.
+
+Feeds gesture_data.csv (or any step1/recorder CSV) through the same
+decoder → features → model → confirmation → handle_gesture path as
+scratch_arduino.py / step3_live_classify.py, using a stand-in serial port
+and a MIDI sink that records every message. No glove, no Mixxx.
+
+How to run:
+    python replay.py                              # scratch controller, as fast as possible
+    python replay.py gesture_data.csv --realtime  # paced at 100 Hz through the reader thread
+    python replay.py --controller classify        # step3 settings, no MIDI
+    python replay.py --format binary --midi       # binary frames, list every MIDI message
+    python replay.py --realtime --latency         # per-stage latency histograms
+    python replay.py a.csv b.csv --realtime       # one glove per deck, batched model calls
+    python replay.py --compare-jog                # gyro fast path vs fixed jog ticks
+
+Reports throughput, the decision timeline (with the recorded label at each
+decision) and the MIDI messages emitted.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from gesture_controller import load_model
+from latency import LatencyStats
+from midi_protocol import decode_jog
+from midi_scheduler import MidiScheduler
+from serial_protocol import FMT_F32, FMT_I16, LABEL_CODES, encode_frame, make_decoder
+from serial_reader import SampleRing, SerialReader
+
+SAMPLE_HZ = 100
+FEATURE_COLS = ["accelX", "accelY", "accelZ", "gyroX", "gyroY"]
+
+
+def recording_to_bytes(df, serial_format="csv"):
+    """
+    The bytes 1gyroscope_raw_data.ino would have sent for this recording,
+    as one blob per sample (CSV lines or binary frames).
+    """
+    t_ms = df["timestamp"].to_numpy()
+    labels = df["label"].to_numpy()
+    values = df[FEATURE_COLS].to_numpy()
+    if serial_format in ("binary", "binary16"):
+        fmt = FMT_I16 if serial_format == "binary16" else FMT_F32
+        return [encode_frame(i, int(t_ms[i]), values[i], LABEL_CODES.get(labels[i], 0), fmt)
+                for i in range(len(df))]
+    return [f"{t:.0f},{lab},{v[0]:.4f},{v[1]:.4f},{v[2]:.4f},{v[3]:.6f},{v[4]:.6f}\n".encode()
+            for t, lab, v in zip(t_ms, labels, values)]
+
+
+class ReplaySerial:
+    """
+    Minimal pyserial stand-in. Sample i becomes readable at i / sample_hz
+    seconds after the first read when realtime=True, or immediately
+    otherwise. read() blocks like a port with a timeout.
+    """
+
+    def __init__(self, chunks, realtime=False, sample_hz=SAMPLE_HZ, timeout=1.0):
+        self.data = b"".join(chunks)
+        self.ends = np.cumsum([len(c) for c in chunks])
+        self.realtime = realtime
+        self.period = 1.0 / sample_hz
+        self.timeout = timeout
+        self.pos = 0
+        self.start = None
+
+    @property
+    def done(self):
+        return self.pos >= len(self.data)
+
+    def _available(self):
+        if not self.realtime:
+            return len(self.data)
+        if self.start is None:
+            self.start = time.perf_counter()
+        n = int((time.perf_counter() - self.start) / self.period) + 1
+        return int(self.ends[min(n, len(self.ends)) - 1])
+
+    @property
+    def in_waiting(self):
+        return self._available() - self.pos
+
+    def read(self, size=1):
+        deadline = time.perf_counter() + self.timeout
+        while self.in_waiting <= 0:
+            if self.done or time.perf_counter() >= deadline:
+                return b""
+            time.sleep(self.period / 4)
+        chunk = self.data[self.pos:min(self.pos + size, self._available())]
+        self.pos += len(chunk)
+        return chunk
+
+    def write(self, data):
+        return len(data)
+
+    def flushInput(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingMidiOut:
+    """rtmidi.MidiOut stand-in that keeps (time_s, message) for every send."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages = []
+
+    def send_message(self, message):
+        self.messages.append((self.clock(), list(message)))
+
+
+class ReplayResult:
+
+    def __init__(self, df, n_samples, elapsed, decisions, midi, pipeline, reader_stats=None,
+                 latency=None, scheduler=None, out=None):
+        self.df = df
+        self.n_samples = n_samples
+        self.elapsed = elapsed
+        self.decisions = decisions        # [(sample_index, label, conf)]
+        self.midi = midi                  # [(time_s, message)] or []
+        self.pipeline = pipeline
+        self.reader_stats = reader_stats
+        self.latency = latency
+        self.scheduler = scheduler
+        self.out = out                    # MidiOutput, if the controller coalesces
+
+    @property
+    def samples_per_s(self):
+        return self.n_samples / self.elapsed if self.elapsed else float("inf")
+
+    def true_label(self, sample_index):
+        return self.df["label"].iat[min(sample_index, len(self.df)) - 1]
+
+    def report(self, show_timeline=True, show_midi=False):
+        p = self.pipeline
+        audio_s = self.n_samples / SAMPLE_HZ
+        print(f"Replayed {self.n_samples} samples ({audio_s:.1f} s of recording) "
+              f"in {self.elapsed:.2f} s")
+        print(f"  throughput: {self.samples_per_s:,.0f} samples/s "
+              f"({self.samples_per_s / SAMPLE_HZ:.0f}x real time), "
+              f"{p.windows} windows classified")
+        if self.reader_stats:
+            print("  reader: " + "  ".join(f"{k} {v}" for k, v in self.reader_stats.items()))
+
+        agree = sum(self.true_label(i) == label for i, label, _ in self.decisions)
+        print(f"\nDecisions: {len(self.decisions)} "
+              f"({agree} match the recorded label at that moment)")
+        if show_timeline:
+            for i, label, conf in self.decisions:
+                truth = self.true_label(i)
+                mark = "" if truth == label else f"   (recorded: {truth})"
+                print(f"  {i / SAMPLE_HZ:8.2f} s  #{i:<6d} {label:<6s} {conf:3.0f}%{mark}")
+
+        if self.midi:
+            kinds = {}
+            for _, msg in self.midi:
+                kind = {0x80: "note-off", 0x90: "note-on", 0xB0: f"CC{msg[1]}",
+                        0xE0: "fine jog"}.get(msg[0] & 0xF0, hex(msg[0]))
+                kinds[kind] = kinds.get(kind, 0) + 1
+            print(f"\nMIDI: {len(self.midi)} messages  " +
+                  "  ".join(f"{k}: {v}" for k, v in sorted(kinds.items())))
+            if self.scheduler is not None:
+                print(self.scheduler.report())
+            if self.out is not None:
+                print(self.out.report())
+            if show_midi:
+                for t, msg in self.midi:
+                    print(f"  {t:8.3f} s  {' '.join(f'{b:02X}' for b in msg)}")
+
+        if self.latency is not None:
+            print("\nLatency per stage:")
+            print(self.latency.report())
+
+
+def jog_response(df, midi, channel=0, scratch_labels=("LEFT", "RIGHT")):
+    """
+    How closely the jog follows the hand, from the recording and the MIDI it
+    produced. For every sample of a LEFT/RIGHT stretch where the hand turns
+    fast enough for the fast path to owe a tick per sample, the lag from
+    that sample to the first jog CC in the same direction — or "missed" if
+    none comes before the stretch ends. Lags are in recording time, so run it on a fast
+    (non-realtime) replay. Returns a dict of counts and lags in ms.
+    """
+    from gesture_controller import (GYRO_JOG_AXIS, GYRO_JOG_DEADZONE, GYRO_JOG_SIGN,
+                                    GYRO_JOG_TICKS_PER_RAD)
+
+    gyro = df[FEATURE_COLS[GYRO_JOG_AXIS]].to_numpy()
+    labels = df["label"].to_numpy()
+    rest = labels == "REST"
+    rate = GYRO_JOG_SIGN * (gyro - (gyro[rest].mean() if rest.any() else 0.0))
+    run = np.concatenate([[0], np.cumsum(labels[1:] != labels[:-1])])
+    run_end = np.flatnonzero(np.append(labels[1:] != labels[:-1], True))
+    # Half a tick per sample rounds to one
+    threshold = max(GYRO_JOG_DEADZONE, 0.5 * SAMPLE_HZ / GYRO_JOG_TICKS_PER_RAD)
+    moving = np.flatnonzero(np.isin(labels, scratch_labels) & (np.abs(rate) >= threshold))
+    # Sample i is in hand once sample_count == i + 1
+    t_sample = (moving + 1) / SAMPLE_HZ
+    t_end = (run_end[run[moving]] + 1) / SAMPLE_HZ
+    direction = np.sign(rate[moving])
+
+    jog = [(t, decode_jog(msg)) for t, msg in midi if msg[0] & 0x0F == channel]
+    jog = [(t, v) for t, v in jog if v]
+    lag = np.full(len(moving), np.inf)
+    for d in (-1, 1):
+        times = np.array([t for t, v in jog if np.sign(v) == d])
+        mask = direction == d
+        if not len(times) or not mask.any():
+            continue
+        k = np.searchsorted(times, t_sample[mask] - 1e-9)
+        hit = k < len(times)
+        found = np.full(mask.sum(), np.inf)
+        found[hit] = times[k[hit]]
+        lag[mask] = np.where(found <= t_end[mask], found - t_sample[mask], np.inf)
+    followed = np.isfinite(lag)
+    ms = lag[followed] * 1000.0
+    return {
+        "moving": len(moving),
+        "followed": int(followed.sum()),
+        "same_sample": int(np.sum(ms < 0.5)),
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else float("nan"),
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else float("nan"),
+        "jog_messages": len(jog),
+    }
+
+
+def compare_jog(csv_file="gesture_data.csv", model_file="movement_model.forest", **kwargs):
+    """Replay with the gyro fast path (14-bit and CC16) and with fixed ticks; print each."""
+    bundle = load_model(model_file)
+    print(f"{'jog':<14s} {'moving':>7s} {'followed':>9s} {'same sample':>11s} "
+          f"{'p50 lag':>8s} {'p95 lag':>8s} {'jog msgs':>8s} {'µs/sample':>9s}")
+    for name, gyro_jog, hires in (("gyro, 14-bit", True, True), ("gyro, CC16", True, False),
+                                  ("fixed, CC16", False, False)):
+        result = replay(csv_file, bundle=bundle, gyro_jog=gyro_jog, jog_hires=hires, **kwargs)
+        r = jog_response(result.df, result.midi)
+        us = result.elapsed / max(result.n_samples, 1) * 1e6
+        print(f"{name:<14s} {r['moving']:>7d} {r['followed'] / max(r['moving'], 1):>8.0%} "
+              f"{r['same_sample'] / max(r['moving'], 1):>10.0%} {r['p50_ms']:>6.0f}ms "
+              f"{r['p95_ms']:>6.0f}ms {r['jog_messages']:>8d} {us:>9.1f}")
+    print("moving = LEFT/RIGHT samples turning at least half a jog tick per sample; "
+          "followed = a jog move in that direction before the gesture ended; lag in "
+          "recording time, from the sample to the message.")
+
+
+def replay(csv_file="gesture_data.csv", model_file="movement_model.forest",
+           controller="scratch", realtime=False, serial_format="csv",
+           bundle=None, limit=None, latency=False, decider=None, cadence=None, gyro_jog=None,
+           jog_hires=None):
+    """
+    Run one replay and return a ReplayResult. `csv_file` may also be a
+    DataFrame; `decider` / `cadence` / `gyro_jog` / `jog_hires` override the
+    controller's decision rule, inference cadence, scratch fast path and
+    jog encoding.
+    """
+    df = csv_file if isinstance(csv_file, pd.DataFrame) else pd.read_csv(csv_file)
+    if limit:
+        df = df.iloc[:limit]
+    if bundle is None:
+        bundle = load_model(model_file)
+
+    decisions = []
+    on_decision = lambda i, label, conf: decisions.append((i, label, conf))  # noqa: E731
+    stats = LatencyStats() if latency else None
+    t_start = [time.perf_counter()]
+    pipeline_ref = []
+
+    if realtime:
+        clock = lambda: time.perf_counter() - t_start[0]  # noqa: E731
+    else:
+        # Fast mode: stamp messages with recording time, not wall time
+        clock = lambda: pipeline_ref[0].sample_count / SAMPLE_HZ  # noqa: E731
+    midi = RecordingMidiOut(clock)
+    # Fast mode steps the scheduler by hand on recording time, so jog ticks
+    # land where they would have live.
+    scheduler = MidiScheduler(midi, clock=clock)
+    if realtime:
+        scheduler.start()
+
+    if controller == "scratch":
+        import scratch_arduino
+        actions, pipeline = scratch_arduino.build_controller(
+            bundle, midi, verbose=False, on_decision=on_decision, latency=stats,
+            scheduler=scheduler, decider=decider, cadence=cadence, gyro_jog=gyro_jog,
+            jog_hires=jog_hires)
+    elif controller == "classify":
+        import step3_live_classify
+        actions = None
+        pipeline = step3_live_classify.build_pipeline(
+            bundle, verbose=False, on_decision=on_decision, latency=stats, cadence=cadence)
+        if decider is not None:
+            pipeline.decider = decider
+    else:
+        raise ValueError(f"Unknown controller '{controller}' (use 'scratch' or 'classify')")
+    pipeline_ref.append(pipeline)
+
+    ser = ReplaySerial(recording_to_bytes(df, serial_format), realtime=realtime)
+    decoder = make_decoder(serial_format)
+    reader_stats = None
+
+    t_start[0] = time.perf_counter()
+    if realtime:
+        # Same reader thread + ring + consumer loop as scratch_arduino.main()
+        ring = SampleRing(capacity=max(256, 8 * bundle["window_size"]))
+        reader = SerialReader(ser, decoder, ring)
+        reader.start()
+        while not (ser.done and ring.pending == 0):
+            ring.wait(timeout=0.5)
+            pipeline.consume_ring(ring)
+        # ser.done turns true inside read(), before the reader has decoded
+        # and written that last chunk: let it finish, then drain the ring
+        reader.stop()
+        reader.join()
+        pipeline.consume_ring(ring)
+        reader_stats = reader.stats()
+    else:
+        while not ser.done:
+            for sample in decoder.feed(ser.read(4096))["values"]:
+                pipeline.push(sample)
+                scheduler.run_pending()
+    elapsed = time.perf_counter() - t_start[0]
+
+    out = None
+    if actions is not None:
+        actions.close()
+        if actions.out is not scheduler:
+            out = actions.out
+    scheduler.stop()
+    return ReplayResult(df, pipeline.sample_count, elapsed, decisions, midi.messages,
+                        pipeline, reader_stats, stats, scheduler, out)
+
+
+def replay_decks(csv_files, model_file="movement_model.forest", realtime=False,
+                 serial_format="csv", bundle=None, limit=None, latency=False, batched=True):
+    """
+    Several recordings at once, one per deck (MIDI channel 0, 1, ...),
+    through scratch_arduino.build_decks — the multi-glove controller with
+    one model call per tick. `batched=False` predicts each window on its
+    own instead, for comparison. Returns ([ReplayResult per deck], DeckGroup).
+    """
+    import scratch_arduino
+
+    dfs = [f if isinstance(f, pd.DataFrame) else pd.read_csv(f) for f in csv_files]
+    if limit:
+        dfs = [df.iloc[:limit] for df in dfs]
+    if bundle is None:
+        bundle = load_model(model_file)
+    devices = [(f"replay-{d}", d + 1, d) for d in range(len(dfs))]
+
+    decisions = [[] for _ in dfs]
+    on_decision = lambda d, i, label, conf: decisions[d].append((i, label, conf))  # noqa: E731
+    t_start = [time.perf_counter()]
+    tick = [0]
+    if realtime:
+        clock = lambda: time.perf_counter() - t_start[0]  # noqa: E731
+    else:
+        clock = lambda: tick[0] / SAMPLE_HZ  # noqa: E731
+    midi = RecordingMidiOut(clock)
+    scheduler = MidiScheduler(midi, clock=clock)
+    if realtime:
+        scheduler.start()
+    actions, group = scratch_arduino.build_decks(
+        bundle, midi, devices, verbose=False, on_decision=on_decision, latency=latency,
+        scheduler=scheduler)
+    if not batched:
+        for p in group.pipelines:
+            p.batch = None
+
+    streams = [recording_to_bytes(df, serial_format) for df in dfs]
+    reader_stats = [None] * len(dfs)
+    t_start[0] = time.perf_counter()
+    if realtime:
+        import threading
+
+        event = threading.Event()
+        rings, readers, sers = [], [], []
+        for chunks in streams:
+            ser = ReplaySerial(chunks, realtime=True)
+            ring = SampleRing(capacity=max(256, 8 * bundle["window_size"]), event=event)
+            readers.append(SerialReader(ser, make_decoder(serial_format), ring))
+            rings.append(ring)
+            sers.append(ser)
+        for reader in readers:
+            reader.start()
+        while not all(ser.done and ring.pending == 0 for ser, ring in zip(sers, rings)):
+            event.wait(timeout=0.5)
+            event.clear()
+            group.consume_rings(rings)
+        for reader in readers:
+            reader.stop()
+        for reader in readers:
+            reader.join()
+        group.consume_rings(rings)    # whatever the readers wrote after `done`
+        reader_stats = [reader.stats() for reader in readers]
+    else:
+        samples = [make_decoder(serial_format).feed(b"".join(chunks))["values"]
+                   for chunks in streams]
+        for k in range(max(len(v) for v in samples)):
+            tick[0] = k + 1
+            group.push([v[k] if k < len(v) else None for v in samples])
+            scheduler.run_pending()
+    elapsed = time.perf_counter() - t_start[0]
+
+    for a in actions:
+        a.close()
+    out = actions[0].out if actions[0].out is not scheduler else None
+    scheduler.stop()
+    results = []
+    for d, (df, p) in enumerate(zip(dfs, group.pipelines)):
+        channel_midi = [(t, m) for t, m in midi.messages if m[0] & 0x0F == d]
+        results.append(ReplayResult(df, p.sample_count, elapsed, decisions[d], channel_midi,
+                                    p, reader_stats[d], p.latency, scheduler, out))
+    return results, group
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Replay a recorded CSV through the live controller.")
+    ap.add_argument("csv", nargs="*", default=["gesture_data.csv"],
+                    help="one recording, or several to replay one per deck")
+    ap.add_argument("--model", default="movement_model.forest")
+    ap.add_argument("--controller", choices=["scratch", "classify"], default="scratch")
+    ap.add_argument("--realtime", action="store_true", help="pace input at 100 Hz")
+    ap.add_argument("--format", choices=["csv", "binary", "binary16"], default="csv")
+    ap.add_argument("--limit", type=int, help="only replay the first N samples")
+    ap.add_argument("--midi", action="store_true", help="list every MIDI message")
+    ap.add_argument("--decision", choices=["confirm", "sequential"],
+                    help="override the controller's decision rule")
+    ap.add_argument("--fixed-cadence", action="store_true",
+                    help="classify every STEP_SIZE samples instead of adaptively")
+    ap.add_argument("--gyro-jog", action="store_true",
+                    help="follow the gyro while scratching instead of fixed jog ticks")
+    ap.add_argument("--fine-jog", action="store_true",
+                    help="14-bit fine jog steps instead of CC16 ticks")
+    ap.add_argument("--compare-jog", action="store_true",
+                    help="jog response of the gyro fast path vs fixed ticks")
+    ap.add_argument("--latency", action="store_true", help="report per-stage latency")
+    ap.add_argument("--no-timeline", action="store_true")
+    args = ap.parse_args()
+
+    if len(args.csv) > 1:
+        results, group = replay_decks(args.csv, args.model, args.realtime, args.format,
+                                      limit=args.limit, latency=args.latency)
+        for d, (name, result) in enumerate(zip(args.csv, results)):
+            print(f"\n══ Deck {d + 1} (MIDI channel {d + 1}): {name} ══")
+            result.report(show_timeline=not args.no_timeline, show_midi=args.midi)
+        if group.ticks:
+            print(f"\nModel calls: {group.ticks}, {group.batch_rows / group.ticks:.2f} "
+                  f"windows per call")
+        raise SystemExit
+
+    if args.compare_jog:
+        compare_jog(args.csv[0], args.model, limit=args.limit, serial_format=args.format)
+        raise SystemExit
+
+    decider = None
+    if args.decision:
+        import scratch_arduino
+        decider = scratch_arduino.make_decider(args.decision)
+    cadence = None
+    if args.fixed_cadence:
+        from cadence import FixedCadence
+        cadence = FixedCadence(load_model(args.model)["step_size"])
+    result = replay(args.csv[0], args.model, args.controller, args.realtime, args.format,
+                    limit=args.limit, latency=args.latency, decider=decider, cadence=cadence,
+                    gyro_jog=True if args.gyro_jog else None,
+                    jog_hires=True if args.fine_jog else None)
+    result.report(show_timeline=not args.no_timeline, show_midi=args.midi)
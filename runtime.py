@@ -0,0 +1,437 @@
+"""
+One asyncio process for the gloves, the keyboard and MIDI input.
+
+scratch_arduino.py (serial), scratch.py (keyboard) and sound_effects.py
+(keyboard + pygame) are separate blocking programs. This runs all of their
+inputs as events on one asyncio loop, so keyboard overrides and glove
+control share one MIDI output, one scheduler and one state per deck:
+
+  serial     each port is read on an I/O thread; the bytes come back to the
+             loop, are decoded and pushed through that deck's pipeline (the
+             gyro jog fast path sends right there)
+  inference  windows queue up in a DeckGroup and are predicted on an
+             executor thread, one batch at a time, while the loop keeps
+             taking serial and key events
+  keys       the pynput listener thread posts key events to the loop
+  MIDI in    an rtmidi input callback posts messages to the loop
+  timers     jog ticks and MidiOutput flushes run on a LoopScheduler, driven
+             by a task instead of its own thread
+
+What an event does comes from tables: GESTURE_ACTIONS (gesture_controller.py)
+for the classifier, KEY_ACTIONS and MIDI_IN_ACTIONS here. An action is
+(name, *args) — a MidiActions method, or a plugin such as "play_sample"
+(a pre-decoded sound from sample_engine.py, played straight from the key,
+pad or gesture without a round trip through Mixxx).
+
+How to run:
+    python runtime.py                    # the gloves in scratch_arduino.DEVICES + keyboard
+    python runtime.py --no-keyboard
+    python runtime.py --bench            # event → MIDI latency vs the threaded scripts
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gesture_controller import VOL_STEP, load_model, open_midi
+from latency import LatencyHistogram
+from midi_scheduler import LoopScheduler
+from sample_engine import SOUNDS, SampleEngine
+from serial_protocol import make_decoder
+from serial_reader import RECONNECT_INTERVAL, wait_for_stream
+
+import scratch_arduino
+
+# ─────────────────────────────────────────────────────────────
+#  *** CHANGE THESE TO MATCH YOUR SETUP ***
+# Gloves, serial format, model and MIDI port: see scratch_arduino.py
+MIDI_IN_PORT = None      # e.g. "nanoPAD" to take actions from a MIDI controller too
+KEY_DECK = 0             # keys act on this DEVICES entry
+SAMPLES = True           # play sample_engine.SOUNDS (needs pygame)
+# gesture → sample key, played alongside the gesture's GESTURE_ACTIONS entry
+GESTURE_SAMPLES = {}     # e.g. {"UP": "b"}
+# ─────────────────────────────────────────────────────────────
+
+# key → (action on press, action on release); None = nothing
+KEY_ACTIONS = {
+    "=": (("change_volume", +VOL_STEP), None),
+    "-": (("change_volume", -VOL_STEP), None),
+    "]": (("start_jog", +1, True), ("stop_jog",)),     # fixed ticks while held
+    "[": (("start_jog", -1, True), ("stop_jog",)),
+    "p": (("send_sample",), None),
+    "a": (("play_sample", "a"), None),
+    "b": (("play_sample", "b"), None),
+}
+# (status, data1) of an incoming MIDI message → action, e.g. a pad:
+#   {(0x99, 36): ("send_sample",), (0x99, 37): ("play_sample", "b")}
+MIDI_IN_ACTIONS = {}
+
+
+def read_waiting(ser):
+    """I/O thread: block until bytes arrive (or the port times out). (bytes, arrival)."""
+    data = ser.read(ser.in_waiting or 1)
+    if data and ser.in_waiting:
+        data += ser.read(ser.in_waiting)
+    return data, time.perf_counter()
+
+
+class Runtime:
+    """
+    One DeckGroup (a pipeline + MidiActions per glove) on a LoopScheduler,
+    fed by event sources. `run(sources)` drives it until stop() (Esc,
+    Ctrl+C) or until every serial source runs out (a replay stand-in).
+    """
+
+    def __init__(self, bundle, midi, devices, serial_format="csv", latency=False, verbose=True,
+                 key_actions=KEY_ACTIONS, midi_in_actions=MIDI_IN_ACTIONS, key_deck=KEY_DECK,
+                 samples=None, gesture_samples=GESTURE_SAMPLES):
+        self.scheduler = LoopScheduler(midi)
+        self.actions, self.group = scratch_arduino.build_decks(
+            bundle, midi, devices, verbose=verbose, latency=latency, scheduler=self.scheduler)
+        self.serial_format = serial_format
+        self.verbose = verbose
+        self.key_actions = key_actions
+        self.midi_in_actions = midi_in_actions
+        self.key_deck = key_deck
+        self.samples = samples
+        for a in self.actions:
+            a.plugins["play_sample"] = self.play_sample
+            a.table = {**a.table}
+            for label, key in gesture_samples.items():
+                action = a.table.get(label)
+                a.table[label] = (("play_sample", key),) + (
+                    () if action is None else action if isinstance(action[0], tuple)
+                    else (action,))
+        self.infer_pool = ThreadPoolExecutor(1, thread_name_prefix="inference")
+        self.io_pool = ThreadPoolExecutor(max(1, len(devices)), thread_name_prefix="serial")
+        self.inferring = False
+        self.key_latency = LatencyHistogram()     # key event → its action (and MIDI) done
+        self.reconnects = [0] * len(devices)
+        self.loop = None
+        self._stop = None
+
+    # ── Actions ──
+    def dispatch(self, action, deck=0):
+        self.actions[deck].perform(action)
+
+    def play_sample(self, key):
+        if self.samples is not None:
+            self.samples.trigger(key)
+
+    # ── Serial ──
+    def feed(self, d, samples, t_arrival):
+        """Decoded samples from glove d → its pipeline, then start inference if needed."""
+        pipeline = self.group.pipelines[d]
+        t_parsed = time.perf_counter()
+        for values, t_ms in zip(samples["values"], samples["t_ms"]):
+            pipeline.push(values, stamp=(t_ms, t_arrival, t_parsed))
+        self._kick()
+
+    async def serial_source(self, d, ser, decoder, reopen=None, first=None):
+        if first is not None and len(first):
+            self.feed(d, first, time.perf_counter())
+        while not self._stop.is_set():
+            try:
+                data, t_arrival = await self.loop.run_in_executor(self.io_pool, read_waiting, ser)
+            except Exception as e:
+                if reopen is None:
+                    print(f"Serial error: {e}")
+                    self.stop()
+                    return
+                print("⚠️  connection lost — reconnecting...")
+                self.actions[d].stop_jog()
+                self.group.pipelines[d].reset()
+                ser = await self._reconnect(ser, reopen)
+                decoder.reset()          # new stream: no partial line/frame, no seq gap
+                self.reconnects[d] += 1
+                continue
+            if data:
+                self.feed(d, decoder.feed(data), t_arrival)
+            elif getattr(ser, "done", False):
+                return                       # replay stand-in: recording finished
+
+    async def _reconnect(self, ser, reopen):
+        try:
+            ser.close()
+        except Exception:
+            pass
+        while True:
+            await asyncio.sleep(RECONNECT_INTERVAL)
+            try:
+                return await self.loop.run_in_executor(self.io_pool, reopen)
+            except Exception:
+                continue
+
+    # ── Inference ──
+    def _kick(self):
+        if self.group.queue and not self.inferring:
+            self.inferring = True
+            self.loop.create_task(self._infer())
+
+    async def _infer(self):
+        """Predict queued windows on the executor, one batch at a time, in order."""
+        try:
+            while self.group.queue:
+                queue = self.group.take()
+                probas = await self.loop.run_in_executor(self.infer_pool, self.group.predict,
+                                                         queue)
+                self.group.finish(queue, probas)
+        finally:
+            self.inferring = False
+
+    # ── Keys and MIDI input (posted from their own threads) ──
+    def post_key(self, key, pressed, t_event=None):
+        """From a key listener thread; t_event is when the key event was made (default now)."""
+        if t_event is None:
+            t_event = time.perf_counter()
+        self.loop.call_soon_threadsafe(self.on_key, key, pressed, t_event)
+
+    def on_key(self, key, pressed, t_event):
+        if key == "esc":
+            self.stop()
+            return
+        entry = self.key_actions.get(key)
+        action = entry and entry[0 if pressed else 1]
+        if action:
+            self.dispatch(action, self.key_deck)
+            self.key_latency.add(time.perf_counter() - t_event)
+
+    def post_midi(self, message):
+        self.loop.call_soon_threadsafe(self.on_midi_in, message)
+
+    def on_midi_in(self, message):
+        if message[0] & 0xF0 == 0x90 and len(message) > 2 and message[2] == 0:
+            return                           # note-on with velocity 0 is a release
+        action = self.midi_in_actions.get((message[0], message[1]))
+        if action:
+            self.dispatch(action, self.key_deck)
+
+    def start_keyboard(self):
+        from pynput import keyboard
+
+        def name(key):
+            return getattr(key, "char", None) or getattr(key, "name", None)
+
+        listener = keyboard.Listener(on_press=lambda k: self.post_key(name(k), True),
+                                     on_release=lambda k: self.post_key(name(k), False))
+        listener.start()
+        return listener
+
+    def start_midi_in(self, port_name):
+        import rtmidi
+
+        midi_in = rtmidi.MidiIn()
+        ports = midi_in.get_ports()
+        index = next((i for i, p in enumerate(ports) if port_name in p), None)
+        if index is None:
+            raise RuntimeError(f"Could not find MIDI input '{port_name}'. Available: {ports}")
+        midi_in.open_port(index)
+        midi_in.set_callback(lambda event, data=None: self.post_midi(event[0]))
+        return midi_in
+
+    # ── Running ──
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, sources, keyboard=False, midi_in_port=None):
+        """sources = [(ser, decoder, reopen, first samples)] per glove, in DEVICES order."""
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        timers = self.loop.create_task(self.scheduler.run())
+        serial = [self.loop.create_task(self.serial_source(d, *source))
+                  for d, source in enumerate(sources)]
+        listener = self.start_keyboard() if keyboard else None
+        midi_in = self.start_midi_in(midi_in_port) if midi_in_port else None
+        waiting = [self.loop.create_task(self._stop.wait())]
+        if serial:
+            waiting.append(asyncio.gather(*serial))
+        try:
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if listener is not None:
+                listener.stop()
+            if midi_in is not None:
+                midi_in.close_port()
+            for task in serial + waiting:
+                task.cancel()
+            while self.inferring:
+                await asyncio.sleep(0.001)
+            for a in self.actions:
+                a.close()
+            self.scheduler.stop()
+            await timers
+            self.io_pool.shutdown(wait=False)
+            self.infer_pool.shutdown()
+
+    def report(self):
+        lines = [self.scheduler.report()]
+        if self.actions[0].out is not self.scheduler:
+            lines.append(self.actions[0].out.report())
+        h = self.key_latency
+        if h.n:
+            lines.append(f"keys: {h.n} events, event → action p50 {h.percentile(50) * 1e3:.2f} ms"
+                         f"  p99 {h.percentile(99) * 1e3:.2f} ms")
+        if self.samples is not None:
+            lines.append(self.samples.report())
+        if self.group.ticks:
+            lines.append(f"model calls: {self.group.ticks}, "
+                         f"{self.group.batch_rows / self.group.ticks:.2f} windows each")
+        return "\n".join(lines)
+
+
+# ── Benchmark: event → MIDI under combined load ──
+def _key_presser(press, key_hz, stop, hist):
+    """
+    Thread: a sample-trigger key press every 1 / key_hz s, like a pynput
+    listener. press(hist, t_event) gets the time the key event was made, so
+    both runtimes are timed from the same point.
+    """
+    while not stop.wait(1.0 / key_hz):
+        press(hist, time.perf_counter())
+
+
+def bench(csv_file="gesture_data.csv", seconds=30.0, key_hz=20.0, model_file=None):
+    """
+    The same recording paced at 100 Hz plus a key press every 1 / key_hz s,
+    through (a) this runtime and (b) the threads of the current scripts: a
+    SerialReader thread, the scratch_arduino main loop predicting inline,
+    the MidiScheduler thread, and key presses handled on the listener's
+    thread as scratch.py does.
+    """
+    import pandas as pd
+
+    from decision import make_session
+    from replay import RecordingMidiOut, ReplaySerial, recording_to_bytes
+    from serial_reader import SampleRing, SerialReader
+
+    bundle = load_model(model_file or scratch_arduino.MODEL_FILE)
+    df = make_session(pd.read_csv(csv_file), segment_s=1.0).iloc[:int(seconds * 100)]
+    chunks = recording_to_bytes(df)
+    devices = [("replay", 1, 0)]
+    results = {}
+
+    # (a) asyncio runtime
+    midi = RecordingMidiOut(time.perf_counter)
+    rt = Runtime(bundle, midi, devices, latency=True, verbose=False)
+    stop = threading.Event()
+
+    def press_async(hist, t_event):
+        rt.post_key("p", True, t_event)
+
+    async def main():
+        presser = threading.Thread(target=_key_presser, args=(press_async, key_hz, stop, None))
+        runner = asyncio.ensure_future(rt.run([(ReplaySerial(chunks, realtime=True),
+                                                make_decoder("csv"), None, None)]))
+        await asyncio.sleep(0.05)            # let run() set up the loop hooks
+        presser.start()
+        await runner
+        stop.set()
+        presser.join()
+
+    asyncio.run(main())
+    results["asyncio runtime"] = (rt.key_latency, rt.group.pipelines[0].latency, len(midi.messages))
+
+    # (b) threads, as scratch_arduino.py + scratch.py run today
+    midi = RecordingMidiOut(time.perf_counter)
+    actions, group = scratch_arduino.build_decks(bundle, midi, devices, verbose=False,
+                                                 latency=True)
+    ser = ReplaySerial(chunks, realtime=True)
+    event = threading.Event()
+    ring = SampleRing(capacity=max(256, 8 * bundle["window_size"]), event=event)
+    reader = SerialReader(ser, make_decoder("csv"), ring)
+    key_hist = LatencyHistogram()
+    stop = threading.Event()
+
+    def press_threads(hist, t_event):
+        actions[0].send_sample()
+        hist.add(time.perf_counter() - t_event)
+
+    presser = threading.Thread(target=_key_presser, args=(press_threads, key_hz, stop, key_hist))
+    reader.start()
+    presser.start()
+    while not (ser.done and ring.pending == 0):
+        event.wait(timeout=0.5)
+        event.clear()
+        group.consume_rings([ring])
+    stop.set()
+    presser.join()
+    reader.stop()
+    reader.join()
+    group.consume_rings([ring])          # what the reader wrote after `done`
+    for a in actions:
+        a.close()
+    actions[0].scheduler.stop()
+    results["threads (today)"] = (key_hist, group.pipelines[0].latency, len(midi.messages))
+
+    print(f"\n{len(df) / 100:.0f} s of glove data at 100 Hz + {key_hz:.0f} key presses/s")
+    print(f"{'':<18s} {'stage':<22s} {'n':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for name, (keys, stats, n_midi) in results.items():
+        rows = [("key → MIDI", keys), ("serial → jog MIDI", stats.hist["jog"]),
+                ("serial → decision", stats.hist["to_decision"]),
+                ("serial → gesture MIDI", stats.hist["to_midi"])]
+        rows = [(stage, h) for stage, h in rows if h.n]    # no jog rows unless GYRO_JOG
+        for i, (stage, h) in enumerate(rows):
+            cells = [f"{h.percentile(p) * 1e3:.2f} ms" for p in (50, 95, 99)] + \
+                    [f"{h.max * 1e3:.2f} ms"]
+            print(f"{name if i == 0 else '':<18s} {stage:<22s} {h.n:>6d} " +
+                  " ".join(f"{c:>9s}" for c in cells))
+        print(f"{'':<18s} {n_midi} MIDI messages")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Gloves + keyboard + MIDI input on one event loop.")
+    ap.add_argument("--no-keyboard", action="store_true")
+    ap.add_argument("--bench", action="store_true",
+                    help="event → MIDI latency under load, vs the threaded scripts")
+    ap.add_argument("--seconds", type=float, default=30.0, help="--bench: length of the run")
+    ap.add_argument("--key-hz", type=float, default=20.0, help="--bench: key presses per second")
+    args = ap.parse_args()
+
+    if args.bench:
+        bench(seconds=args.seconds, key_hz=args.key_hz)
+        return
+
+    bundle = load_model(scratch_arduino.MODEL_FILE)
+    print(f"✅ Model loaded. Detects: {bundle['classes']}")
+    midi, port_name = open_midi(scratch_arduino.MIDI_PORT_NAME)
+    print(f"✅ MIDI connected: {port_name}")
+    samples = None
+    if SAMPLES:
+        try:
+            samples = SampleEngine(SOUNDS).start()
+        except ImportError:
+            print("pygame not installed — no samples")
+    rt = Runtime(bundle, midi, scratch_arduino.DEVICES, scratch_arduino.SERIAL_FORMAT,
+                 latency=scratch_arduino.LATENCY_STATS, samples=samples)
+
+    sources = []
+    for d, (port, deck, channel) in enumerate(scratch_arduino.DEVICES):
+        print(f"Connecting to Arduino on {port} (deck {deck}, MIDI ch {channel + 1})...")
+        decoder = make_decoder(scratch_arduino.SERIAL_FORMAT)
+        ser = scratch_arduino.connect(port)
+        first, _ = wait_for_stream(ser, decoder)
+        reopen = ((lambda port=port: scratch_arduino.connect(port))
+                  if scratch_arduino.AUTO_RECONNECT else None)
+        sources.append((ser, decoder, reopen, first))
+        print("✅ Arduino connected!")
+
+    print("\nGloves, keys (" + " ".join(KEY_ACTIONS) + ") and MIDI input on one loop. "
+          "Esc or Ctrl+C to stop.\n")
+
+    try:
+        asyncio.run(rt.run(sources, keyboard=not args.no_keyboard, midi_in_port=MIDI_IN_PORT))
+    except KeyboardInterrupt:
+        print("\n\nStopped.")
+    print(rt.report())
+    for pipeline in rt.group.pipelines:
+        if pipeline.latency is not None:
+            pipeline.latency.dump()
+    if samples is not None:
+        samples.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Pre-decoded, low-latency sample playback for sound_effects.py and runtime.py.
+
+pygame.mixer.Sound("x.mp3") decodes the whole MP3 on every launch, and the
+default mixer buffer adds its length to every trigger. SampleEngine:
+
+  cache      decodes each file once to the mixer's PCM format and keeps it
+             as .npy under CACHE_DIR, keyed by the file's hash and that
+             format — later launches np.load it and skip the decoder
+  buffer     opens the mixer with MIXER_BUFFER frames (about 6 ms at
+             44.1 kHz instead of pygame's 512–4096)
+  voices     each sample owns `voices` reserved channels, so nothing else
+             (or another sample) can take them; a trigger uses a free one
+             or steals the one that started longest ago
+  latency    every trigger's call time is recorded; output follows within
+             the mixer's buffer period after that
+
+    engine = SampleEngine({"a": "scratch.mp3", "b": ("horn.mp3", 2)}).start()
+    engine.trigger("a")
+    print(engine.report())
+
+Run this file directly to check the cache and voice stealing, and — with
+pygame and the mp3s present — to time startup with and without the cache and
+trigger latency against the old default-buffer sound_effects.py:
+    python sample_engine.py
+    python sample_engine.py --clear      delete the cache
+"""
+
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from digest import file_digest
+from latency import LatencyHistogram
+
+CACHE_DIR     = ".sample_cache"
+SAMPLE_RATE   = 44100
+MIXER_BUFFER  = 256      # frames per mixer buffer (power of 2); raise it if playback crackles
+MIXER_CHANNELS = 16      # channels in total; the ones not reserved are for other sounds
+VOICES        = 4        # default simultaneous voices per sample
+
+# key → file (or (file, voices)) for sound_effects.py and runtime.py; paths
+# are relative to where you run them
+SOUNDS = {
+    "a": "matimassa-fx-scratch-02-379219.mp3",
+    "b": "waitwhatimsignedin-air-horn-273892.mp3",
+}
+
+
+class PcmCache:
+    """Decoded PCM arrays on disk, one .npy per (file contents, mixer format)."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source, fmt):
+        rate, size, channels = fmt
+        return os.path.join(self.cache_dir,
+                            f"{file_digest(source)[:24]}-{rate}-{size}-{channels}.npy")
+
+    def load(self, source, fmt, decode):
+        """The PCM array for `source`, calling decode(source) only on a miss."""
+        path = self.path(source, fmt)
+        try:
+            pcm = np.load(path)
+            self.hits += 1
+            return pcm
+        except (OSError, ValueError):
+            pass
+        pcm = np.ascontiguousarray(decode(source))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = path + ".tmp.npy"
+        np.save(tmp, pcm)
+        os.replace(tmp, path)
+        self.misses += 1
+        return pcm
+
+
+class VoicePool:
+    """
+    The channels one sample may play on. acquire() returns (channel,
+    stolen): a free channel, or the one started longest ago.
+    """
+
+    def __init__(self, channels, clock=time.perf_counter):
+        self.channels = list(channels)
+        self.clock = clock
+        self.started = [float("-inf")] * len(self.channels)
+        self.stolen = 0
+
+    def acquire(self):
+        free = next((i for i, c in enumerate(self.channels) if not c.get_busy()), None)
+        stolen = free is None
+        i = free if not stolen else min(range(len(self.channels)), key=self.started.__getitem__)
+        self.started[i] = self.clock()
+        self.stolen += stolen
+        return self.channels[i], stolen
+
+    def stop(self):
+        for c in self.channels:
+            c.stop()
+
+
+class SampleEngine:
+    """
+    sounds: key → path, or key → (path, voices). start() opens the mixer
+    and loads everything; trigger(key) plays a sample from any thread.
+    """
+
+    def __init__(self, sounds, buffer=MIXER_BUFFER, rate=SAMPLE_RATE, channels=MIXER_CHANNELS,
+                 voices=VOICES, cache_dir=CACHE_DIR, use_cache=True, verbose=True):
+        self.sounds = {key: (spec, voices) if isinstance(spec, str) else tuple(spec)
+                       for key, spec in sounds.items()}
+        self.buffer = buffer
+        self.rate = rate
+        self.n_channels = channels
+        self.cache = PcmCache(cache_dir) if use_cache else None
+        self.verbose = verbose
+        self.samples = {}        # key → pygame Sound
+        self.pools = {}          # key → VoicePool
+        self.format = None       # (rate, size, channels) the mixer really opened with
+        self.startup = {}        # "mixer" / "load" seconds
+        self.latency = LatencyHistogram()   # trigger() call → the mixer has the voice
+        self.triggers = 0
+        self.missing = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        import pygame
+
+        t0 = time.perf_counter()
+        pygame.mixer.pre_init(self.rate, -16, 2, self.buffer)
+        pygame.mixer.init()
+        self.format = pygame.mixer.get_init()
+        t1 = time.perf_counter()
+
+        reserved = sum(voices for path, voices in self.sounds.values() if os.path.exists(path))
+        pygame.mixer.set_num_channels(max(self.n_channels, reserved))
+        pygame.mixer.set_reserved(reserved)
+        first = 0
+        for key, (path, voices) in self.sounds.items():
+            if not os.path.exists(path):
+                self.missing.append(path)
+                continue
+            if self.cache is not None:
+                pcm = self.cache.load(path, self.format, self._decode)
+            else:
+                pcm = self._decode(path)
+            self.samples[key] = pygame.sndarray.make_sound(pcm)
+            self.pools[key] = VoicePool(pygame.mixer.Channel(i)
+                                        for i in range(first, first + voices))
+            first += voices
+        t2 = time.perf_counter()
+
+        self.startup = {"mixer": t1 - t0, "load": t2 - t1}
+        if self.verbose:
+            cached = f", {self.cache.hits} from cache" if self.cache is not None else ""
+            print(f"🔊 {len(self.samples)} samples in {(t2 - t0) * 1e3:.0f} ms{cached} "
+                  f"(mixer {self.format[0]} Hz, {self.buffer} frames = "
+                  f"{self.buffer_ms:.1f} ms buffer)")
+            for path in self.missing:
+                print(f"   missing: {path}")
+        return self
+
+    @staticmethod
+    def _decode(path):
+        import pygame
+
+        return pygame.sndarray.array(pygame.mixer.Sound(path))
+
+    @property
+    def buffer_ms(self):
+        rate = self.format[0] if self.format else self.rate
+        return self.buffer * 1000.0 / rate
+
+    def trigger(self, key):
+        """Play sample `key` (unknown keys are ignored). True if a voice was stolen."""
+        sound = self.samples.get(key)
+        if sound is None:
+            return False
+        t0 = time.perf_counter()
+        with self.lock:
+            channel, stolen = self.pools[key].acquire()
+            channel.play(sound)
+            self.latency.add(time.perf_counter() - t0)
+            self.triggers += 1
+        return stolen
+
+    def stop(self):
+        for pool in self.pools.values():
+            pool.stop()
+
+    def close(self):
+        import pygame
+
+        self.stop()
+        pygame.mixer.quit()
+
+    def report(self):
+        h = self.latency
+        stolen = sum(p.stolen for p in self.pools.values())
+        line = (f"samples: {self.triggers} triggers, {stolen} voices stolen, startup "
+                f"{sum(self.startup.values()) * 1e3:.0f} ms")
+        if h.n:
+            line += (f"; trigger p50 {h.percentile(50) * 1e3:.2f} ms  "
+                     f"p99 {h.percentile(99) * 1e3:.2f} ms, then ≤ {self.buffer_ms:.1f} ms "
+                     f"to output")
+        return line
+
+
+# ── Self-check and benchmark ──
+class _FakeChannel:
+    """Stands in for a pygame Channel: busy until `ends`."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.ends = float("-inf")
+
+    def get_busy(self):
+        return self.clock() < self.ends
+
+    def play(self, length):
+        self.ends = self.clock() + length
+
+    def stop(self):
+        self.ends = float("-inf")
+
+
+def _self_check():
+    import tempfile
+
+    # Voice stealing: 3 voices, 1 s samples, five quick triggers then a pause
+    now = [0.0]
+    pool = VoicePool([_FakeChannel(lambda: now[0]) for _ in range(3)], clock=lambda: now[0])
+    order = []
+    for t in (0.0, 0.1, 0.2, 0.3, 0.4, 1.35):
+        now[0] = t
+        channel, stolen = pool.acquire()
+        channel.play(1.0)
+        order.append((pool.channels.index(channel), stolen))
+    # The 4th and 5th steal the longest-playing voices; by 1.35 s the 4th
+    # (0.3 s → 1.3 s) has ended and its channel is free again
+    assert order == [(0, False), (1, False), (2, False), (0, True), (1, True), (0, False)], order
+    assert pool.stolen == 2
+    print("voices: a full pool steals the longest-playing voice")
+
+    # Cache: decode once per file contents + format
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "a.mp3")
+        with open(src, "wb") as f:
+            f.write(b"not really an mp3")
+        calls = []
+
+        def decode(path):
+            calls.append(path)
+            return np.arange(20, dtype=np.int16).reshape(10, 2)
+
+        cache = PcmCache(os.path.join(tmp, "cache"))
+        fmt = (44100, -16, 2)
+        a = cache.load(src, fmt, decode)
+        b = cache.load(src, fmt, decode)
+        cache.load(src, (48000, -16, 2), decode)
+        with open(src, "ab") as f:
+            f.write(b"!")
+        cache.load(src, fmt, decode)
+        assert np.array_equal(a, b) and len(calls) == 3 and cache.hits == 1, (calls, cache.hits)
+    print("cache: one decode per file contents and mixer format")
+
+
+def _benchmark(sounds, triggers=400, hz=50.0):
+    import tempfile
+
+    import pygame
+
+    def cold_start(**kwargs):
+        engine = SampleEngine(sounds, verbose=False, **kwargs).start()
+        engine.close()
+        return engine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old = cold_start(buffer=4096, use_cache=False)    # sound_effects.py before
+        cold = cold_start(cache_dir=tmp)
+        warm = cold_start(cache_dir=tmp)
+    print(f"\n{'startup':<28s} {'mixer':>8s} {'load':>8s} {'total':>8s}")
+    for name, e in [("decode, 4096-frame buffer", old), ("cache miss (decode + save)", cold),
+                    ("cache hit", warm)]:
+        s = e.startup
+        print(f"{name:<28s} {s['mixer'] * 1e3:>6.0f} ms {s['load'] * 1e3:>6.0f} ms "
+              f"{(s['mixer'] + s['load']) * 1e3:>6.0f} ms")
+
+    # Key mashing: every sample `hz` times a second, longer than one voice lasts
+    print(f"\n{triggers} triggers at {hz:.0f}/s across {len(sounds)} samples:")
+    print(f"{'mixer buffer':<14s} {'call p50':>9s} {'call p99':>9s} {'+ buffer':>9s} "
+          f"{'stolen':>7s}")
+    for buffer in (4096, 1024, MIXER_BUFFER):
+        engine = SampleEngine(sounds, buffer=buffer, verbose=False).start()
+        keys = list(engine.samples)
+        for n in range(triggers):
+            engine.trigger(keys[n % len(keys)])
+            time.sleep(1.0 / hz)
+        h = engine.latency
+        stolen = sum(p.stolen for p in engine.pools.values())
+        print(f"{buffer:>6d} frames  {h.percentile(50) * 1e3:>6.2f} ms "
+              f"{h.percentile(99) * 1e3:>6.2f} ms {engine.buffer_ms:>6.1f} ms {stolen:>7d}")
+        engine.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--clear" in sys.argv:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"Cleared '{CACHE_DIR}'")
+        raise SystemExit
+    _self_check()
+    try:
+        import pygame  # noqa: F401
+    except ImportError:
+        print("\npygame not installed — skipping the mixer benchmark")
+        raise SystemExit
+    _benchmark({k: v for k, v in SOUNDS.items() if os.path.exists(v)})
@@ -2,10 +2,13 @@ from pynput import keyboard
 import rtmidi
 import threading
 
+from midi_output import MidiOutput
+from midi_protocol import encode_jog
+from midi_scheduler import MidiScheduler
+
 MIDI_PORT_NAME = "WearableTest"
 
 VOL_CC = 7
-JOG_CC = 16
 SCRATCH_NOTE = 60
 MIDI_CH = 0
 
@@ -27,55 +30,50 @@ port_index = next((i for i, name in enumerate(ports) if MIDI_PORT_NAME in name),
 if port_index is None:
     raise RuntimeError(f"Could not find MIDI port containing '{MIDI_PORT_NAME}'. Available: {ports}")
 midi.open_port(port_index)
+scheduler = MidiScheduler(midi).start()   # one thread for all timed MIDI
+out = MidiOutput(scheduler)               # drops repeated values / stray note-offs
 
 volume = 80
 jog_direction = 0       # +1, -1, or 0
-jog_thread = None
 jog_lock = threading.Lock()
 
 def clamp(v, lo, hi):
     return lo if v < lo else hi if v > hi else v
 
 def send_cc(cc, value):
-    midi.send_message([0xB0 + MIDI_CH, cc & 0x7F, value & 0x7F])
+    out.send([0xB0 + MIDI_CH, cc & 0x7F, value & 0x7F])
 
 def send_note_on():
-    midi.send_message([0x90 + MIDI_CH, SCRATCH_NOTE & 0x7F, 127])
+    out.send([0x90 + MIDI_CH, SCRATCH_NOTE & 0x7F, 127])
 # added for sample
 def send_sample():
-    midi.send_message([0x90 + MIDI_CH, SAMPLE_NOTE, 127])
-    midi.send_message([0x90 + MIDI_CH, SAMPLE_NOTE, 0])
+    out.send([0x90 + MIDI_CH, SAMPLE_NOTE, 127])
+    out.send([0x90 + MIDI_CH, SAMPLE_NOTE, 0])
 
 def send_note_off():
-    midi.send_message([0x80 + MIDI_CH, SCRATCH_NOTE & 0x7F, 0])
+    out.send([0x80 + MIDI_CH, SCRATCH_NOTE & 0x7F, 0])
 
-def jog_loop():
-    """Continuously send jog ticks while a jog key is held."""
-    global jog_direction
-    while True:
-        with jog_lock:
-            d = jog_direction
-        if d == 0:
-            break
-        val = clamp(64 + JOG_TICK * d, 1, 127)
-        send_cc(JOG_CC, val)
-        threading.Event().wait(JOG_INTERVAL)
+def jog_tick():
+    """Runs every JOG_INTERVAL on the scheduler thread while a jog key is held."""
+    with jog_lock:
+        if jog_direction != 0:
+            out.send(encode_jog(MIDI_CH, JOG_TICK * jog_direction))
 
 def start_jog(direction):
-    global jog_direction, jog_thread
+    global jog_direction
     with jog_lock:
         already_running = jog_direction != 0
         jog_direction = direction
-    if not already_running:
-        send_note_on()
-        jog_thread = threading.Thread(target=jog_loop, daemon=True)
-        jog_thread.start()
+        if not already_running:
+            send_note_on()
+            scheduler.every("jog", JOG_INTERVAL, jog_tick)
 
 def stop_jog():
     global jog_direction
     with jog_lock:
         jog_direction = 0
-    send_note_off()
+        scheduler.cancel("jog")
+        send_note_off()
 
 def on_press(key):
     global volume
@@ -108,4 +106,7 @@ def on_release(key):
 
 print("Keys: =  -  [  ]  \\  P=sample   (Esc quits)")
 with keyboard.Listener(on_press=on_press, on_release=on_release) as kl:
-    kl.join()
\ No newline at end of file
+    kl.join()
+out.flush()
+print(scheduler.report())
+print(out.report())
\ No newline at end of file
@@ -1,223 +1,298 @@
 """
 WearableTest scratch controller — merges gesture classification with Mixxx MIDI output.
-Requires: movement_model.pkl (from step2_train_model.py)
+Requires: movement_model.forest (from step2_train_model.py)
+
+Several gloves can drive separate decks from one process: list them in
+DEVICES. Each gets its own serial reader, window and decision state; the
+model runs once per tick for all of them (gesture_controller.DeckGroup).
+
+To run without the glove/Mixxx, replay a recording instead:
+    python replay.py gesture_data.csv
+    python replay.py a.csv b.csv c.csv d.csv     # one stream per deck
 """
 
-import serial
-import rtmidi
-import numpy as np
-import pickle
-import time
 import threading
-from collections import deque
+
+from cadence import AdaptiveCadence
+from decision import CONFIRM_COUNT, ConfirmCountDecider, SequentialDecider
+from gesture_controller import (DeckGroup, GesturePipeline, GyroJog, MidiActions, load_model,
+                                open_midi)
+from latency import LatencyStats, StartupTimer
+from midi_output import MidiOutput
+from midi_protocol import FINE_STEPS
+from midi_scheduler import MidiScheduler
+from model_file import ModelFileError
+from motion_gate import MotionGate
+from serial_protocol import MODE_COMMANDS, make_decoder
+from serial_reader import SampleRing, SerialReader, open_serial, wait_for_stream
 
 # ─────────────────────────────────────────────────────────────
 #  *** CHANGE THESE TO MATCH YOUR SETUP ***
 SERIAL_PORT = "/dev/tty.usbserial-1120"
+SERIAL_FORMAT = "csv"     # "csv" (text lines), "binary" or "binary16" (framed, see serial_protocol.py)
 MIDI_PORT_NAME = "WearableTest"
-MODEL_FILE = "movement_model.pkl"
+MODEL_FILE = "movement_model.forest"   # or .pkl (slower, needs sklearn)
+
+# One entry per glove: (serial port, Mixxx deck, MIDI channel 0-15).
+# The Mixxx mapping sends MIDI channel N to deck N + 1, so the channel must
+# be deck - 1 (checked at startup).
+DEVICES = [
+    (SERIAL_PORT, 1, 0),
+    # ("/dev/tty.usbserial-1130", 2, 1),
+]
 # ─────────────────────────────────────────────────────────────
 
 BAUD               = 115200
+FAST_START         = True    # don't reset the board on connect (skips its calibration)
+AUTO_RECONNECT     = True    # reopen the port after a cable glitch instead of quitting
 CONFIDENCE_SCRATCH = 45   # left/right — slightly more lenient
 CONFIDENCE_VOL    = 50   # up/down — stricter
-CONFIRM_COUNT      = 5
 SILENCE_LIMIT      = 10
 
-VOL_CC        = 7
-JOG_CC        = 16
-SCRATCH_NOTE  = 60
-MIDI_CH       = 0
-
-VOL_STEP      = 3
-JOG_TICK      = 6
-JOG_INTERVAL  = 0.05
-
-# ── Load model ──
-print("=" * 50)
-print("WearableTest: Gesture → Mixxx Controller")
-print("=" * 50)
-
-try:
-    with open(MODEL_FILE, "rb") as f:
-        bundle = pickle.load(f)
-    clf         = bundle["model"]
-    classes     = bundle["classes"]
-    WINDOW_SIZE = bundle["window_size"]
-    STEP_SIZE   = bundle["step_size"]
-    print(f"✅ Model loaded. Detects: {classes}")
-except FileNotFoundError:
-    print(f"\nERROR: '{MODEL_FILE}' not found. Run step2_train_model.py first.")
-    exit()
-
-# ── Connect to MIDI ──
-midi = rtmidi.MidiOut()
-ports = midi.get_ports()
-port_index = next((i for i, name in enumerate(ports) if MIDI_PORT_NAME in name), None)
-if port_index is None:
-    raise RuntimeError(f"Could not find MIDI port '{MIDI_PORT_NAME}'. Available: {ports}")
-midi.open_port(port_index)
-print(f"✅ MIDI connected: {ports[port_index]}")
-
-# ── Connect to Arduino ──
-print(f"\nConnecting to Arduino on {SERIAL_PORT}...")
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUD, timeout=1)
-    time.sleep(2)
-    ser.flushInput()
-    print("✅ Arduino connected!\n")
-except Exception as e:
-    print(f"\nERROR: Could not connect to {SERIAL_PORT}\n  {e}")
-    exit()
-
-# ── MIDI helpers ──
-volume = 80
-jog_direction = 0
-jog_thread = None
-jog_lock = threading.Lock()
-
-def clamp(v, lo, hi):
-    return lo if v < lo else hi if v > hi else v
-
-def send_cc(cc, value):
-    midi.send_message([0xB0 + MIDI_CH, cc & 0x7F, value & 0x7F])
-
-def send_note_on():
-    midi.send_message([0x90 + MIDI_CH, SCRATCH_NOTE & 0x7F, 127])
-
-def send_note_off():
-    midi.send_message([0x80 + MIDI_CH, SCRATCH_NOTE & 0x7F, 0])
-
-def jog_loop():
-    global jog_direction
-    while True:
-        with jog_lock:
-            d = jog_direction
-        if d == 0:
-            break
-        val = clamp(64 + JOG_TICK * d, 1, 127)
-        send_cc(JOG_CC, val)
-        threading.Event().wait(JOG_INTERVAL)
-
-def start_jog(direction):
-    global jog_direction, jog_thread
-    with jog_lock:
-        already_running = jog_direction != 0
-        jog_direction = direction
-    if not already_running:
-        send_note_on()
-        jog_thread = threading.Thread(target=jog_loop, daemon=True)
-        jog_thread.start()
-
-def stop_jog():
-    global jog_direction
-    with jog_lock:
-        jog_direction = 0
-    send_note_off()
-
-# ── Gesture → action ──
-def handle_gesture(label):
-    global volume
-    if label == "LEFT":
-        start_jog(-1)
-    elif label == "RIGHT":
-        start_jog(+1)
-    elif label in ("REST", "NONE"):
-        stop_jog()
-    elif label == "UP":
-        volume = clamp(volume + VOL_STEP, 0, 127)
-        send_cc(VOL_CC, volume)
-        print(f"  VOL {volume}")
-    elif label == "DOWN":
-        volume = clamp(volume - VOL_STEP, 0, 127)
-        send_cc(VOL_CC, volume)
-        print(f"  VOL {volume}")
-
-# ── Feature extraction ──
-def extract_features(window):
-    features = []
-    for col in range(window.shape[1]):
-        vals = window[:, col]
-        features += [vals.mean(), vals.std(), vals.min(), vals.max(), vals.max() - vals.min()]
-    return features
-
-# ── Live loop ──
-buffer         = deque(maxlen=WINDOW_SIZE)
-sample_count   = 0
-last_label     = None
-confirm_buffer = deque(maxlen=CONFIRM_COUNT)
-silence_count  = 0
-
-print("─" * 40)
-print("Move the sensor to control Mixxx!")
-print("  LEFT / RIGHT  →  scratch")
-print("  UP / DOWN     →  volume")
-print("  REST          →  resume playback")
-print("Press Ctrl+C to stop.")
-print("─" * 40 + "\n")
-
-try:
-    while True:
-        try:
-            raw = ser.readline().decode("utf-8", errors="ignore").strip()
-        except Exception:
-            continue
-
-        if not raw or raw.startswith("#") or raw.startswith("t_ms"):
-            continue
-
-        parts = raw.split(",")
-        if len(parts) != 7:
-            continue
-
+# "confirm"    — CONFIRM_COUNT agreeing predictions in a row (fixed delay)
+# "sequential" — commit as soon as accumulated evidence is strong enough
+DECISION_MODE      = "confirm"
+FALSE_TRIGGER_RATE = 1e-3    # sequential mode: lower = more cautious
+
+MOTION_GATE        = True    # skip the forest when the glove is clearly resting
+
+# Rest back-off: classify every STEP_SIZE samples while moving and every
+# SLOW_EVERY at rest, at most INFER_BUDGET_HZ on average. Saves CPU; it does
+# not lower decision latency. FAST_EVERY < STEP_SIZE classifies more often
+# just after motion starts, but that was no faster on the replay (see
+# cadence.py), so it stays at STEP_SIZE.
+ADAPTIVE_CADENCE   = True
+FAST_EVERY         = None    # None = STEP_SIZE
+SLOW_EVERY         = 25
+INFER_BUDGET_HZ    = 60
+
+# While scratching (after LEFT/RIGHT), drive the jog from the gyro on every
+# sample — speed and direction follow the hand. Off by default: the fixed
+# 20 Hz ticks are what the current scratch gesture plays. Try it with
+# `python replay.py --compare-jog`.
+GYRO_JOG           = False
+
+# Jog moves as 14-bit fine steps (pitch bend → WearableTest.jogTickFine):
+# 16x finer than CC16 ticks, so the gyro jog only needs a message every
+# JOG_HIRES_EVERY samples. Off by default because it changes the wire
+# protocol: turn it on only with the current mapping loaded in Mixxx.
+JOG_HIRES          = False
+JOG_HIRES_EVERY    = 2
+
+# Drop redundant MIDI (repeated CC values, volume steps faster than one per
+# 10 ms, note-offs with no note on) before it reaches Mixxx (midi_output.py)
+MIDI_COALESCE      = True
+
+LATENCY_STATS      = False   # per-stage p50/p95/p99, printed on Ctrl+C
+LATENCY_DUMP_EVERY = 10.0    # ...and every N seconds (None = only on exit)
+
+
+def make_decider(mode=DECISION_MODE, false_rate=FALSE_TRIGGER_RATE):
+    if mode == "confirm":
+        return ConfirmCountDecider(
+            CONFIRM_COUNT, CONFIDENCE_VOL,
+            thresholds={"LEFT": CONFIDENCE_SCRATCH, "RIGHT": CONFIDENCE_SCRATCH},
+            silence_limit=SILENCE_LIMIT)
+    if mode == "sequential":
+        return SequentialDecider(false_rate=false_rate, default_conf=CONFIDENCE_VOL,
+                                 silence_limit=SILENCE_LIMIT)
+    raise ValueError(f"Unknown DECISION_MODE '{mode}' (use 'confirm' or 'sequential')")
+
+
+def make_cadence(bundle, gate=None):
+    """The adaptive cadence, or None to classify every STEP_SIZE samples."""
+    if not ADAPTIVE_CADENCE:
+        return None
+    return AdaptiveCadence.for_model(bundle, gate, fast_every=FAST_EVERY,
+                                     slow_every=SLOW_EVERY, budget_hz=INFER_BUDGET_HZ)
+
+
+def build_controller(bundle, midi, verbose=True, on_decision=None, latency=None,
+                     scheduler=None, decider=None, cadence=None, channel=0, name="",
+                     gyro_jog=None, jog_hires=None, out=None):
+    """
+    MIDI actions + gesture pipeline wired the way the live controller runs.
+    `decider` / `cadence` / `gyro_jog` / `jog_hires` override DECISION_MODE /
+    ADAPTIVE_CADENCE / GYRO_JOG / JOG_HIRES. `out` is a MidiOutput to share
+    (one is made here if MIDI_COALESCE).
+    """
+    if scheduler is None:
+        scheduler = MidiScheduler(midi).start()
+    if out is None and MIDI_COALESCE:
+        out = MidiOutput(scheduler)
+    if gyro_jog is None:
+        gyro_jog = GYRO_JOG
+    if jog_hires is None:
+        jog_hires = JOG_HIRES
+    if gyro_jog and jog_hires:
+        gyro_jog = GyroJog(fine_steps=FINE_STEPS, every=JOG_HIRES_EVERY)
+    elif gyro_jog:
+        gyro_jog = GyroJog()
+    actions = MidiActions(midi, channel=channel, verbose=verbose, scheduler=scheduler,
+                          gyro_jog=gyro_jog or None, hires=jog_hires, out=out)
+    gate = MotionGate.from_bundle(bundle) if MOTION_GATE else None
+    pipeline = GesturePipeline(
+        bundle["forest"],
+        bundle["window_size"],
+        # The step the model was trained with. Features are streamed, so the
+        # cadence can go down to every sample without extra copying.
+        infer_every=bundle["step_size"],
+        decider=decider if decider is not None else make_decider(),
+        actions=actions,
+        verbose=verbose,
+        on_decision=on_decision,
+        latency=latency,
+        gate=gate,
+        cadence=cadence if cadence is not None else make_cadence(bundle, gate),
+        name=name,
+    )
+    return actions, pipeline
+
+
+def build_decks(bundle, midi, devices, verbose=True, on_decision=None, latency=False,
+                scheduler=None, decider=None):
+    """
+    One controller per (port, deck, channel) binding, all on one MIDI
+    scheduler and one DeckGroup. on_decision(device, sample_index, label,
+    conf); `decider` is a factory (called once per device) if given.
+    Returns (actions list, DeckGroup). Raises ValueError if a channel
+    isn't deck - 1 (the mapping sends channel N to deck N + 1).
+    """
+    if scheduler is None:
+        scheduler = MidiScheduler(midi).start()
+    out = MidiOutput(scheduler) if MIDI_COALESCE else None
+    actions, pipelines = [], []
+    for d, (port, deck, channel) in enumerate(devices):
+        if channel != deck - 1:
+            raise ValueError(f"{port}: deck {deck} is MIDI channel {deck - 1} in the Mixxx "
+                             f"mapping, not {channel}")
+        cb = None
+        if on_decision is not None:
+            cb = lambda i, label, conf, d=d: on_decision(d, i, label, conf)  # noqa: E731
+        a, p = build_controller(
+            bundle, midi, verbose=verbose, on_decision=cb,
+            latency=(LatencyStats(dump_every=LATENCY_DUMP_EVERY if verbose else None)
+                     if latency else None),
+            scheduler=scheduler, decider=decider() if decider is not None else None,
+            channel=channel, name=f"[Deck {deck}] " if len(devices) > 1 else "", out=out)
+        actions.append(a)
+        pipelines.append(p)
+    return actions, DeckGroup(pipelines)
+
+
+def connect(port=SERIAL_PORT):
+    """Open a glove's port and put the sketch in SERIAL_FORMAT."""
+    ser = open_serial(port, BAUD, fast_start=FAST_START)
+    ser.write(MODE_COMMANDS[SERIAL_FORMAT])
+    return ser
+
+
+def main():
+    startup = StartupTimer()
+
+    # ── Load model ──
+    print("=" * 50)
+    print("WearableTest: Gesture → Mixxx Controller")
+    print("=" * 50)
+
+    try:
+        bundle = load_model(MODEL_FILE)
+        print(f"✅ Model loaded. Detects: {bundle['classes']}")
+        startup.mark("model loaded")
+    except FileNotFoundError:
+        print(f"\nERROR: '{MODEL_FILE}' not found. Run step2_train_model.py first.")
+        exit()
+    except ModelFileError as e:
+        print(f"\nERROR: {e}")
+        exit()
+
+    # ── Connect to MIDI ──
+    midi, port_name = open_midi(MIDI_PORT_NAME)
+    print(f"✅ MIDI connected: {port_name}")
+
+    # ── Connect to the gloves ──
+    readers, rings = [], []
+    event = threading.Event()    # one wake-up for every glove's ring
+    for port, deck, channel in DEVICES:
+        print(f"\nConnecting to Arduino on {port} (deck {deck}, MIDI ch {channel + 1})...")
+        decoder = make_decoder(SERIAL_FORMAT)
         try:
-            sample = [float(parts[2]), float(parts[3]), float(parts[4]),
-                      float(parts[5]), float(parts[6])]
-        except ValueError:
-            continue
-
-        buffer.append(sample)
-        sample_count += 1
-
-        if len(buffer) == WINDOW_SIZE and sample_count % STEP_SIZE == 0:
-            window = np.array(buffer)
-            feats  = np.array([extract_features(window)])
-
+            ser = connect(port)
+            startup.mark("port open")
+            first, booted = wait_for_stream(ser, decoder)
+            print(f"✅ Arduino connected! ({SERIAL_FORMAT}, "
+                  f"{'board restarted' if booted else 'already streaming'})")
+            startup.mark("first sample")
+        except Exception as e:
+            print(f"\nERROR: Could not connect to {port}\n  {e}")
+            exit()
+        ring = SampleRing(capacity=max(256, 8 * bundle["window_size"]), event=event)
+        ring.write(first)
+        reopen = (lambda port=port: connect(port)) if AUTO_RECONNECT else None
+        readers.append(SerialReader(ser, decoder, ring, reopen=reopen))
+        rings.append(ring)
+
+    actions, group = build_decks(
+        bundle, midi, DEVICES, latency=LATENCY_STATS,
+        on_decision=lambda d, i, label, conf: startup.mark("first decision"))
+
+    # ── Live loop ──
+    print("\n" + "─" * 40)
+    print("Move the sensor to control Mixxx!")
+    print("  LEFT / RIGHT  →  scratch" + (" (then the jog follows your hand)" if GYRO_JOG else ""))
+    print("  UP / DOWN     →  volume")
+    print("  REST          →  resume playback")
+    print("Press Ctrl+C to stop.")
+    print("─" * 40 + "\n")
+
+    for reader in readers:
+        reader.start()
+    drops = [0] * len(readers)
+
+    try:
+        while True:
+            event.wait(timeout=0.5)
+            event.clear()
+            error = next((r.error for r in readers if r.error is not None), None)
+            if error is not None:
+                print(f"Serial error: {error}")
+                break
+            for d, reader in enumerate(readers):
+                if reader.disconnects != drops[d]:
+                    drops[d] = reader.disconnects
+                    print(f"⚠️  {DEVICES[d][0]}: connection lost — reconnecting...")
+                    actions[d].stop_jog()
+                    group.pipelines[d].reset()
+            if any(ring.head >= bundle["window_size"] for ring in rings):
+                startup.mark("first full window")
             try:
-                pred  = clf.predict(feats)[0]
-                proba = clf.predict_proba(feats)[0]
-                conf  = max(proba) * 100
-
-                threshold = CONFIDENCE_SCRATCH if pred in ("LEFT", "RIGHT") else CONFIDENCE_VOL
-
-                if conf >= threshold:
-                    silence_count = 0
-                    confirm_buffer.append(pred)
-                else:
-                    silence_count += 1
-                    confirm_buffer.append(None)
-                    if silence_count >= SILENCE_LIMIT:
-                        if last_label not in (None, "REST", "NONE"):
-                            print("  (no confident gesture — stopping)")
-                            stop_jog()
-                            last_label = "REST"
-                        silence_count = 0
-
-                if (len(confirm_buffer) == CONFIRM_COUNT
-                        and len(set(confirm_buffer)) == 1
-                        and confirm_buffer[-1] is not None
-                        and conf >= threshold
-                        and pred != last_label):
-                    print(f"  {pred}  ({conf:.0f}%)")
-                    handle_gesture(pred)
-                    last_label = pred
-
+                group.consume_rings(rings)
             except Exception as e:
                 print(f"Prediction error: {e}")
                 break
 
-except KeyboardInterrupt:
-    print("\n\nStopped.")
-finally:
-    stop_jog()
-    ser.close()
\ No newline at end of file
+    except KeyboardInterrupt:
+        print("\n\nStopped.")
+    finally:
+        for reader, a, (port, deck, _) in zip(readers, actions, DEVICES):
+            reader.stop()
+            a.close()
+            reader.ser.close()
+            st = reader.stats()
+            print(f"{port} (deck {deck}) — samples: {st['received']}  "
+                  f"overruns: {st['overruns']}  late: {st['late']}  skipped: {st['skipped']}  "
+                  f"lost: {st['lost']}  bad bytes: {st['bad_bytes']}  "
+                  f"reconnects: {reader.reconnects}")
+        print(actions[0].scheduler.report())
+        if MIDI_COALESCE:
+            print(actions[0].out.report())
+        if group.ticks:
+            print(f"Model calls: {group.ticks}, {group.batch_rows / group.ticks:.2f} windows each")
+        for pipeline, (port, deck, _) in zip(group.pipelines, DEVICES):
+            if pipeline.latency is not None:
+                print(f"\nDeck {deck} ({port}):")
+                pipeline.latency.dump()
+
+
+if __name__ == "__main__":
+    main()
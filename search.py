@@ -0,0 +1,222 @@
+"""
+Search window size, step and forest size for the best accuracy / latency trade-off.
+
+step2_train_model.py trains one fixed configuration. This trains a grid of
+them, one per process, and for each measures:
+
+  f1        macro F1 on the held-out 20% (same split as step2)
+  acc       accuracy on the same split
+  delay     implied decision delay: the window has to fill with the new
+            gesture, then CONFIRM_COUNT windows STEP_SIZE apart must agree
+            = (WINDOW_SIZE + (CONFIRM_COUNT - 1) * STEP_SIZE) / 100 Hz
+  infer     time of one FlatForest.predict_one (what the live loop runs
+            per window), measured afterwards one model at a time so
+            parallel training doesn't skew it
+  size      the .forest file the controllers would load
+
+and prints the Pareto frontier: configurations no other one beats on all
+four at once. Every trained model is kept in .search/ with its results.
+
+How to run:
+    python search.py                                  # default grid
+    python search.py --windows 20 30 --steps 5 --trees 50 300 --depths 10 20
+    python search.py --all                            # every row, not just the frontier
+    python search.py --export 7                       # deploy row 7 as movement_model.*
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+from decision import CONFIRM_COUNT
+from model_file import load_model_file, save_model_file
+from motion_gate import MotionGate
+from training_data import load_features, make_bundle
+
+# Same data and outputs as step2_train_model.py
+CSV_FILE       = "gesture_data.csv"
+RECORDINGS_DIR = "recordings"
+MODEL_FILE     = "movement_model.pkl"
+FOREST_FILE    = "movement_model.forest"
+FEATURE_COLS   = ["accelX", "accelY", "accelZ", "gyroX", "gyroY"]
+FEATURE_DTYPE  = np.float64
+GATE_QUANTILE  = 0.95
+
+SEARCH_DIR = ".search"
+RESULTS_FILE = os.path.join(SEARCH_DIR, "results.json")
+SAMPLE_HZ = 100
+
+WINDOWS = [20, 30, 40]
+STEPS = [5, 10]
+TREES = [50, 100, 300]
+DEPTHS = [10, 20]
+WORKERS = None           # None = one process per CPU core
+
+
+def config_name(cfg):
+    return f"w{cfg['window_size']}-s{cfg['step_size']}-t{cfg['n_estimators']}-d{cfg['max_depth']}"
+
+
+def _split(window_size, step_size):
+    X, y, _, _ = load_features(CSV_FILE, RECORDINGS_DIR, FEATURE_COLS, window_size,
+                               step_size, FEATURE_DTYPE, verbose=False)
+    X = np.asarray(X)
+    return X, train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+
+def train(cfg):
+    """Train one configuration the way step2 does. Returns (bundle, X_test, y_test)."""
+    X, (X_train, X_test, y_train, y_test) = _split(cfg["window_size"], cfg["step_size"])
+    clf = RandomForestClassifier(
+        n_estimators=cfg["n_estimators"],
+        max_depth=cfg["max_depth"],
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=cfg.get("n_jobs", 1),
+    )
+    clf.fit(X_train, y_train)
+    gate = MotionGate.fit(X_train, y_train, quantile=GATE_QUANTILE)
+    bundle = make_bundle(clf, cfg["window_size"], cfg["step_size"], FEATURE_COLS,
+                         X.shape[1], gate)
+    return bundle, X_test, y_test
+
+
+def run_config(cfg):
+    """Worker: train, score and save one configuration."""
+    t0 = time.perf_counter()
+    bundle, X_test, y_test = train(cfg)
+    y_pred = bundle["model"].predict(X_test)
+    path = os.path.join(SEARCH_DIR, config_name(cfg) + ".forest")
+    save_model_file(path, bundle)
+    delay = cfg["window_size"] + (CONFIRM_COUNT - 1) * cfg["step_size"]
+    return {
+        **cfg,
+        "f1": float(f1_score(y_test, y_pred, average="macro")),
+        "acc": float(accuracy_score(y_test, y_pred)),
+        "delay_ms": delay * 1000.0 / SAMPLE_HZ,
+        "size_mb": os.path.getsize(path) / 1e6,
+        "train_s": time.perf_counter() - t0,
+        "file": path,
+    }
+
+
+def time_inference(path, blocks=15, calls=40):
+    """
+    ms per predict_one on a real-sized random feature vector: the fastest
+    of several blocks of calls, so a stray scheduler hiccup doesn't count.
+    """
+    forest = load_model_file(path)["forest"]
+    x = np.random.default_rng(0).normal(size=forest.n_features)
+    forest.predict_one(x)          # fault the pages in
+    best = float("inf")
+    for _ in range(blocks):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            forest.predict_one(x)
+        best = min(best, (time.perf_counter() - t0) / calls)
+    return best * 1000.0
+
+
+def pareto(rows):
+    """Indices of rows not dominated on (f1 ↑, delay ↓, infer ↓, size ↓)."""
+    keys = np.array([(-r["f1"], r["delay_ms"], r["infer_ms"], r["size_mb"]) for r in rows])
+    front = []
+    for i, k in enumerate(keys):
+        dominated = np.any(np.all(keys <= k, axis=1) & np.any(keys < k, axis=1))
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def report(rows, show_all=False):
+    front = set(pareto(rows))
+    print(f"\n{'#':>3s}  {'W':>3s} {'step':>4s} {'trees':>5s} {'depth':>5s}  "
+          f"{'f1':>6s} {'acc':>6s}  {'delay ms':>8s} {'infer ms':>8s} {'size MB':>7s}")
+    order = sorted(range(len(rows)), key=lambda i: (rows[i]["delay_ms"], -rows[i]["f1"]))
+    for i in order:
+        if not show_all and i not in front:
+            continue
+        r = rows[i]
+        mark = "*" if i in front else " "
+        print(f"{i:>3d}{mark} {r['window_size']:>3d} {r['step_size']:>4d} {r['n_estimators']:>5d} "
+              f"{str(r['max_depth']):>5s}  {r['f1']:>6.3f} {r['acc']:>6.3f}  "
+              f"{r['delay_ms']:>8.0f} {r['infer_ms']:>8.3f} {r['size_mb']:>7.1f}")
+    print(f"\n* = Pareto frontier ({len(front)} of {len(rows)}): nothing else is at least as "
+          f"good on F1, delay, inference time and size and better on one.")
+    print("Deploy one with:  python search.py --export <#>")
+
+
+def export(rows, index):
+    """Retrain row `index` (deterministic, same seed) and write movement_model.pkl/.forest."""
+    cfg = {k: rows[index][k] for k in ("window_size", "step_size", "n_estimators", "max_depth")}
+    print(f"Exporting #{index} ({config_name(cfg)})...")
+    bundle, _, _ = train({**cfg, "n_jobs": -1})
+    with open(MODEL_FILE, "wb") as f:
+        pickle.dump(bundle, f)
+    save_model_file(FOREST_FILE, bundle)
+    same = open(FOREST_FILE, "rb").read() == open(rows[index]["file"], "rb").read()
+    print(f"✅ Saved '{MODEL_FILE}' and '{FOREST_FILE}' "
+          f"(identical to the searched model: {same})")
+    print(f"   WINDOW_SIZE={cfg['window_size']}, STEP_SIZE={cfg['step_size']} travel with the "
+          f"model — the live scripts read them from it.")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Window / forest-size search with a Pareto report.")
+    ap.add_argument("--windows", type=int, nargs="+", default=WINDOWS)
+    ap.add_argument("--steps", type=int, nargs="+", default=STEPS)
+    ap.add_argument("--trees", type=int, nargs="+", default=TREES)
+    ap.add_argument("--depths", type=int, nargs="+", default=DEPTHS)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--all", action="store_true", help="list every configuration")
+    ap.add_argument("--report", action="store_true", help="re-print the last search")
+    ap.add_argument("--export", type=int, metavar="#", help="deploy a row of the last search")
+    args = ap.parse_args()
+
+    if args.report or args.export is not None:
+        with open(RESULTS_FILE) as f:
+            rows = json.load(f)
+        if args.export is not None:
+            export(rows, args.export)
+        else:
+            report(rows, args.all)
+        return
+
+    shutil.rmtree(SEARCH_DIR, ignore_errors=True)
+    os.makedirs(SEARCH_DIR)
+    configs = [{"window_size": w, "step_size": st, "n_estimators": t, "max_depth": d}
+               for w, st, t, d in product(args.windows, args.steps, args.trees, args.depths)]
+    print(f"Searching {len(configs)} configurations...")
+
+    # Features once per window setting, so the workers all hit the cache
+    for w, st in product(args.windows, args.steps):
+        load_features(CSV_FILE, RECORDINGS_DIR, FEATURE_COLS, w, st, FEATURE_DTYPE,
+                      verbose=False)
+
+    t0 = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for row in pool.map(run_config, configs):
+            rows.append(row)
+            print(f"  {config_name(row):<20s} f1 {row['f1']:.3f}  ({row['train_s']:.1f} s)")
+    print(f"Trained in {time.perf_counter() - t0:.0f} s; timing inference...")
+    for row in rows:
+        row["infer_ms"] = time_inference(row["file"])
+
+    with open(RESULTS_FILE, "w") as f:
+        json.dump(rows, f, indent=1)
+    report(rows, args.all)
+
+
+if __name__ == "__main__":
+    main()
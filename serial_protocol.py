@@ -0,0 +1,282 @@
+"""
+Serial stream decoding for 1gyroscope_raw_data.ino.
+
+The sketch can stream either the original CSV text lines
+    t_ms,label,ax_mps2,ay_mps2,az_mps2,gx_rads,gy_rads
+or fixed-size binary frames (little-endian, packed):
+
+    offset  size  field
+    0       2     sync   0xA5 0x5A
+    2       1     fmt    0 = 5 x float32 values, 1 = 5 x int16 scaled values
+    3       1     label  Label enum from the sketch (0 = NONE, 1 = REST, ...)
+    4       2     seq    uint16, +1 per sample, wraps
+    6       4     t_ms   uint32 millis()
+    10      20/10 values ax, ay, az (m/s^2), gx, gy (rad/s)
+    30/20   2     check  Fletcher-16 over bytes 2 .. end of values
+
+int16 values are accel * ACCEL_SCALE and gyro * GYRO_SCALE.
+
+Both decoders have the same interface: feed() takes whatever bytes were
+waiting on the port and returns every complete sample as one structured
+NumPy array (fields seq, t_ms, label, values). Partial frames/lines are kept
+for the next call; corrupted bytes are skipped and the decoder resyncs on the
+next valid frame.
+
+Run this file directly to time the decoder (the checks are in
+tests/test_serial_protocol.py):
+    python serial_protocol.py
+"""
+
+import numpy as np
+
+LABELS = ["NONE", "REST", "UP", "DOWN", "FWD", "BWD", "LEFT", "RIGHT", "CIRCLE", "SCRATCH"]
+LABEL_CODES = {name: i for i, name in enumerate(LABELS)}
+
+SYNC = b"\xA5\x5A"
+FMT_F32 = 0
+FMT_I16 = 1
+ACCEL_SCALE = 400.0    # int16 → ±81.9 m/s^2 (sensor range is ±8 g)
+GYRO_SCALE  = 3000.0   # int16 → ±10.9 rad/s (sensor range is ±500 dps)
+N_VALUES = 5
+
+SAMPLE_DTYPE = np.dtype([
+    ("seq", np.int64),
+    ("t_ms", np.float64),
+    ("label", np.uint8),
+    ("values", np.float64, (N_VALUES,)),
+])
+
+_FRAME_DTYPES = {
+    fmt: np.dtype([
+        ("sync", "<u2"),
+        ("fmt", "u1"),
+        ("label", "u1"),
+        ("seq", "<u2"),
+        ("t_ms", "<u4"),
+        ("values", vtype, (N_VALUES,)),
+        ("check", "<u2"),
+    ])
+    for fmt, vtype in ((FMT_F32, "<f4"), (FMT_I16, "<i2"))
+}
+FRAME_SIZES = {fmt: dt.itemsize for fmt, dt in _FRAME_DTYPES.items()}
+_SCALE = np.array([ACCEL_SCALE] * 3 + [GYRO_SCALE] * 2)
+
+
+def _frame_sizes(fmt_bytes):
+    return np.where(fmt_bytes == FMT_I16, FRAME_SIZES[FMT_I16], FRAME_SIZES[FMT_F32])
+
+
+def fletcher16(body):
+    """Fletcher-16 of each row of a (n, L) uint8 array (or one bytes object)."""
+    b = np.atleast_2d(np.frombuffer(body, np.uint8) if isinstance(body, (bytes, bytearray))
+                      else body).astype(np.int64)
+    L = b.shape[1]
+    s1 = b.sum(axis=1) % 255
+    s2 = (b * np.arange(L, 0, -1)).sum(axis=1) % 255
+    return (s2 << 8) | s1
+
+
+def encode_frame(seq, t_ms, values, label=0, fmt=FMT_F32):
+    """One binary frame, byte-identical to what the sketch sends."""
+    frame = np.zeros(1, _FRAME_DTYPES[fmt])
+    frame["sync"] = 0x5AA5   # little-endian → bytes A5 5A
+    frame["fmt"] = fmt
+    frame["label"] = label
+    frame["seq"] = seq & 0xFFFF
+    frame["t_ms"] = t_ms
+    vals = np.asarray(values, dtype=np.float64)
+    if fmt == FMT_I16:
+        vals = np.clip(np.round(vals * _SCALE), -32768, 32767)
+    frame["values"] = vals
+    raw = frame.view(np.uint8)
+    frame["check"] = fletcher16(raw[2:-2].reshape(1, -1))[0]
+    return frame.tobytes()
+
+
+class FrameDecoder:
+    """Bulk decoder for the binary frame format."""
+
+    def __init__(self):
+        self.pending = b""
+        self.frames = 0
+        self.bad_bytes = 0      # bytes skipped while resyncing
+        self.lost = 0           # frames missing according to seq
+        self.last_seq = None
+
+    def reset(self):
+        """
+        Forget the old stream after a reconnect: its partial frame, and the
+        last seq — a reset board starts again from 0, which is not a gap.
+        """
+        self.pending = b""
+        self.last_seq = None
+
+    def feed(self, data):
+        buf = self.pending + bytes(data)
+        arr = np.frombuffer(buf, np.uint8)
+        n = len(arr)
+        if n < 3:
+            self.pending = buf
+            return np.empty(0, SAMPLE_DTYPE)
+
+        starts = np.flatnonzero((arr[:-2] == 0xA5) & (arr[1:-1] == 0x5A))
+        fmts = arr[starts + 2]
+
+        good_starts, good_frames = [], []
+        for fmt, dt in _FRAME_DTYPES.items():
+            size = dt.itemsize
+            s = starts[(fmts == fmt) & (starts + size <= n)]
+            if len(s) == 0:
+                continue
+            raw = arr[s[:, None] + np.arange(size)]
+            ok = fletcher16(raw[:, 2:-2]) == raw[:, -2:].copy().view("<u2")[:, 0]
+            s, raw = s[ok], raw[ok]
+            if len(s) == 0:
+                continue
+            frames = raw.copy().view(dt)[:, 0]
+            values = frames["values"].astype(np.float64)
+            if fmt == FMT_I16:
+                values /= _SCALE
+            out = np.empty(len(s), SAMPLE_DTYPE)
+            out["seq"] = frames["seq"]
+            out["t_ms"] = frames["t_ms"]
+            out["label"] = frames["label"]
+            out["values"] = values
+            good_starts.append(s)
+            good_frames.append(out)
+
+        if good_starts:
+            s = np.concatenate(good_starts)
+            out = np.concatenate(good_frames)
+            order = np.argsort(s, kind="stable")
+            s, out = s[order], out[order]
+            ends = s + _frame_sizes(arr[s + 2])
+            if len(s) > 1 and np.any(s[1:] < ends[:-1]):
+                # A fake sync inside a payload passed the checksum — keep the
+                # first frame of each overlapping run.
+                keep = np.zeros(len(s), bool)
+                free = 0
+                for i in range(len(s)):
+                    if s[i] >= free:
+                        keep[i] = True
+                        free = ends[i]
+                s, ends, out = s[keep], ends[keep], out[keep]
+            consumed = int(ends[-1])
+            used = int((ends - s).sum())
+        else:
+            out = np.empty(0, SAMPLE_DTYPE)
+            consumed, used = 0, 0
+
+        # Keep the tail from the first sync that could still become a frame
+        tail = starts[(starts >= consumed) & (fmts <= FMT_I16)]
+        tail = tail[tail + _frame_sizes(arr[tail + 2]) > n]
+        if len(tail):
+            keep_from = int(tail[0])
+        elif arr[-2] == 0xA5 and arr[-1] == 0x5A:
+            keep_from = n - 2
+        elif arr[-1] == 0xA5:
+            keep_from = n - 1
+        else:
+            keep_from = n
+        keep_from = max(keep_from, consumed)
+
+        self.bad_bytes += keep_from - used
+        self.pending = buf[keep_from:]
+        self._count(out)
+        return out
+
+    def _count(self, out):
+        if len(out) == 0:
+            return
+        seq = out["seq"]
+        if self.last_seq is not None:
+            seq = np.concatenate([[self.last_seq], seq])
+        gaps = (np.diff(seq) - 1) % 0x10000
+        self.lost += int(gaps.sum())
+        self.last_seq = int(out["seq"][-1])
+        self.frames += len(out)
+
+
+def parse_csv_line(raw):
+    """(t_ms, label, [ax, ay, az, gx, gy]) for one CSV data line, or None."""
+    if not raw or raw.startswith("#") or raw.startswith("t_ms"):
+        return None
+    parts = raw.split(",")
+    if len(parts) != 7:
+        return None
+    try:
+        return (float(parts[0]), parts[1].strip(),
+                [float(parts[2]), float(parts[3]), float(parts[4]),
+                 float(parts[5]), float(parts[6])])
+    except ValueError:
+        return None
+
+
+class CsvDecoder:
+    """Same feed() interface as FrameDecoder for the original text stream."""
+
+    def __init__(self):
+        self.pending = b""
+        self.frames = 0
+        self.bad_bytes = 0      # bytes in lines that didn't parse
+        self.lost = 0           # CSV has no sequence numbers — always 0
+        self.last_seq = None
+
+    def reset(self):
+        """Drop the old stream's partial line after a reconnect (it has no checksum)."""
+        self.pending = b""
+
+    def feed(self, data):
+        lines = (self.pending + bytes(data)).split(b"\n")
+        self.pending = lines.pop()
+        rows = []
+        for line in lines:
+            parsed = parse_csv_line(line.decode("utf-8", errors="ignore").strip())
+            if parsed is None:
+                if line and not line.startswith((b"#", b"t_ms")):
+                    self.bad_bytes += len(line) + 1
+                continue
+            rows.append(parsed)
+
+        out = np.empty(len(rows), SAMPLE_DTYPE)
+        if rows:
+            first = self.frames
+            out["seq"] = np.arange(first, first + len(rows))
+            out["t_ms"] = [r[0] for r in rows]
+            out["label"] = [LABEL_CODES.get(r[1], 0) for r in rows]
+            out["values"] = [r[2] for r in rows]
+            self.frames += len(rows)
+            self.last_seq = self.frames - 1
+        return out
+
+
+# Characters that switch the sketch's output format (see handleSerialLabel)
+MODE_COMMANDS = {"csv": b"T", "binary": b"B", "binary16": b"I"}
+
+
+def make_decoder(serial_format):
+    """"csv", "binary" or "binary16" → a fresh decoder."""
+    if serial_format in ("binary", "binary16"):
+        return FrameDecoder()    # each frame says whether it is float32 or int16
+    if serial_format == "csv":
+        return CsvDecoder()
+    raise ValueError(f"Unknown serial format '{serial_format}' (use 'csv', 'binary' or 'binary16')")
+
+
+# ── Throughput on a synthetic byte stream ──
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 20000
+    values = np.column_stack([rng.normal(0, 5, (n, 3)), rng.normal(0, 1, (n, 2))])
+
+    for fmt in (FMT_F32, FMT_I16):
+        stream = b"".join(encode_frame(i, 10 * i, values[i], fmt=fmt) for i in range(n))
+        dec = FrameDecoder()
+        t0 = time.perf_counter()
+        for pos in range(0, len(stream), 256):    # about what one port read returns
+            dec.feed(stream[pos:pos + 256])
+        elapsed = time.perf_counter() - t0
+        print(f"fmt {fmt}: {dec.frames} frames, {len(stream) / elapsed / 1e6:.1f} MB/s "
+              f"({elapsed / dec.frames * 1e6:.2f} µs/frame)")
@@ -0,0 +1,240 @@
+"""
+Serial ingestion on its own thread.
+
+SerialReader reads whatever bytes are waiting, decodes them (CSV or binary,
+see serial_protocol.py) and writes the samples into a SampleRing. The
+classifier loop runs on the main thread and reads from the ring, so a slow
+prediction never backs up the OS serial buffer.
+
+SampleRing is a preallocated NumPy ring with one writer and one reader.
+Every sample is stored twice (at i and i + capacity), so any window of up to
+`capacity` samples is a contiguous view — no copy, no wrap-around handling.
+
+Counters for telling when the pipeline falls behind 100 Hz:
+  ring.overruns   samples overwritten before the reader got to them
+  ring.late       samples that were older than `late_ms` when read
+  ring.skipped    stale samples the reader chose to jump over to catch up
+  decoder.lost    samples the sketch sent that never arrived (binary seq gaps)
+  decoder.bad_bytes   bytes skipped as corrupt / unparseable
+
+Connecting (open_serial / wait_for_stream): with fast_start the port is
+opened without asserting DTR, so a board that resets on DTR keeps streaming
+instead of rebooting and re-running its ~1.5 s gyro calibration, and the
+controller starts as soon as valid data shows up rather than after a fixed
+sleep. Some OS drivers pulse DTR on open regardless; then the board does
+reset and wait_for_stream just waits for the CSV header after calibration.
+
+Given a `reopen` function, SerialReader survives a cable glitch: it closes
+the dead port, retries every RECONNECT_INTERVAL seconds and carries on with
+the same ring and decoder. `disconnects` / `reconnects` tell the consumer to
+stop the jog and restart its window.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+RECONNECT_INTERVAL = 0.5   # seconds between attempts to reopen a lost port
+
+
+class SampleRing:
+
+    def __init__(self, capacity=1024, n_channels=5, late_ms=30.0, event=None):
+        self.capacity = capacity
+        self.late_ms = late_ms
+        self.values  = np.zeros((2 * capacity, n_channels))
+        self.seq     = np.zeros(2 * capacity, np.int64)
+        self.label   = np.zeros(2 * capacity, np.uint8)     # LABELS code sent by the sketch
+        self.t_ms    = np.zeros(2 * capacity)
+        self.arrival = np.zeros(2 * capacity)   # time.perf_counter() when the bytes were read
+        self.parsed  = np.zeros(2 * capacity)   # time.perf_counter() when decoded
+        self.head = 0          # samples ever written (writer only)
+        self.tail = 0          # samples ever consumed (reader only)
+        self.overruns = 0
+        self.late = 0
+        self.skipped = 0
+        self.new_data = event if event is not None else threading.Event()   # may be shared
+
+    def write(self, samples, arrival=None, parsed=None):
+        """Append a SAMPLE_DTYPE array from a decoder (writer thread)."""
+        n = len(samples)
+        if n == 0:
+            return
+        if parsed is None:
+            parsed = time.perf_counter()
+        if arrival is None:
+            arrival = parsed
+        cap = self.capacity
+        behind_before = max(0, self.head - self.tail - cap)
+        if n > cap:
+            # More than the whole ring in one read — only the newest fit
+            self.head += n - cap
+            samples = samples[-cap:]
+            n = cap
+
+        idx = (self.head + np.arange(n)) % cap
+        for offset in (0, cap):
+            self.values[idx + offset]  = samples["values"]
+            self.seq[idx + offset]     = samples["seq"]
+            self.label[idx + offset]   = samples["label"]
+            self.t_ms[idx + offset]    = samples["t_ms"]
+            self.arrival[idx + offset] = arrival
+            self.parsed[idx + offset]  = parsed
+
+        self.overruns += max(0, self.head + n - self.tail - cap) - behind_before
+        self.head += n         # publish only after the data is in place
+        self.new_data.set()
+
+    def wait(self, timeout=None):
+        """Block until the writer has added samples (or timeout)."""
+        self.new_data.wait(timeout)
+        self.new_data.clear()
+
+    @property
+    def pending(self):
+        return self.head - self.tail
+
+    def view(self, start, stop, array=None):
+        """Contiguous view of samples [start, stop) by absolute index."""
+        array = self.values if array is None else array
+        first = start % self.capacity
+        return array[first:first + (stop - start)]
+
+    def latest(self, n):
+        """View of the newest n samples (n <= capacity), no copy."""
+        head = self.head
+        return self.view(head - n, head)
+
+    def consume(self, max_samples=None):
+        """
+        (first, last) absolute indices of the unread samples, oldest first,
+        and mark them read. Samples already overwritten are skipped (and were
+        counted as overruns by the writer). With max_samples, anything older
+        than the newest max_samples is jumped over and counted as skipped.
+        """
+        head = self.head
+        first = max(self.tail, head - self.capacity)
+        if max_samples is not None and head - first > max_samples:
+            self.skipped += head - max_samples - first
+            first = head - max_samples
+        if head > first:
+            age_ms = (time.perf_counter() - self.view(first, head, self.arrival)) * 1000
+            self.late += int((age_ms > self.late_ms).sum())
+        self.tail = head
+        return first, head
+
+
+# ── Connecting ──
+def open_serial(port, baud, fast_start=True, timeout=1):
+    """
+    Open the Arduino's port. fast_start leaves DTR/RTS low so the board isn't
+    reset; otherwise it's the original open, 2 s settle and input flush.
+    """
+    import serial
+
+    if not fast_start:
+        ser = serial.Serial(port, baud, timeout=timeout)
+        time.sleep(2)
+        ser.reset_input_buffer()
+        return ser
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = baud
+    ser.timeout = timeout
+    ser.dtr = False
+    ser.rts = False
+    ser.open()
+    return ser
+
+
+def wait_for_stream(ser, decoder, timeout=6.0):
+    """
+    Read until the decoder produces samples. Returns (samples, booted):
+    booted is True if the CSV header went past first (the board had just
+    reset), False if data was already flowing. Raises TimeoutError if no
+    valid sample arrives within `timeout` seconds.
+    """
+    deadline = time.perf_counter() + timeout
+    booted = False
+    while time.perf_counter() < deadline:
+        data = ser.read(ser.in_waiting or 1)
+        if not data:
+            continue
+        booted = booted or b"t_ms," in data
+        samples = decoder.feed(data)
+        if len(samples):
+            return samples, booted
+    raise TimeoutError(f"no valid data within {timeout:.0f} s — is the sketch running?")
+
+
+class SerialReader(threading.Thread):
+    """
+    Background thread: serial port → decoder → SampleRing.
+
+    reopen   optional function returning a freshly opened port; if given, a
+             read error triggers reconnection instead of ending the thread
+    """
+
+    def __init__(self, ser, decoder, ring, reopen=None):
+        super().__init__(daemon=True)
+        self.ser = ser
+        self.decoder = decoder
+        self.ring = ring
+        self.reopen = reopen
+        self.error = None
+        self.disconnects = 0
+        self.reconnects = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if self.reopen is None:
+                    self.error = e
+                    self.ring.new_data.set()   # wake the reader so it sees the error
+                    return
+                self.disconnects += 1
+                self.ring.new_data.set()
+                self._reconnect()
+                continue
+            if data:
+                t_read = time.perf_counter()
+                samples = self.decoder.feed(data)
+                self.ring.write(samples, t_read, time.perf_counter())
+
+    def _reconnect(self):
+        try:
+            self.ser.close()
+        except Exception:
+            pass
+        while not self._stop_event.wait(RECONNECT_INTERVAL):
+            try:
+                self.ser = self.reopen()
+            except Exception:
+                continue
+            # A partial line/frame from the old stream would be glued to the
+            # new stream's first bytes, and a reset board's seq restarts at 0
+            self.decoder.reset()
+            self.reconnects += 1
+            self.ring.new_data.set()
+            return
+
+    @property
+    def connected(self):
+        return self.reconnects == self.disconnects
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        return {
+            "received": self.ring.head,
+            "overruns": self.ring.overruns,
+            "late": self.ring.late,
+            "skipped": self.ring.skipped,
+            "lost": self.decoder.lost,
+            "bad_bytes": self.decoder.bad_bytes,
+        }
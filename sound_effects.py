@@ -1,44 +1,45 @@
 from pynput import keyboard
-import pygame
 import sys
 
-# 1. Initialize Pygame Mixer
-pygame.mixer.init()
+from sample_engine import SOUNDS, SampleEngine
 
-# 2. Load your sounds (ensure these files are in the same folder)
-try:
-    sound_a = pygame.mixer.Sound("/Users/tphan/Desktop/All stuff school/Cornell/Haptic Glove/matimassa-fx-scratch-02-379219.mp3")
-    sound_b = pygame.mixer.Sound("/Users/tphan/Desktop/All stuff school/Cornell/Haptic Glove/waitwhatimsignedin-air-horn-273892.mp3")
-except pygame.error as e:
-    print(f"Could not load sounds: {e}")
-    sys.exit()
+# 1. Your sounds are SOUNDS in sample_engine.py: key → mp3 (ensure these files
+#    are in the same folder, or use full paths)
 
-print("--- System Active ---")
-print("Press 'a' for Sound 1")
-print("Press 'b' for Sound 2")
-print("Press 'Esc' to exit")
-
-# 3. Define what happens when keys are pressed
-def on_press(key):
+if __name__ == "__main__":
+    # 2. Start the mixer and load the sounds (decoded once, then cached)
     try:
-        # Check for alphanumeric keys
-        if hasattr(key, 'char'):
-            if key.char == 'a':
-                sound_a.play()
-                print("Played Sound 1")
-            elif key.char == 'b':
-                sound_b.play()
-                print("Played Sound 2")
-                
-    except Exception as e:
-        print(f"Error: {e}")
+        engine = SampleEngine(SOUNDS).start()
+    except ImportError:
+        print("pygame is not installed (pip install pygame)")
+        sys.exit()
+    if not engine.samples:
+        print(f"Could not load sounds: {', '.join(engine.missing)}")
+        sys.exit()
+
+    print("--- System Active ---")
+    for n, key in enumerate(engine.samples, 1):
+        print(f"Press '{key}' for Sound {n}")
+    print("Press 'Esc' to exit")
+
+    # 3. Define what happens when keys are pressed
+    def on_press(key):
+        try:
+            # Check for alphanumeric keys
+            if getattr(key, 'char', None) in engine.samples:
+                engine.trigger(key.char)
+                print(f"Played '{key.char}'")
+        except Exception as e:
+            print(f"Error: {e}")
 
-def on_release(key):
-    # Stop the listener if Escape is pressed
-    if key == keyboard.Key.esc:
-        print("Exiting...")
-        return False
+    def on_release(key):
+        # Stop the listener if Escape is pressed
+        if key == keyboard.Key.esc:
+            print("Exiting...")
+            return False
 
-# 4. Start the listener
-with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
-    listener.join()
\ No newline at end of file
+    # 4. Start the listener
+    with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
+        listener.join()
+    print(engine.report())
+    engine.close()
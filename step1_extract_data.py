@@ -1,6 +1,10 @@
 """
 STEP 1 — Extract your data from all PDFs and save as a CSV file.
 
+For new data, record straight from the glove instead (python recorder.py) —
+no Serial Monitor printouts, no PDFs, nothing lost. This script is kept
+for the existing PDF recordings; step2 reads both.
+
 How to run:
   1. Put ALL your PDF files in the same folder as this script
   2. Open a terminal/command prompt in that folder
@@ -8,11 +12,20 @@ How to run:
   4. Run:  python step1_extract_data.py
 
 This will create a file called:  gesture_data.csv
+
+PDFs are parsed in parallel, one per process. Each PDF's rows are cached in
+.step1_cache/ under the hash of its contents, so a re-run only parses PDFs
+that are new or changed, and leaves gesture_data.csv alone if nothing did.
 """
 
-import pdfplumber
-import pandas as pd
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from digest import file_digest
 
 PDF_FILES = [
     "rest.pdf",
@@ -24,47 +37,126 @@ PDF_FILES = [
     "right_fast.pdf",
 ]
 CSV_FILE = "gesture_data.csv"
+CACHE_DIR = ".step1_cache"
+WORKERS = None      # None = one process per CPU core
 
-print("=" * 50)
-print("STEP 1: Extracting data from PDFs...")
-print("=" * 50)
+COLUMNS = ["timestamp", "label", "accelX", "accelY", "accelZ", "gyroX", "gyroY"]
+# Bump when the line parsing below changes, so old cache entries are ignored
+PARSER_VERSION = 1
 
-rows = []
-for PDF_FILE in PDF_FILES:
-    if not os.path.exists(PDF_FILE):
-        print(f"WARNING: Could not find '{PDF_FILE}' — skipping.")
-        continue
 
-    with pdfplumber.open(PDF_FILE) as pdf:
-        print(f"Reading '{PDF_FILE}' ({len(pdf.pages)} pages)...")
+def parse_lines(text):
+    """Data rows (lists of 7 strings) in one page of Serial Monitor text."""
+    rows = []
+    for line in text.split('\n'):
+        parts = line.strip().split(',')
+        if len(parts) == 7:
+            try:
+                float(parts[0])
+                label = parts[1].strip()
+                if label == 'UPDOWN':
+                    continue  # Skip old combined label
+                rows.append(parts)
+            except ValueError:
+                pass
+    return rows
+
+
+def extract_pdf(pdf_file):
+    """Worker: (rows, pages, seconds) for one PDF."""
+    import pdfplumber
+
+    t0 = time.perf_counter()
+    rows = []
+    with pdfplumber.open(pdf_file) as pdf:
+        pages = len(pdf.pages)
         for page in pdf.pages:
             text = page.extract_text()
-            if not text:
-                continue
-            for line in text.split('\n'):
-                parts = line.strip().split(',')
-                if len(parts) == 7:
-                    try:
-                        float(parts[0])
-                        label = parts[1].strip()
-                        if label == 'UPDOWN':
-                            continue  # Skip old combined label
-                        rows.append(parts)
-                    except ValueError:
-                        pass
-
-print(f"\nExtracted {len(rows)} total data rows.")
-
-df = pd.DataFrame(rows, columns=["timestamp", "label", "accelX", "accelY", "accelZ", "gyroX", "gyroY"])
-df = df.astype({
-    "timestamp": float,
-    "accelX": float, "accelY": float, "accelZ": float,
-    "gyroX": float, "gyroY": float
-})
-
-df.to_csv(CSV_FILE, index=False)
-
-print(f"\n✅ Saved to '{CSV_FILE}'")
-print("\nSamples per movement:")
-print(df["label"].value_counts().to_string())
-print("\nDone! Now run:  python step2_train_model.py")
+            if text:
+                rows += parse_lines(text)
+    return rows, pages, time.perf_counter() - t0
+
+
+def to_frame(rows):
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    return df.astype({
+        "timestamp": float,
+        "accelX": float, "accelY": float, "accelZ": float,
+        "gyroX": float, "gyroY": float
+    })
+
+
+def cache_path(digest):
+    return os.path.join(CACHE_DIR, f"{digest}-v{PARSER_VERSION}.csv")
+
+
+def main():
+    print("=" * 50)
+    print("STEP 1: Extracting data from PDFs...")
+    print("=" * 50)
+    t_start = time.perf_counter()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # ── Which PDFs changed? ──
+    digests, todo = {}, []
+    for pdf_file in PDF_FILES:
+        if not os.path.exists(pdf_file):
+            print(f"WARNING: Could not find '{pdf_file}' — skipping.")
+            continue
+        digests[pdf_file] = file_digest(pdf_file)
+        if not os.path.exists(cache_path(digests[pdf_file])):
+            todo.append(pdf_file)
+    hits = len(digests) - len(todo)
+
+    # ── Parse the new/changed ones in parallel ──
+    pages = 0
+    parse_s = 0.0
+    if todo:
+        print(f"Parsing {len(todo)} PDF(s) ({hits} unchanged, from cache)...")
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            for pdf_file, (rows, n_pages, secs) in zip(todo, pool.map(extract_pdf, todo)):
+                df = to_frame(rows)
+                tmp = cache_path(digests[pdf_file]) + ".tmp"
+                df.to_csv(tmp, index=False)
+                os.replace(tmp, cache_path(digests[pdf_file]))
+                pages += n_pages
+                print(f"  '{pdf_file}': {n_pages} pages, {len(df)} rows ({secs:.1f} s)")
+        parse_s = time.perf_counter() - t0
+
+    # ── Merge: unchanged PDFs come straight from the cache ──
+    manifest_file = os.path.join(CACHE_DIR, "manifest.json")
+    manifest = {"parser": PARSER_VERSION, "files": digests}
+    previous = None
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as f:
+            previous = json.load(f)
+    if not todo and previous == manifest and os.path.exists(CSV_FILE):
+        df = pd.read_csv(CSV_FILE)
+        print(f"\nNo PDFs changed — '{CSV_FILE}' is up to date.")
+    else:
+        frames = [pd.read_csv(cache_path(d), dtype={"label": str}) for d in digests.values()]
+        df = pd.concat(frames, ignore_index=True) if frames else to_frame([])
+        df.to_csv(CSV_FILE, index=False)
+        with open(manifest_file, "w") as f:
+            json.dump(manifest, f, indent=1)
+        print(f"\n✅ Saved {len(df)} rows to '{CSV_FILE}'")
+        # Drop cache entries of PDFs that have since changed or gone
+        keep = {os.path.basename(cache_path(d)) for d in digests.values()} | {"manifest.json"}
+        for name in os.listdir(CACHE_DIR):
+            if name not in keep:
+                os.remove(os.path.join(CACHE_DIR, name))
+
+    # ── Summary ──
+    total_s = time.perf_counter() - t_start
+    print(f"\nPDFs: {len(digests)}  cache hits: {hits}  parsed: {len(todo)}")
+    if todo:
+        print(f"Parsed {pages} pages in {parse_s:.1f} s ({pages / max(parse_s, 1e-9):.1f} pages/s)")
+    print(f"Total time: {total_s:.1f} s")
+    print("\nSamples per movement:")
+    print(df["label"].value_counts().to_string())
+    print("\nDone! Now run:  python step2_train_model.py")
+
+
+if __name__ == "__main__":
+    main()
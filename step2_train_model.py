@@ -2,10 +2,14 @@
 STEP 2 — Train the movement detection model from your CSV data.
 
 How to run:
-  1. Make sure you ran step1_extract_data.py and have gesture_data.csv
+  1. Record data with recorder.py (recordings/), or run step1_extract_data.py
+     for gesture_data.csv — both are used if both exist
   2. Run:  python step2_train_model.py
 
-This will create a file called:  movement_model.pkl
+This will create two files:
+  movement_model.pkl      the sklearn model (for retraining / analysis)
+  movement_model.forest   the same trees as flat arrays — what the live
+                          controllers load (fast, no sklearn; model_file.py)
 """
 
 import pandas as pd
@@ -16,54 +20,57 @@ from sklearn.metrics import classification_report
 import pickle
 import os
 
+from compress import evaluate, report as compress_report, select_cut
+from forest_engine import FlatForest
+from gesture_controller import load_model
+from gesture_model import GestureModel
+from model_file import save_model_file
+from motion_gate import MotionGate
+from training_data import load_features, make_bundle
+
 CSV_FILE    = "gesture_data.csv"
+RECORDINGS_DIR = "recordings"   # recorder.py output
 MODEL_FILE  = "movement_model.pkl"
+FOREST_FILE = "movement_model.forest"
 WINDOW_SIZE = 30
 STEP_SIZE   = 5
 FEATURE_COLS = ["accelX", "accelY", "accelZ", "gyroX", "gyroY"]
+FEATURE_DTYPE = np.float64   # np.float32 halves feature-matrix memory
+GATE_QUANTILE = 0.95         # rest gate: REST std quantile used as threshold
+USE_FEATURE_CACHE = True     # reuse features when only the forest settings change
+
+# Write a smaller forest to movement_model.forest (compress.py): fewest
+# trees / shallowest cut within COMPRESS_F1_TOLERANCE macro-F1 of the full
+# model that meets the budgets (None = no budget). The .pkl stays full size.
+COMPRESS              = False
+COMPRESS_F1_TOLERANCE = 0.01
+COMPRESS_LATENCY_MS   = None   # per-window FlatForest time
+COMPRESS_MAX_MB       = None
+COMPRESS_VAL_SIZE     = 0.2    # share of the training windows held out to pick the cut
 
 print("=" * 50)
 print("STEP 2: Training movement model...")
 print("=" * 50)
 
 # Always delete old model first
-if os.path.exists(MODEL_FILE):
-    os.remove(MODEL_FILE)
-    print("Deleted old model.")
+for old in (MODEL_FILE, FOREST_FILE):
+    if os.path.exists(old):
+        os.remove(old)
+        print(f"Deleted old model '{old}'.")
 
 try:
-    df = pd.read_csv(CSV_FILE)
-except FileNotFoundError:
-    print(f"\nERROR: '{CSV_FILE}' not found.")
-    print("Run step1_extract_data.py first.")
+    X, y, provenance, info = load_features(CSV_FILE, RECORDINGS_DIR, FEATURE_COLS,
+                                           WINDOW_SIZE, STEP_SIZE, FEATURE_DTYPE,
+                                           use_cache=USE_FEATURE_CACHE)
+except FileNotFoundError as e:
+    print(f"\nERROR: {e}.")
+    print("Record with recorder.py (or run step1_extract_data.py) first.")
     exit()
 
-print(f"\nLoaded {len(df)} rows.")
+print(f"\nLoaded {info['rows']} rows.")
 print("\nSamples per movement:")
-print(df["label"].value_counts().to_string())
-
-def extract_features(window):
-    features = []
-    for col in range(window.shape[1]):
-        vals = window[:, col]
-        features += [
-            vals.mean(),
-            vals.std(),
-            vals.min(),
-            vals.max(),
-            vals.max() - vals.min(),
-        ]
-    return features
-
-X, y = [], []
-for label, group in df.groupby("label"):
-    data = group[FEATURE_COLS].values
-    for start in range(0, len(data) - WINDOW_SIZE + 1, STEP_SIZE):
-        window = data[start:start + WINDOW_SIZE]
-        X.append(extract_features(window))
-        y.append(label)
-
-X, y = np.array(X), np.array(y)
+print(pd.Series(info["samples_per_label"]).rename_axis("label").to_string())
+
 print(f"\nCreated {len(X)} windows across {len(set(y))} classes")
 print(f"Features per window: {X.shape[1]}")
 
@@ -80,20 +87,49 @@ clf = RandomForestClassifier(
 )
 clf.fit(X_train, y_train)
 
-y_pred = clf.predict(X_test)
+# Rest gate: learned from training REST windows, checked on the test split
+gate = MotionGate.fit(X_train, y_train, quantile=GATE_QUANTILE)
+
+forest = FlatForest.from_sklearn(clf)
+if COMPRESS:
+    print("\n--- Compression ---")
+    # The cut is picked with a second forest fitted on part of the training
+    # windows and validated on the rest; clf keeps all of them, and the cut
+    # is applied to it
+    cut, best_row, full_row, rows = select_cut(
+        clf, X_train, y_train, COMPRESS_VAL_SIZE, COMPRESS_F1_TOLERANCE,
+        COMPRESS_LATENCY_MS, COMPRESS_MAX_MB)
+    print(f"Picked on {int(np.ceil(len(X_train) * COMPRESS_VAL_SIZE))} validation windows:")
+    compress_report(best_row, full_row, rows, COMPRESS_F1_TOLERANCE)
+    if cut is not None:
+        full_forest, forest = forest, forest.truncate(*cut)
+        f1_full = evaluate(full_forest, X_test, y_test)["f1"]
+        f1_kept = evaluate(forest, X_test, y_test)["f1"]
+        print(f"On the test split: macro-F1 {f1_full:.3f} full, {f1_kept:.3f} deployed "
+              f"({f1_kept - f1_full:+.3f})")
+
+bundle = make_bundle(clf, WINDOW_SIZE, STEP_SIZE, FEATURE_COLS, X.shape[1], gate)
+with open(MODEL_FILE, "wb") as f:
+    pickle.dump(bundle, f)
+save_model_file(FOREST_FILE, bundle, forest=forest)
+
+# Scored on what the controllers load: movement_model.forest through the
+# batched GestureModel API, not the sklearn object
+deployed = load_model(FOREST_FILE)
+y_pred, _ = GestureModel(deployed, use_gate=False).predict(X_test)
 print("\n--- Results ---")
 print(classification_report(y_test, y_pred))
 
-with open(MODEL_FILE, "wb") as f:
-    pickle.dump({
-        "model": clf,
-        "classes": list(clf.classes_),
-        "window_size": WINDOW_SIZE,
-        "step_size": STEP_SIZE,
-        "feature_cols": FEATURE_COLS,
-        "n_features": X.shape[1]
-    }, f)
-
-print(f"\n✅ Model saved to '{MODEL_FILE}'")
+gated = gate.rest_mask(X_test)
+y_gated, _ = GestureModel(deployed).predict(X_test)
+print("--- Motion gate ---")
+print(f"Std thresholds: {np.round(gate.std_max, 4)}")
+print(f"Test windows gated to REST: {gated.sum()} of {len(X_test)} "
+      f"({gated[y_test == 'REST'].mean() * 100:.0f}% of REST, "
+      f"{gated[y_test != 'REST'].sum()} non-REST)")
+print(f"Accuracy: forest {np.mean(y_pred == y_test) * 100:.2f}%  "
+      f"gate+forest {np.mean(y_gated == y_test) * 100:.2f}%")
+
+print(f"\n✅ Model saved to '{MODEL_FILE}' and '{FOREST_FILE}'")
 print(f"✅ Features per window: {X.shape[1]}")
 print("\nDone! Now run:  python step3_live_classify.py")
@@ -2,18 +2,29 @@
 STEP 3 — Live movement detection from your Arduino.
 
 How to run:
-  1. Make sure you ran step2_train_model.py and have movement_model.pkl
+  1. Make sure you ran step2_train_model.py and have movement_model.forest
   2. Plug in your Arduino with your sketch uploaded
   3. Close Arduino IDE completely
   4. Change PORT below to match your Arduino's port
   5. Run:  python step3_live_classify.py
+
+With FAST_START the board keeps running between launches, so a restart
+picks up the stream straight away instead of waiting for gyro calibration.
+
+No Arduino? Replay a recording instead:
+    python replay.py gesture_data.csv --controller classify
 """
 
-import serial
-import numpy as np
-import pickle
 import time
-from collections import deque
+
+from cadence import AdaptiveCadence
+from decision import ConfirmCountDecider
+from gesture_controller import GesturePipeline, load_model
+from latency import StartupTimer
+from model_file import ModelFileError
+from motion_gate import MotionGate
+from serial_protocol import MODE_COMMANDS, CsvDecoder
+from serial_reader import RECONNECT_INTERVAL, open_serial, wait_for_stream
 
 # ─────────────────────────────────────────────────────────────
 #  *** CHANGE THIS TO YOUR ARDUINO'S PORT ***
@@ -21,9 +32,13 @@ PORT = "COM4"
 # ─────────────────────────────────────────────────────────────
 
 BAUD            = 115200
-MODEL_FILE      = "movement_model.pkl"
+FAST_START      = True  # Don't reset the board on connect (skips its calibration)
+AUTO_RECONNECT  = True  # Reopen the port after a cable glitch instead of quitting
+MODEL_FILE      = "movement_model.forest"  # or .pkl (slower, needs sklearn)
 CONFIDENCE      = 50    # Only report if above 50% confident
 CONFIRM_COUNT   = 6     # Must see same label this many times in a row
+MOTION_GATE     = True  # Call clear no-motion windows REST without the forest
+ADAPTIVE_CADENCE = True # Classify less often while resting (cadence.py)
 
 DISPLAY = {
     "REST":  "RESTING",
@@ -35,119 +50,116 @@ DISPLAY = {
     "RIGHT": "RIGHT",
 }
 
-print("=" * 50)
-print("STEP 3: Live Movement Detection")
-print("=" * 50)
-
-# ── Load model ──
-try:
-    with open(MODEL_FILE, "rb") as f:
-        bundle = pickle.load(f)
-    clf         = bundle["model"]
-    classes     = bundle["classes"]
-    WINDOW_SIZE = bundle["window_size"]
-    STEP_SIZE   = bundle["step_size"]
-    n_features  = bundle.get("n_features", "unknown")
-    print(f"✅ Model loaded. Can detect: {classes}")
-    print(f"✅ Expects {n_features} features per window")
-except FileNotFoundError:
-    print(f"\nERROR: '{MODEL_FILE}' not found.")
-    print("Run step2_train_model.py first.")
-    exit()
-
-# ── Connect to Arduino ──
-print(f"\nConnecting to Arduino on {PORT}...")
-try:
-    ser = serial.Serial(PORT, BAUD, timeout=1)
-    time.sleep(2)
-    ser.flushInput()
-    print("✅ Connected!\n")
-except Exception as e:
-    print(f"\nERROR: Could not connect to {PORT}")
-    print(f"  {e}")
-    print("\nFix: Close Arduino IDE fully, then try again.")
-    exit()
-
-# ── Feature extraction — must match step2 exactly ──
-def extract_features(window):
-    features = []
-    for col in range(window.shape[1]):
-        vals = window[:, col]
-        features += [
-            vals.mean(),
-            vals.std(),
-            vals.min(),
-            vals.max(),
-            vals.max() - vals.min(),
-        ]
-    return features
-
-# ── Live loop ──
-buffer          = deque(maxlen=WINDOW_SIZE)
-sample_count    = 0
-last_label      = None
-confirm_buffer  = deque(maxlen=CONFIRM_COUNT)
-
-print("─" * 40)
-print("Move the sensor to see results!")
-print("Press Ctrl+C to stop.")
-print("─" * 40 + "\n")
-
-try:
-    while True:
-        try:
-            raw = ser.readline().decode("utf-8", errors="ignore").strip()
-        except Exception:
-            continue
-
-        if not raw or raw.startswith("#") or raw.startswith("t_ms"):
-            continue
-
-        parts = raw.split(",")
-
-        if len(parts) != 7:
-            continue
-
-        try:
-            sample = [float(parts[2]), float(parts[3]), float(parts[4]),
-                      float(parts[5]), float(parts[6])]
-        except ValueError:
-            continue
-
-        buffer.append(sample)
-        sample_count += 1
-
-        if len(buffer) == WINDOW_SIZE and sample_count % STEP_SIZE == 0:
-            window = np.array(buffer)
-            feats  = np.array([extract_features(window)])
 
+def build_pipeline(bundle, verbose=True, on_decision=None, latency=None, cadence=None):
+    """Print-only pipeline: same features/model/confirmation, no MIDI."""
+    gate = MotionGate.from_bundle(bundle) if MOTION_GATE else None
+    if cadence is None and ADAPTIVE_CADENCE:
+        cadence = AdaptiveCadence.for_model(bundle, gate, fast_every=None, slow_every=25)
+    return GesturePipeline(
+        bundle["forest"],
+        bundle["window_size"],
+        # The step the model was trained with. Features are streamed, so the
+        # cadence can go down to every sample without extra copying.
+        infer_every=bundle["step_size"],
+        decider=ConfirmCountDecider(CONFIRM_COUNT, CONFIDENCE),
+        display=DISPLAY,
+        verbose=verbose,
+        on_decision=on_decision,
+        latency=latency,
+        gate=gate,
+        cadence=cadence,
+    )
+
+
+def connect():
+    ser = open_serial(PORT, BAUD, fast_start=FAST_START)
+    ser.write(MODE_COMMANDS["csv"])   # in case a previous run left it in binary
+    return ser
+
+
+def main():
+    startup = StartupTimer()
+
+    print("=" * 50)
+    print("STEP 3: Live Movement Detection")
+    print("=" * 50)
+
+    # ── Load model ──
+    try:
+        bundle = load_model(MODEL_FILE)
+        n_features = bundle.get("n_features", "unknown")
+        print(f"✅ Model loaded. Can detect: {bundle['classes']}")
+        print(f"✅ Expects {n_features} features per window")
+        startup.mark("model loaded")
+    except FileNotFoundError:
+        print(f"\nERROR: '{MODEL_FILE}' not found.")
+        print("Run step2_train_model.py first.")
+        exit()
+    except ModelFileError as e:
+        print(f"\nERROR: {e}")
+        exit()
+
+    # ── Connect to Arduino ──
+    print(f"\nConnecting to Arduino on {PORT}...")
+    decoder = CsvDecoder()
+    try:
+        ser = connect()
+        startup.mark("port open")
+        first, booted = wait_for_stream(ser, decoder)
+        print(f"✅ Connected! ({'board restarted' if booted else 'already streaming'})\n")
+        startup.mark("first sample")
+    except Exception as e:
+        print(f"\nERROR: Could not connect to {PORT}")
+        print(f"  {e}")
+        print("\nFix: Close Arduino IDE fully, then try again.")
+        exit()
+
+    pipeline = build_pipeline(
+        bundle, on_decision=lambda i, label, conf: startup.mark("first decision"))
+
+    # ── Live loop ──
+    print("─" * 40)
+    print("Move the sensor to see results!")
+    print("Press Ctrl+C to stop.")
+    print("─" * 40 + "\n")
+
+    try:
+        pipeline.process(first["values"])
+        while True:
             try:
-                pred  = clf.predict(feats)[0]
-                proba = clf.predict_proba(feats)[0]
-                conf  = max(proba) * 100
-
-                # Only add to confirm buffer if confidence is high enough
-                if conf >= CONFIDENCE:
-                    confirm_buffer.append(pred)
-                else:
-                    confirm_buffer.append(None)
-
-                # Only print if all recent predictions agree on the same label
-                # and the current confidence still meets the threshold
-                if (len(confirm_buffer) == CONFIRM_COUNT
-                        and len(set(confirm_buffer)) == 1
-                        and confirm_buffer[-1] is not None
-                        and conf >= CONFIDENCE
-                        and pred != last_label):
-                    label_text = DISPLAY.get(pred, pred)
-                    print(f"  {label_text}   ({conf:.0f}% confident)")
-                    last_label = pred
+                data = ser.read(ser.in_waiting or 1)
+            except Exception:
+                if not AUTO_RECONNECT:
+                    continue
+                print("⚠️  Serial connection lost — reconnecting...")
+                ser.close()
+                ser = reconnect()
+                decoder.reset()          # new stream: no partial line/frame, no seq gap
+                pipeline.reset()
+                print("✅ Reconnected\n")
+                continue
 
+            try:
+                pipeline.process(decoder.feed(data)["values"])
             except Exception as e:
                 print(f"Prediction error: {e}")
                 break
 
-except KeyboardInterrupt:
-    print("\n\nStopped. Goodbye!")
-finally:
-    ser.close()
+    except KeyboardInterrupt:
+        print("\n\nStopped. Goodbye!")
+    finally:
+        ser.close()
+
+
+def reconnect():
+    while True:
+        time.sleep(RECONNECT_INTERVAL)
+        try:
+            return connect()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
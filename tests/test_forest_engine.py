@@ -0,0 +1,59 @@
+"""FlatForest against the sklearn forest it was exported from."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import FlatForest
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 25))
+    y = np.array(["LEFT", "REST", "RIGHT", "UP"])[
+        (X[:, 0] > 0).astype(int) + 2 * (X[:, 3] + 0.5 * X[:, 7] > 0).astype(int)]
+    clf = RandomForestClassifier(n_estimators=25, max_depth=10, min_samples_leaf=2,
+                                 random_state=42).fit(X[:400], y[:400])
+    return clf, FlatForest.from_sklearn(clf), X[400:]
+
+
+def test_export_shape(fitted):
+    clf, forest, _ = fitted
+    assert forest.n_trees == 25
+    assert forest.n_features == 25
+    assert list(forest.classes) == list(clf.classes_)
+    assert forest.depth == max(t.get_depth() for t in clf.estimators_)
+
+
+def test_single_window_parity(fitted):
+    clf, forest, X = fitted
+    ref = clf.predict_proba(X)
+    for i, row in enumerate(X):
+        label, conf = forest.predict_one(row)
+        assert label == clf.classes_[ref[i].argmax()]
+        np.testing.assert_allclose(forest.predict_proba_one(row), ref[i], atol=1e-12)
+
+
+def test_batch_parity(fitted):
+    clf, forest, X = fitted
+    np.testing.assert_allclose(forest.predict_proba(X, chunk=37), clf.predict_proba(X),
+                               atol=1e-12)
+
+
+def test_truncate_trees_is_a_subset(fitted):
+    clf, forest, X = fitted
+    small = forest.truncate(n_trees=7)
+    ref = np.mean([t.predict_proba(X) for t in clf.estimators_[:7]], axis=0)
+    assert small.n_trees == 7
+    np.testing.assert_allclose(small.predict_proba(X), ref, atol=1e-12)
+
+
+def test_truncate_depth(fitted):
+    _, forest, X = fitted
+    small = forest.truncate(max_depth=3)
+    assert small.depth == 3
+    assert len(small.feature) < len(forest.feature)
+    np.testing.assert_allclose(small.predict_proba(X).sum(axis=1), 1.0)
+    assert forest.truncate(max_depth=forest.depth).predict_proba(X) == \
+        pytest.approx(forest.predict_proba(X))
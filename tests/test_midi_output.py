@@ -0,0 +1,70 @@
+"""MidiOutput coalescing, on a fake clock into a recording MIDI sink."""
+
+from midi_output import MidiOutput
+from midi_protocol import encode_jog, encode_jog_fine
+from midi_scheduler import MidiScheduler
+from replay import RecordingMidiOut
+
+
+class Rig:
+    def __init__(self, slice_s=0.010):
+        self.now = 0.0
+        self.sink = RecordingMidiOut(lambda: self.now)
+        self.sched = MidiScheduler(self.sink, clock=lambda: self.now)
+        self.out = MidiOutput(self.sched, slice_s=slice_s)
+
+    def at(self, t, *messages):
+        self.now = t
+        self.sched.run_pending()
+        for m in messages:
+            self.out.send(m)
+
+    def sent(self):
+        return [(round(t, 3), m) for t, m in self.sink.messages]
+
+
+def test_exact_stream():
+    rig = Rig()
+    at = rig.at
+    at(0.000, [0x80, 60, 0])                           # note-off, nothing on
+    at(0.001, [0xB0, 7, 80])                           # first volume: straight out
+    at(0.002, [0xB0, 7, 83], [0xB0, 7, 86])            # within the slice: held, newest kept
+    at(0.003, [0x90, 60, 127], encode_jog(0, 6), encode_jog_fine(0, -40), encode_jog(0, 6))
+    at(0.004, [0x90, 60, 127], [0xB1, 7, 50])          # duplicate note-on; other channel
+    at(0.011)                                          # slice over: 86 goes out
+    at(0.015, [0xB0, 7, 89], [0xB0, 7, 86])            # held, then back to the sent value
+    at(0.021)
+    at(0.030, [0xB0, 7, 86])                           # same value again
+    at(0.045, [0x80, 60, 0], [0x80, 60, 0])            # one matched note-off, one not
+    at(0.046, [0xB0, 7, 90])
+    rig.out.flush()
+
+    expected = [
+        (0.001, [0xB0, 7, 80]),
+        (0.003, [0x90, 60, 127]), (0.003, encode_jog(0, 6)), (0.003, encode_jog_fine(0, -40)),
+        (0.003, encode_jog(0, 6)),
+        (0.004, [0xB1, 7, 50]),
+        (0.011, [0xB0, 7, 86]),
+        (0.045, [0x80, 60, 0]),
+        (0.046, [0xB0, 7, 90]),
+    ]
+    assert rig.sent() == expected
+    assert rig.out.sent == len(expected)
+    assert rig.out.suppressed == {"coalesced": 2, "repeated": 2, "note-off": 2, "note-on": 1}
+
+
+def test_flush_sends_held_values():
+    rig = Rig()
+    rig.at(0.000, [0xB0, 7, 10])
+    rig.at(0.001, [0xB0, 7, 20])                       # held until the slice ends
+    rig.out.flush()
+    assert rig.sent() == [(0.0, [0xB0, 7, 10]), (0.001, [0xB0, 7, 20])]
+
+
+def test_jog_is_never_merged():
+    rig = Rig()
+    jog = [encode_jog(0, 1)] * 5 + [encode_jog_fine(0, 3)] * 5
+    rig.at(0.000, *jog)
+    rig.out.flush()
+    assert [m for _, m in rig.sent()] == jog
+    assert sum(rig.out.suppressed.values()) == 0
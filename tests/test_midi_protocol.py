@@ -0,0 +1,34 @@
+"""Jog message encoding, as WearableTest-scripts.js decodes it."""
+
+import pytest
+
+from midi_protocol import (FINE_MAX, FINE_STEPS, decode_jog, encode_jog, encode_jog_fine)
+
+
+def test_fine_round_trip():
+    for steps in range(-FINE_MAX, FINE_MAX + 1):
+        msg = encode_jog_fine(3, steps)
+        assert msg[0] == 0xE3 and all(0 <= b <= 0x7F for b in msg[1:]), msg
+        assert decode_jog(msg) == steps
+
+
+@pytest.mark.parametrize("steps, expected", [(10 ** 6, FINE_MAX), (-10 ** 6, -FINE_MAX)])
+def test_fine_clamps(steps, expected):
+    assert decode_jog(encode_jog_fine(0, steps)) == expected
+
+
+def test_coarse_is_fine_steps_per_tick():
+    for ticks in range(-63, 64):
+        msg = encode_jog(1, ticks)
+        assert msg[:2] == [0xB1, 16]
+        assert decode_jog(msg) == ticks * FINE_STEPS
+
+
+def test_coarse_clamps():
+    assert decode_jog(encode_jog(0, 100)) == 63 * FINE_STEPS
+    assert decode_jog(encode_jog(0, -100)) == -63 * FINE_STEPS
+
+
+def test_other_messages_are_not_jog():
+    assert decode_jog([0xB0, 7, 100]) is None
+    assert decode_jog([0x90, 60, 127]) is None
@@ -0,0 +1,96 @@
+"""Frame and CSV decoders on synthetic streams with drops, corruption and noise."""
+
+import numpy as np
+import pytest
+
+from serial_protocol import (ACCEL_SCALE, FMT_F32, FMT_I16, LABELS, CsvDecoder, FrameDecoder,
+                             encode_frame, make_decoder)
+
+N = 2000
+
+
+@pytest.fixture(scope="module")
+def values():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.normal(0, 5, (N, 3)), rng.normal(0, 1, (N, 2))])
+
+
+def noisy_stream(values, fmt):
+    """(bytes, indices of the frames that should decode)."""
+    stream = bytearray()
+    expected = []
+    for i in range(N):
+        if i % 97 == 50:
+            continue                          # dropped frame → seq gap
+        frame = bytearray(encode_frame(i, 10 * i, values[i], label=i % len(LABELS), fmt=fmt))
+        if i % 131 == 7:
+            frame[12] ^= 0xFF                 # corrupted payload → bad checksum
+        else:
+            expected.append(i)
+        stream += frame
+        if i % 53 == 3:
+            stream += b"\xA5\x5A\x00garbage"  # fake sync + noise between frames
+    return bytes(stream), expected
+
+
+def feed_in_pieces(decoder, data, seed=1):
+    rng = np.random.default_rng(seed)
+    chunks, pos = [], 0
+    while pos < len(data):
+        step = int(rng.integers(1, 200))      # arbitrary read sizes
+        chunks.append(decoder.feed(data[pos:pos + step]))
+        pos += step
+    return np.concatenate(chunks)
+
+
+@pytest.mark.parametrize("fmt, tol", [(FMT_F32, 1e-5), (FMT_I16, 1.0 / ACCEL_SCALE)])
+def test_frame_decoder(values, fmt, tol):
+    stream, expected = noisy_stream(values, fmt)
+    dec = FrameDecoder()
+    got = feed_in_pieces(dec, stream)
+
+    assert list(got["seq"]) == [e & 0xFFFF for e in expected]
+    assert np.allclose(got["values"], values[expected], atol=tol)
+    assert list(got["t_ms"]) == [10 * e for e in expected]
+    assert list(got["label"]) == [e % len(LABELS) for e in expected]
+    assert dec.frames == len(expected)
+    assert dec.lost == N - len(expected)      # dropped and corrupted frames both leave gaps
+    assert dec.bad_bytes > 0
+
+
+def test_csv_decoder(values):
+    text = b"t_ms,label,ax\n# LABEL=REST\n" + b"".join(
+        f"{10 * i},REST,{v[0]:.4f},{v[1]:.4f},{v[2]:.4f},{v[3]:.6f},{v[4]:.6f}\n".encode()
+        for i, v in enumerate(values[:100]))
+    dec = CsvDecoder()
+    got = np.concatenate([dec.feed(text[i:i + 37]) for i in range(0, len(text), 37)])
+    assert len(got) == 100 and np.allclose(got["values"], values[:100], atol=1e-4)
+    assert list(got["seq"]) == list(range(100))
+    assert dec.lost == 0
+
+
+def test_reset_after_reconnect(values):
+    # The board resets and seq restarts at 0 — not a 65000-frame gap
+    dec = FrameDecoder()
+    dec.feed(b"".join(encode_frame(i, i, values[i]) for i in range(500, 510)) + b"\xA5\x5A\x00")
+    dec.reset()
+    got = dec.feed(b"".join(encode_frame(i, i, values[i]) for i in range(5)))
+    assert list(got["seq"]) == list(range(5))
+    assert dec.lost == 0 and dec.frames == 15
+
+    dec = CsvDecoder()
+    dec.feed(b"0,REST,1.0,2.0")               # partial line from the old stream
+    dec.reset()
+    got = dec.feed(b"10,UP,1,2,3,4,5\n")
+    assert len(got) == 1 and dec.bad_bytes == 0
+
+
+@pytest.mark.parametrize("serial_format, cls", [("csv", CsvDecoder), ("binary", FrameDecoder),
+                                                ("binary16", FrameDecoder)])
+def test_make_decoder(serial_format, cls):
+    assert type(make_decoder(serial_format)) is cls
+
+
+def test_make_decoder_unknown():
+    with pytest.raises(ValueError, match="binary16"):
+        make_decoder("json")
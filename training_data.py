@@ -0,0 +1,105 @@
+"""
+Training data for step2_train_model.py and search.py.
+
+load_features() returns the windowed feature matrix for gesture_data.csv
+plus any recorder.py recordings, from the feature cache (feature_cache.py)
+when the data and window settings haven't changed. make_bundle() builds the
+model dict both scripts save.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import feature_cache
+from gesture_features import window_features
+from recorder import MANIFEST, chunk_files, load_recordings, read_manifest
+
+
+def input_files(csv_file, recordings_dir):
+    """
+    The files the training data is read from (and hashed for the cache):
+    the CSV, the manifest and every chunk's column files — a chunk
+    rewritten in place changes the key even though the manifest doesn't.
+    """
+    return [path for path in (csv_file, os.path.join(recordings_dir, MANIFEST),
+                              *chunk_files(recordings_dir))
+            if os.path.exists(path)]
+
+
+def load_sources(csv_file, recordings_dir, verbose=True):
+    """gesture_data.csv and the recordings as one DataFrame with a "session" column."""
+    sources = []
+    if os.path.exists(csv_file):
+        sources.append(pd.read_csv(csv_file).assign(session=csv_file))
+        if verbose:
+            print(f"Reading '{csv_file}'")
+    if read_manifest(recordings_dir) is not None:
+        sources.append(load_recordings(recordings_dir).drop(columns="seq"))
+        if verbose:
+            print(f"Reading recordings from '{recordings_dir}/'")
+    return pd.concat(sources, ignore_index=True)
+
+
+def make_windows(df, feature_cols, window_size, step_size, dtype=np.float64):
+    """
+    (X, y, provenance, runs). One vectorized pass per stretch of one label
+    in one session, so windows never span two labels or two recordings.
+    provenance gives each window's run and first row; runs lists
+    [session, label, first row, rows].
+    """
+    run = ((df["label"] != df["label"].shift())
+           | (df["session"] != df["session"].shift())).cumsum()
+    X, y, provenance, runs = [], [], [], []
+    for (label, _), group in df.groupby(["label", run]):
+        feats = window_features(group[feature_cols].values, window_size, step_size, dtype=dtype)
+        X.append(feats)
+        y.append(np.full(len(feats), label, dtype=object))
+        prov = np.empty(len(feats), feature_cache.PROVENANCE_DTYPE)
+        prov["run"] = len(runs)
+        prov["start"] = group.index[0] + np.arange(len(feats)) * step_size
+        provenance.append(prov)
+        runs.append([group["session"].iat[0], label, int(group.index[0]), len(group)])
+    return (np.concatenate(X), np.concatenate(y).astype(str), np.concatenate(provenance),
+            runs)
+
+
+def load_features(csv_file, recordings_dir, feature_cols, window_size, step_size,
+                  dtype=np.float64, use_cache=True, verbose=True):
+    """
+    (X, y, provenance, info) for the current data; info has "rows",
+    "samples_per_label" and "cached". Raises FileNotFoundError if there is
+    no data at all.
+    """
+    inputs = input_files(csv_file, recordings_dir)
+    if not inputs:
+        raise FileNotFoundError(f"neither '{csv_file}' nor '{recordings_dir}/' found")
+
+    key, desc = feature_cache.dataset_key(inputs, feature_cols, window_size, step_size, dtype)
+    cached = feature_cache.load(key) if use_cache else None
+    if cached is not None:
+        X, y, provenance, meta = cached
+        if verbose:
+            print(f"Features from cache ({feature_cache.CACHE_DIR}/{key}) — data unchanged")
+        return X, y, provenance, {**meta["info"], "cached": True}
+
+    df = load_sources(csv_file, recordings_dir, verbose)
+    X, y, provenance, runs = make_windows(df, feature_cols, window_size, step_size, dtype)
+    info = {"rows": len(df), "samples_per_label": df["label"].value_counts().to_dict()}
+    if use_cache:
+        feature_cache.store(key, desc, X, y, provenance, runs, info=info)
+    return X, y, provenance, {**info, "cached": False}
+
+
+def make_bundle(clf, window_size, step_size, feature_cols, n_features, gate):
+    """The model dict step2 pickles and writes as a .forest file."""
+    return {
+        "model": clf,
+        "classes": list(clf.classes_),
+        "window_size": window_size,
+        "step_size": step_size,
+        "feature_cols": list(feature_cols),
+        "n_features": n_features,
+        "motion_gate": gate.to_dict(),
+    }